@@ -1,3 +1,49 @@
-from django.test import TestCase
+import warnings
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .models import AnonymousUser
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'login': '2/min'}
+})
+class LoginThrottleTests(TestCase):
+    """
+    Failed logins are throttled per username, whatever the username holds
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AnonymousUser.objects.create_user(username='member', password='correct-horse')
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+    
+    def login(self, username, password='wrong'):
+        return self.client.post(reverse('authentication:login'), {
+            'username': username, 'password': password
+        }, format='json')
+    
+    def test_guessing_one_username_is_throttled(self):
+        self.assertEqual(self.login('member').status_code, 400)
+        self.assertEqual(self.login('MEMBER').status_code, 400)
+        
+        response = self.login('member', 'correct-horse')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        
+        # Other usernames have their own bucket
+        self.assertEqual(self.login('someone-else').status_code, 400)
+    
+    def test_any_username_makes_a_valid_cache_key(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            for username in ('with spaces\tand\ncontrol chars', 'ü' * 300):
+                self.assertEqual(self.login(username).status_code, 400)
@@ -1,10 +1,11 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import login, logout
+from mental_health_platform.throttling import LoginThrottle, LoginIPThrottle
 from .serializers import (
     UserRegistrationSerializer,
     UserLoginSerializer,
@@ -42,6 +43,7 @@ def register_user(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginThrottle, LoginIPThrottle])
 def login_user(request):
     """
     Login user and return authentication token
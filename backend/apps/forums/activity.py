@@ -0,0 +1,100 @@
+"""
+Per-user activity totals (UserForumStats).
+
+Views call record() on every post, reply and like, which is one UPDATE
+with F() expressions on the user's stats row (created on first use).
+Set-based moderation passes per-author deltas to apply_deltas(), which
+issues one UPDATE per distinct delta. Counts cover active posts and
+replies and all likes received; archiving moves content without
+changing them.
+
+touch_category() keeps CategoryActivity, each user's latest post or
+reply per category, for counting a category's active users.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import CategoryActivity, UserForumStats
+
+
+STAT_FIELDS = ('post_count', 'reply_count', 'likes_received')
+
+
+def record(user_id, touch=True, **increments):
+    """
+    Add increments (e.g. post_count=1) to one user's stats and, with
+    touch, set last_active_at to now
+    """
+    changes = {field: F(field) + value for field, value in increments.items()}
+    if touch:
+        changes['last_active_at'] = timezone.now()
+    if not changes:
+        return
+    
+    if not UserForumStats.objects.filter(user_id=user_id).update(**changes):
+        UserForumStats.objects.get_or_create(user_id=user_id)
+        UserForumStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def touch_category(user_id, category_id):
+    """
+    Mark the user as active in a category now, in one upsert
+    """
+    CategoryActivity.objects.bulk_create(
+        [CategoryActivity(category_id=category_id, user_id=user_id, last_active_at=timezone.now())],
+        update_conflicts=True,
+        unique_fields=['category', 'user'],
+        update_fields=['last_active_at']
+    )
+
+
+def active_user_counts(days):
+    """
+    Users who posted or replied in the last `days` days, per category:
+    {category_id: count}
+    """
+    rows = (
+        CategoryActivity.objects.filter(last_active_at__gte=timezone.now() - timedelta(days=days))
+        .order_by().values('category').annotate(total=Count('pk'))
+    )
+    return {row['category']: row['total'] for row in rows}
+
+
+def author_counts(queryset, column='author'):
+    """
+    Count queryset rows per user in one grouped query: {user_id: count}
+    """
+    rows = queryset.exclude(**{column: None}).order_by().values(column).annotate(total=Count('pk'))
+    return {row[column]: row['total'] for row in rows}
+
+
+def apply_deltas(field, deltas, sign=1):
+    """
+    Add {user_id: delta} (times sign) to one stats field
+    """
+    deltas = {user_id: delta * sign for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    
+    UserForumStats.objects.bulk_create(
+        [UserForumStats(user_id=user_id) for user_id in deltas],
+        ignore_conflicts=True
+    )
+    
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        by_delta[delta].append(user_id)
+    
+    for delta, user_ids in by_delta.items():
+        UserForumStats.objects.filter(user_id__in=user_ids).update(**{field: F(field) + delta})
+
+
+def get_stats(user):
+    """
+    Stats for a user as a dict, zeros if they have no activity yet
+    """
+    stats = UserForumStats.objects.filter(user=user).values(*STAT_FIELDS, 'last_active_at').first()
+    return stats or {**dict.fromkeys(STAT_FIELDS, 0), 'last_active_at': None}
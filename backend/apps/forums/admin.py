@@ -1,5 +1,188 @@
-from django.contrib import admin
-from .models import ForumCategory, ForumPost, PostReply, PostLike
+import uuid
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.utils import unquote
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+from apps.authentication.models import AnonymousUser
+from .models import ForumCategory, ForumPost, PostReply, PostLike, Tag, ArchivedPost, ModerationFlag
+from .caching import invalidate_threads
+from .projections import active_reply_count
+from . import moderation, revisions, sharding
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that reads the planner's row estimate for unfiltered
+    changelists on PostgreSQL instead of running SELECT COUNT(*) over
+    the whole table. Small tables and filtered lists are counted exactly.
+    """
+    EXACT_COUNT_THRESHOLD = 10000
+    
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        connection = connections[self.object_list.db]
+        
+        if connection.vendor == 'postgresql' and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                    [self.object_list.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.EXACT_COUNT_THRESHOLD:
+                return row[0]
+        
+        return super().count
+
+
+def indexed_search(queryset, search_term, uuid_field, username_field, title_field=None):
+    """
+    Changelist search that only uses indexed lookups:
+    a UUID matches uuid_field, '@name' matches the author's username
+    exactly and anything else is a title prefix (range scan on the
+    title index, tried as typed, capitalized and lowercase).
+    """
+    term = search_term.strip()
+    if not term:
+        return queryset
+    
+    try:
+        return queryset.filter(**{uuid_field: uuid.UUID(term)})
+    except ValueError:
+        pass
+    
+    if term.startswith('@') or title_field is None:
+        return queryset.filter(**{username_field: term.lstrip('@')})
+    
+    prefixes = {term, term.capitalize(), term.lower()}
+    condition = Q()
+    for prefix in prefixes:
+        condition |= Q(**{f'{title_field}__gte': prefix, f'{title_field}__lt': prefix + '\uffff'})
+    return queryset.filter(condition)
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """
+    Changelist filter choosing the forum shard to list; the default
+    database when none is chosen
+    """
+    title = 'shard'
+    parameter_name = 'shard'
+    
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in sharding.shard_aliases()]
+    
+    def queryset(self, request, queryset):
+        # ShardedModelAdmin already runs the changelist on the shard
+        return queryset
+    
+    def choices(self, changelist):
+        current = self.value() or DEFAULT_DB_ALIAS
+        for alias, title in self.lookup_choices:
+            yield {
+                'selected': alias == current,
+                'query_string': changelist.get_query_string({self.parameter_name: alias}),
+                'display': title,
+            }
+
+
+class ShardedModelAdmin(admin.ModelAdmin):
+    """
+    Admin for sharded forum content. With forum sharding on, the
+    changelist (and its actions) runs on the shard picked in the shard
+    filter and object pages on the shard holding the object.
+    """
+    
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        if sharding.is_enabled():
+            return (ShardFilter, *list_filter)
+        return list_filter
+    
+    def request_shard(self, request, object_id=None):
+        if object_id is None:
+            alias = request.GET.get(ShardFilter.parameter_name)
+            return alias if alias in sharding.shard_aliases() else DEFAULT_DB_ALIAS
+        try:
+            pk = self.model._meta.pk.to_python(unquote(object_id))
+        except ValidationError:
+            return DEFAULT_DB_ALIAS
+        for alias in sharding.shard_aliases():
+            if self.model._default_manager.using(alias).filter(pk=pk).exists():
+                return alias
+        return DEFAULT_DB_ALIAS
+    
+    def on_shard(self, request, object_id, view, *args):
+        """
+        Run and render view(*args) pinned to the request's shard
+        """
+        if not sharding.is_enabled():
+            return view(*args)
+        
+        alias = self.request_shard(request, object_id)
+        if request.method == 'POST':
+            # Moderator foreign keys (resolved_by, ...) point at the copy
+            sharding.mirror([request.user], alias)
+        with sharding.use_shard(alias):
+            response = view(*args)
+            # Templates evaluate querysets, so render before leaving the shard
+            if hasattr(response, 'render'):
+                response.render()
+        return response
+    
+    def changelist_view(self, request, extra_context=None):
+        return self.on_shard(request, None, super().changelist_view, request, extra_context)
+    
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        return self.on_shard(request, object_id, super().changeform_view, request, object_id, form_url, extra_context)
+    
+    def delete_view(self, request, object_id, extra_context=None):
+        return self.on_shard(request, object_id, super().delete_view, request, object_id, extra_context)
+
+
+def apply_admin_edit(request, obj, form, fields):
+    """
+    Apply a change form's edits of versioned fields through
+    revisions.apply_edit, so they bump the version and leave a revision
+    like edits through the API. Returns False if the object was edited
+    in the meantime.
+    """
+    edited = [name for name in fields if name in form.changed_data]
+    if not edited:
+        return True
+    values = {name: getattr(obj, name) for name in edited}
+    stored = type(obj).objects.using(obj._state.db).filter(
+        pk=obj.pk, version=obj.version
+    ).values(*edited).first()
+    if stored is None:
+        return False
+    # apply_edit diffs against the instance, so put the stored text back
+    for name, value in stored.items():
+        setattr(obj, name, value)
+    try:
+        revisions.apply_edit(obj, obj.version, values, request.user)
+    except revisions.EditConflict:
+        return False
+    return True
+
+
+class PostModerationActionForm(ActionForm):
+    """
+    Action form with the target category for the move action
+    """
+    category = forms.ModelChoiceField(
+        queryset=ForumCategory.objects.filter(is_active=True),
+        required=False,
+        label='Move to'
+    )
 
 
 @admin.register(ForumCategory)
@@ -7,26 +190,44 @@ class ForumCategoryAdmin(admin.ModelAdmin):
     """
     Admin configuration for ForumCategory
     """
-    list_display = ('name', 'slug', 'post_count', 'order', 'is_active', 'created_at')
+    list_display = ('name', 'slug', 'active_post_count', 'order', 'is_active', 'created_at')
     list_filter = ('is_active', 'created_at')
     search_fields = ('name', 'description')
     prepopulated_fields = {'slug': ('name',)}
     list_editable = ('order', 'is_active')
     ordering = ('order', 'name')
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _post_count=Count('posts', filter=Q(posts__is_active=True))
+        )
+    
+    @admin.display(description='Post count', ordering='_post_count')
+    def active_post_count(self, obj):
+        return obj._post_count
 
 
 @admin.register(ForumPost)
-class ForumPostAdmin(admin.ModelAdmin):
+class ForumPostAdmin(ShardedModelAdmin):
     """
     Admin configuration for ForumPost
     """
-    list_display = ('title', 'author', 'category', 'reply_count', 'view_count', 'is_pinned', 'is_locked', 'is_active', 'created_at')
+    list_display = ('title', 'author', 'category', 'active_reply_count', 'view_count', 'is_pinned', 'is_locked', 'is_active', 'created_at')
     list_filter = ('category', 'is_pinned', 'is_locked', 'is_active', 'created_at')
-    search_fields = ('title', 'content', 'author__username')
+    list_select_related = ('author', 'category')
+    search_fields = ('title',)
+    search_help_text = 'Title prefix, @username or post ID'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     readonly_fields = ('post_id', 'view_count', 'like_count', 'created_at', 'updated_at')
     list_editable = ('is_pinned', 'is_locked', 'is_active')
     raw_id_fields = ('author',)
     ordering = ('-created_at',)
+    action_form = PostModerationActionForm
+    actions = (
+        'lock_posts', 'unlock_posts', 'pin_posts', 'unpin_posts',
+        'deactivate_posts', 'restore_posts', 'move_posts', 'remove_authors_content'
+    )
     
     fieldsets = (
         (None, {
@@ -44,16 +245,103 @@ class ForumPostAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_reply_count=active_reply_count())
+    
+    def save_model(self, request, obj, form, change):
+        if change and not apply_admin_edit(request, obj, form, revisions.POST_EDIT_FIELDS):
+            self.message_user(request, 'The post was edited in the meantime: reload it and try again.', messages.ERROR)
+            return
+        super().save_model(request, obj, form, change)
+        if not change or 'tags' in form.changed_data:
+            # Keep the normalized tag index in step with the JSON list,
+            # on the shard a new post's category put it on
+            with sharding.use_shard(obj._state.db):
+                obj.sync_tags()
+        invalidate_threads([obj.post_id])
+    
+    def get_search_results(self, request, queryset, search_term):
+        return indexed_search(queryset, search_term, 'post_id', 'author__username', 'title'), False
+    
+    @admin.display(description='Reply count', ordering='_reply_count')
+    def active_reply_count(self, obj):
+        return obj._reply_count
+    
+    # Bulk moderation actions (set-based, see moderation.py)
+    
+    @admin.action(description='Lock selected posts')
+    def lock_posts(self, request, queryset):
+        updated = moderation.update_posts(queryset, **moderation.POST_ACTIONS['lock'])
+        self.message_user(request, f'{updated} posts locked.')
+    
+    @admin.action(description='Unlock selected posts')
+    def unlock_posts(self, request, queryset):
+        updated = moderation.update_posts(queryset, **moderation.POST_ACTIONS['unlock'])
+        self.message_user(request, f'{updated} posts unlocked.')
+    
+    @admin.action(description='Pin selected posts')
+    def pin_posts(self, request, queryset):
+        updated = moderation.update_posts(queryset, **moderation.POST_ACTIONS['pin'])
+        self.message_user(request, f'{updated} posts pinned.')
+    
+    @admin.action(description='Unpin selected posts')
+    def unpin_posts(self, request, queryset):
+        updated = moderation.update_posts(queryset, **moderation.POST_ACTIONS['unpin'])
+        self.message_user(request, f'{updated} posts unpinned.')
+    
+    @admin.action(description='Deactivate selected posts and their replies')
+    def deactivate_posts(self, request, queryset):
+        updated = moderation.set_posts_active(queryset, False)
+        self.message_user(request, f'{updated} posts deactivated.')
+    
+    @admin.action(description='Restore selected posts')
+    def restore_posts(self, request, queryset):
+        updated = moderation.set_posts_active(queryset, True)
+        self.message_user(request, f'{updated} posts restored.')
+    
+    @admin.action(description='Move selected posts to category')
+    def move_posts(self, request, queryset):
+        field = PostModerationActionForm.base_fields['category']
+        try:
+            category = field.clean(request.POST.get('category'))
+        except forms.ValidationError:
+            category = None
+        if category is None:
+            self.message_user(request, 'Choose a category to move the posts to.', messages.ERROR)
+            return
+        try:
+            updated = moderation.update_posts(queryset, category=category)
+        except moderation.CrossShardMove as error:
+            self.message_user(request, f'{error}: move the whole category with move_category.', messages.ERROR)
+            return
+        self.message_user(request, f'{updated} posts moved to {category}.')
+    
+    @admin.action(description="Remove all content by the selected posts' authors")
+    def remove_authors_content(self, request, queryset):
+        author_ids = queryset.values_list('author_id', flat=True).distinct()
+        for author in AnonymousUser.objects.filter(pk__in=author_ids):
+            removed = moderation.remove_user_content(author)
+            self.message_user(
+                request,
+                f"{author.username}: {removed['posts']} posts, {removed['replies']} replies "
+                f"and {removed['likes']} likes removed."
+            )
 
 
 @admin.register(PostReply)
-class PostReplyAdmin(admin.ModelAdmin):
+class PostReplyAdmin(ShardedModelAdmin):
     """
     Admin configuration for PostReply
     """
     list_display = ('author', 'post', 'parent_reply', 'like_count', 'is_active', 'created_at')
     list_filter = ('is_active', 'created_at')
-    search_fields = ('content', 'author__username', 'post__title')
+    list_select_related = ('author', 'post__author', 'parent_reply__author', 'parent_reply__post')
+    search_fields = ('reply_id',)
+    search_help_text = '@username or reply ID'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('deactivate_replies', 'restore_replies')
     readonly_fields = ('reply_id', 'like_count', 'created_at', 'updated_at')
     raw_id_fields = ('author', 'post', 'parent_reply')
     ordering = ('-created_at',)
@@ -74,15 +362,123 @@ class PostReplyAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        return indexed_search(queryset, search_term, 'reply_id', 'author__username'), False
+    
+    def save_model(self, request, obj, form, change):
+        if change and not apply_admin_edit(request, obj, form, revisions.REPLY_EDIT_FIELDS):
+            self.message_user(request, 'The reply was edited in the meantime: reload it and try again.', messages.ERROR)
+            return
+        super().save_model(request, obj, form, change)
+        moderation.recount_post_replies([obj.post_id])
+        invalidate_threads([obj.post.post_id])
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        moderation.recount_post_replies([obj.post_id])
+    
+    def delete_queryset(self, request, queryset):
+        post_ids = list(queryset.values_list('post_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        moderation.recount_post_replies(post_ids)
+    
+    @admin.action(description='Deactivate selected replies and their nested replies')
+    def deactivate_replies(self, request, queryset):
+        updated = moderation.set_replies_active(queryset, False)
+        self.message_user(request, f'{updated} replies deactivated.')
+    
+    @admin.action(description='Restore selected replies')
+    def restore_replies(self, request, queryset):
+        updated = moderation.set_replies_active(queryset, True)
+        self.message_user(request, f'{updated} replies restored.')
 
 
 @admin.register(PostLike)
-class PostLikeAdmin(admin.ModelAdmin):
+class PostLikeAdmin(ShardedModelAdmin):
     """
     Admin configuration for PostLike
     """
     list_display = ('user', 'post', 'reply', 'created_at')
     list_filter = ('created_at',)
-    search_fields = ('user__username', 'post__title')
+    list_select_related = ('user', 'post__author', 'reply__author', 'reply__post')
+    search_fields = ('user__username',)
+    search_help_text = '@username'
     raw_id_fields = ('user', 'post', 'reply')
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def get_search_results(self, request, queryset, search_term):
+        username = search_term.strip().lstrip('@')
+        if not username:
+            return queryset, False
+        return queryset.filter(user__username=username), False
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for Tag
+    """
+    list_display = ('name', 'post_count', 'created_at')
+    search_fields = ('^name',)
+    readonly_fields = ('post_count', 'created_at')
+    ordering = ('-post_count', 'name')
+
+
+@admin.register(ArchivedPost)
+class ArchivedPostAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for ArchivedPost
+    """
+    list_display = ('title', 'author', 'category', 'reason', 'is_public', 'is_compressed', 'archived_at')
+    list_filter = ('reason', 'is_public', 'category')
+    list_select_related = ('author', 'category')
+    search_fields = ('post_id',)
+    search_help_text = 'Post ID'
+    raw_id_fields = ('author',)
+    exclude = ('payload',)
+    readonly_fields = ('post_id', 'title', 'author', 'category', 'reason', 'is_compressed', 'created_at', 'archived_at')
+    ordering = ('-archived_at',)
+    
+    def get_search_results(self, request, queryset, search_term):
+        return indexed_search(queryset, search_term, 'post_id', 'author__username'), False
+
+
+@admin.register(ModerationFlag)
+class ModerationFlagAdmin(ShardedModelAdmin):
+    """
+    Moderator queue for content flagged by screening
+    """
+    list_display = ('__str__', 'category', 'matched_phrases', 'post', 'status', 'created_at')
+    list_filter = ('status', 'category')
+    list_select_related = ('post__author', 'reply')
+    search_fields = ('flag_id',)
+    search_help_text = 'Flag ID'
+    raw_id_fields = ('post', 'reply', 'resolved_by')
+    readonly_fields = ('flag_id', 'category', 'matched_phrases', 'created_at', 'resolved_at', 'resolved_by')
+    ordering = ('-created_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('resolve_flags', 'dismiss_flags')
+    
+    def get_search_results(self, request, queryset, search_term):
+        return indexed_search(queryset, search_term, 'flag_id', 'post__author__username'), False
+    
+    def close_flags(self, request, queryset, status):
+        return queryset.filter(status='open').update(
+            status=status,
+            resolved_by=request.user,
+            resolved_at=timezone.now()
+        )
+    
+    @admin.action(description='Mark selected flags as resolved')
+    def resolve_flags(self, request, queryset):
+        updated = self.close_flags(request, queryset, 'resolved')
+        self.message_user(request, f'{updated} flags resolved.')
+    
+    @admin.action(description='Dismiss selected flags')
+    def dismiss_flags(self, request, queryset):
+        updated = self.close_flags(request, queryset, 'dismissed')
+        self.message_user(request, f'{updated} flags dismissed.')
@@ -0,0 +1,210 @@
+"""
+Engagement analytics: views, likes, new posts and replies per category
+over time.
+
+Writes append to the EngagementEvent log with record() (views come in
+batches from the buffered view counter, see caching.flush_view_counts).
+rollup(), run by `manage.py rollup_engagement`, consumes the log in id
+order: each batch is added into the HourlyEngagement and DailyEngagement
+buckets (UTC) and deleted in the same transaction, so the log stays
+short and every event is counted once even if a run fails half-way.
+
+series() answers time-series queries from the rollup tables alone. It
+reads the daily or hourly buckets covering the range and sums them into
+buckets of any width with NumPy, or plain Python without it. Events not
+yet rolled up are not included; pending_since() says how far behind the
+rollup is.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import DailyEngagement, EngagementEvent, HourlyEngagement
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+METRICS = ('views', 'likes', 'posts', 'replies')
+KIND_METRICS = {
+    EngagementEvent.VIEW: 'views',
+    EngagementEvent.LIKE: 'likes',
+    EngagementEvent.POST: 'posts',
+    EngagementEvent.REPLY: 'replies',
+}
+
+HOUR = 3600
+DAY = 86400
+# Rollup tables by bucket width in seconds
+ROLLUPS = ((DailyEngagement, DAY), (HourlyEngagement, HOUR))
+
+ROLLUP_BATCH_SIZE = 1000
+MAX_BUCKETS = 2000
+
+
+def record(kind, category_id, count=1):
+    """
+    Log `count` events of one kind in a category
+    """
+    EngagementEvent.objects.create(kind=kind, category_id=category_id, count=count)
+
+
+def record_counts(kind, counts):
+    """
+    Log events of one kind for many categories: {category_id: count}
+    """
+    EngagementEvent.objects.bulk_create([
+        EngagementEvent(kind=kind, category_id=category_id, count=count)
+        for category_id, count in counts.items() if count
+    ])
+
+
+def bucket_floor(moment, width):
+    """
+    Start of the UTC bucket of `width` seconds (an hour or a day)
+    holding moment
+    """
+    moment = moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if width == DAY:
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def add_to_buckets(model, width, events):
+    """
+    Add (kind, category_id, count, created_at) events into a rollup table
+    """
+    deltas = defaultdict(Counter)
+    for kind, category_id, count, created_at in events:
+        deltas[category_id, bucket_floor(created_at, width)][KIND_METRICS[kind]] += count
+    
+    existing = {
+        (bucket.category_id, bucket.bucket_start): bucket
+        for bucket in model.objects.filter(
+            category_id__in={category_id for category_id, _ in deltas},
+            bucket_start__in={start for _, start in deltas}
+        ).only('pk', 'category_id', 'bucket_start')
+    }
+    
+    created = []
+    for key, delta in deltas.items():
+        bucket = existing.get(key)
+        if bucket is None:
+            created.append(model(category_id=key[0], bucket_start=key[1], **delta))
+            continue
+        # F() increments stay correct under concurrent rollups
+        for metric in METRICS:
+            setattr(bucket, metric, F(metric) + delta[metric])
+    
+    model.objects.bulk_update(list(existing.values()), METRICS)
+    model.objects.bulk_create(created)
+
+
+def rollup_batch(batch_size=ROLLUP_BATCH_SIZE):
+    """
+    Roll up and delete the oldest batch of events. Returns the number
+    of events consumed.
+    """
+    with transaction.atomic():
+        events = EngagementEvent.objects.order_by('pk')
+        if connection.features.has_select_for_update_skip_locked:
+            # Concurrent runs take different batches
+            events = events.select_for_update(skip_locked=True)
+        rows = list(events.values_list('pk', 'kind', 'category_id', 'count', 'created_at')[:batch_size])
+        if not rows:
+            return 0
+        
+        events = [row[1:] for row in rows]
+        for model, width in ROLLUPS:
+            add_to_buckets(model, width, events)
+        EngagementEvent.objects.filter(pk__in=[row[0] for row in rows]).delete()
+    
+    return len(rows)
+
+
+def rollup(batch_size=ROLLUP_BATCH_SIZE, log=None):
+    """
+    Roll up the whole event log, batch by batch. Returns the number of
+    events consumed.
+    """
+    total = 0
+    while True:
+        consumed = rollup_batch(batch_size)
+        if not consumed:
+            return total
+        total += consumed
+        if log:
+            log(f'Rolled up {total} events...')
+
+
+def pending_since():
+    """
+    Time of the oldest event not rolled up yet, or None
+    """
+    return EngagementEvent.objects.order_by('pk').values_list('created_at', flat=True).first()
+
+
+def sum_buckets(rows, start, width, count, groups):
+    """
+    Sum (group, bucket_start, *metrics) rows into `count` buckets of
+    `width` seconds from start, per group: {group: [[metric totals], ...]}
+    """
+    if np is not None:
+        totals = np.zeros((len(groups), count, len(METRICS)), dtype=np.int64)
+        if rows:
+            group_index = {group: index for index, group in enumerate(groups)}
+            offsets = np.array(
+                [(row[1] - start).total_seconds() for row in rows], dtype=np.int64
+            ) // width
+            np.add.at(
+                totals,
+                (np.array([group_index[row[0]] for row in rows]), offsets),
+                np.array([row[2:] for row in rows], dtype=np.int64)
+            )
+        return dict(zip(groups, totals.tolist()))
+    
+    totals = {group: [[0] * len(METRICS) for _ in range(count)] for group in groups}
+    for group, bucket_start, *values in rows:
+        bucket = totals[group][int((bucket_start - start).total_seconds()) // width]
+        for index, value in enumerate(values):
+            bucket[index] += value
+    return totals
+
+
+def series(start, end, width, category_ids=None, by_category=False):
+    """
+    Engagement in buckets of `width` seconds (a multiple of an hour)
+    covering start to end, zero-filled, read from the daily rollup when
+    the buckets are whole aligned days and the hourly one otherwise.
+    Returns (bucket_starts, {group: {metric: [totals]}}), grouped by
+    category id with by_category and under None otherwise.
+    """
+    start = bucket_floor(start, HOUR)
+    model = HourlyEngagement
+    if width % DAY == 0 and start == bucket_floor(start, DAY):
+        model = DailyEngagement
+    count = max(1, -(-int((end - start).total_seconds()) // width))
+    if count > MAX_BUCKETS:
+        raise ValueError(f'At most {MAX_BUCKETS} buckets per series')
+    
+    rows = model.objects.filter(bucket_start__gte=start, bucket_start__lt=start + timedelta(seconds=count * width))
+    if category_ids is not None:
+        rows = rows.filter(category_id__in=category_ids)
+    rows = list(rows.order_by().values_list('category_id', 'bucket_start', *METRICS))
+    
+    if by_category:
+        groups = sorted(category_ids if category_ids is not None else {row[0] for row in rows})
+    else:
+        rows = [(None, *row[1:]) for row in rows]
+        groups = [None]
+    totals = sum_buckets(rows, start, width, count, groups)
+    
+    bucket_starts = [start + timedelta(seconds=index * width) for index in range(count)]
+    return bucket_starts, {
+        group: {metric: [bucket[index] for bucket in buckets] for index, metric in enumerate(METRICS)}
+        for group, buckets in totals.items()
+    }
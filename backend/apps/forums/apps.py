@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
+
+
+def refresh_mirrors(sender, **kwargs):
+    # Imports sharding on the first user or category save rather than
+    # at boot: it pulls in DRF and the serializers
+    from .sharding import refresh_mirrors
+    refresh_mirrors(sender, **kwargs)
 
 
 class ForumsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.forums'
+    
+    def ready(self):
+        # Keep shard copies of users and categories up to date
+        post_save.connect(refresh_mirrors, sender='authentication.AnonymousUser', dispatch_uid='forums_shard_mirror_user')
+        post_save.connect(refresh_mirrors, sender='forums.ForumCategory', dispatch_uid='forums_shard_mirror_category')
@@ -0,0 +1,120 @@
+"""
+Resumable, throttled backfills of new columns on large forum tables.
+
+A backfill walks its model in primary key order BATCH_SIZE rows at a
+time, filling one chunk per short UPDATE so locks are held only
+briefly, and sleeps between chunks to leave room for normal traffic.
+After every chunk the last primary key is saved in BackfillProgress, so
+an interrupted run continues where it stopped.
+
+Code reading a backfilled column checks is_complete() and keeps using
+the old computation until the backfill has reached every row; writes
+maintain the column from the moment it exists, so it stays correct
+once complete.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import BackfillProgress, ForumPost, PostReply
+
+
+BATCH_SIZE = 1000
+
+
+class Backfill:
+    """
+    A named column backfill: `fill(pks)` fills one chunk of rows
+    """
+    name = None
+    description = ''
+    model = None
+    
+    def queryset(self):
+        return self.model.objects.all()
+    
+    def fill(self, pks):
+        raise NotImplementedError('.fill() must be overridden')
+
+
+class PostReplyTotalBackfill(Backfill):
+    name = 'post_reply_total'
+    description = 'Active reply count of each post (ForumPost.reply_total)'
+    model = ForumPost
+    
+    def fill(self, pks):
+        # One statement per chunk, so a reply added meanwhile is either
+        # counted here or incremented afterwards
+        replies = (
+            PostReply.objects.filter(post=OuterRef('pk'), is_active=True)
+            .order_by()
+            .values('post')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        ForumPost.objects.filter(pk__in=pks, reply_total=None).update(
+            reply_total=Coalesce(Subquery(replies, output_field=IntegerField()), 0)
+        )
+
+
+BACKFILLS = {backfill.name: backfill for backfill in (PostReplyTotalBackfill(),)}
+
+_complete = set()
+
+
+def is_complete(name):
+    """
+    Whether the named backfill has finished. Until it has, this is one
+    unique-index lookup per call; once true it is remembered for the
+    life of the process.
+    """
+    if name in _complete:
+        return True
+    if BackfillProgress.objects.filter(name=name, completed_at__isnull=False).exists():
+        _complete.add(name)
+        return True
+    return False
+
+
+def reset(name):
+    BackfillProgress.objects.filter(name=name).delete()
+    _complete.discard(name)
+
+
+def run(name, batch_size=BATCH_SIZE, sleep=0.0, limit=None, log=None):
+    """
+    Run or resume a backfill. Stops after `limit` rows when given.
+    Returns its BackfillProgress.
+    """
+    backfill = BACKFILLS[name]
+    progress, _ = BackfillProgress.objects.get_or_create(name=name)
+    if progress.completed_at:
+        return progress
+    
+    rows = backfill.queryset().order_by('pk').values_list('pk', flat=True)
+    processed = 0
+    while limit is None or processed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - processed)
+        chunk = list(rows.filter(pk__gt=progress.last_pk)[:size])
+        if not chunk:
+            progress.completed_at = timezone.now()
+            progress.save(update_fields=['completed_at', 'updated_at'])
+            if log:
+                log(f'{name}: complete, {progress.rows_done} rows')
+            break
+        
+        with transaction.atomic():
+            backfill.fill(chunk)
+            progress.last_pk = chunk[-1]
+            progress.rows_done += len(chunk)
+            progress.save(update_fields=['last_pk', 'rows_done', 'updated_at'])
+        processed += len(chunk)
+        if log:
+            log(f'{name}: {progress.rows_done} rows, up to pk {progress.last_pk}')
+        if sleep:
+            time.sleep(sleep)
+    
+    return progress
@@ -0,0 +1,439 @@
+import atexit
+import threading
+import time
+from collections import Counter
+from urllib.parse import quote
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from .models import EngagementEvent, ForumCategory, ForumPost, PostLike, PostReply, Tag
+from .projections import active_reply_count, format_datetime, format_uuid
+from .serializers import ForumPostSerializer, PostReplySerializer
+from . import activity, analytics, ranking, sharding, tasks
+
+
+TAG_CACHE_TIMEOUT = getattr(settings, 'FORUM_TAG_CACHE_TIMEOUT', 300)
+POPULAR_TAGS_LIMIT = 100
+
+
+def get_popular_tags(limit=20):
+    """
+    Get the most used tags with their post counts, cached for
+    TAG_CACHE_TIMEOUT seconds
+    """
+    popular = cache.get('forums:tags:popular')
+    if popular is None:
+        popular = list(
+            Tag.objects.filter(post_count__gt=0)
+            .order_by('-post_count', 'name')
+            .values('name', 'post_count')[:POPULAR_TAGS_LIMIT]
+        )
+        cache.set('forums:tags:popular', popular, TAG_CACHE_TIMEOUT)
+    return popular[:limit]
+
+
+def get_tag_suggestions(prefix, limit=10):
+    """
+    Autocomplete tag names starting with prefix, most popular first.
+    The query walks forum_tags_popular_idx in (-post_count, name) order
+    and stops after `limit` matches, so popular tags are never cut off
+    by tags that merely sort first by name.
+    """
+    prefix = Tag.normalize(prefix)
+    cache_key = f'forums:tags:suggest:{limit}:{quote(prefix)}'
+    suggestions = cache.get(cache_key)
+    if suggestions is None:
+        suggestions = list(
+            Tag.objects.filter(Tag.prefix_filter(prefix), post_count__gt=0)
+            .order_by('-post_count', 'name')
+            .values('name', 'post_count')[:limit]
+        )
+        cache.set(cache_key, suggestions, TAG_CACHE_TIMEOUT)
+    return suggestions
+
+
+# Category landing summary
+#
+# Post count, active reply count and latest post of every category come
+# from one window-function query per shard (the latest post is the first
+# row of each category partition); active users from CategoryActivity.
+# The result is cached and dropped on any write that changes it.
+
+CATEGORY_SUMMARY_KEY = 'forums:categories:summary'
+CATEGORY_SUMMARY_TIMEOUT = getattr(settings, 'FORUM_CATEGORY_SUMMARY_TIMEOUT', 300)
+ACTIVE_USER_DAYS = getattr(settings, 'FORUM_ACTIVE_USER_DAYS', 30)
+
+
+def summarize_posts(alias):
+    """
+    {category_id: row} with post and reply counts and the latest post,
+    for categories with active posts on one shard
+    """
+    partition = {'partition_by': [F('category_id')]}
+    rows = (
+        ForumPost.objects.using(alias).filter(is_active=True)
+        .annotate(
+            category_posts=Window(Count('pk'), **partition),
+            category_replies=Window(Sum(active_reply_count()), **partition),
+            position=Window(RowNumber(), order_by=[F('created_at').desc(), F('pk').desc()], **partition),
+        )
+        .filter(position=1)
+        .order_by()
+        .values(
+            'category_id', 'category_posts', 'category_replies', 'post_id', 'title', 'created_at',
+            'author__user_id', 'author__username', 'author__display_name'
+        )
+    )
+    return {row['category_id']: row for row in rows}
+
+
+def build_category_summaries():
+    posts = {}
+    for shard_posts in sharding.scatter(summarize_posts):
+        posts.update(shard_posts)
+    active_users = activity.active_user_counts(ACTIVE_USER_DAYS)
+    
+    summaries = []
+    categories = ForumCategory.objects.filter(is_active=True).order_by('order', 'name')
+    for category in categories.values('pk', 'name', 'description', 'slug', 'icon', 'color', 'order'):
+        category_id = category.pop('pk')
+        row = posts.get(category_id)
+        latest_post = row and {
+            'post_id': format_uuid(row['post_id']),
+            'title': row['title'],
+            'author': {
+                'username': row['author__username'],
+                'display_name': row['author__display_name'],
+                'user_id': format_uuid(row['author__user_id']),
+            },
+            'created_at': format_datetime(row['created_at']),
+        }
+        summaries.append({
+            **category,
+            'post_count': row['category_posts'] if row else 0,
+            'reply_count': (row['category_replies'] or 0) if row else 0,
+            'active_users': active_users.get(category_id, 0),
+            'latest_post': latest_post,
+        })
+    return summaries
+
+
+def get_category_summaries():
+    """
+    Landing page summary of every active category, cached until a write
+    changes it (or CATEGORY_SUMMARY_TIMEOUT seconds, as active users age)
+    """
+    summaries = cache.get(CATEGORY_SUMMARY_KEY)
+    if summaries is None:
+        summaries = build_category_summaries()
+        cache.set(CATEGORY_SUMMARY_KEY, summaries, CATEGORY_SUMMARY_TIMEOUT)
+    return summaries
+
+
+def invalidate_category_summaries():
+    cache.delete(CATEGORY_SUMMARY_KEY)
+
+
+# Post detail (thread) cache
+#
+# A thread document holds the serialized post and its active replies,
+# without volatile counters. View and like counts live in separate
+# counter keys and are merged in at response time, so serving a cached
+# thread to an anonymous user runs no SQL.
+#
+# Every write bumps the thread's generation. A reader that loaded the
+# post before the bump stores its copy under the old generation, where
+# nobody looks any more, so concurrent writes can't lose replies or
+# resurrect moderated threads.
+#
+# Replies and edits write through: the writer patches the current
+# document and stores it under the generation its own bump returned,
+# but only if that bump came straight after the generation the
+# document was read at (a compare-and-set on the generation). If any
+# other write got in between, the bump simply retires the document
+# and the next read rebuilds it. Bulk and moderation paths only
+# invalidate. With several worker processes CACHES must be shared
+# (Redis or memcached) for the bump to reach all of them.
+
+THREAD_CACHE_TIMEOUT = getattr(settings, 'FORUM_THREAD_CACHE_TIMEOUT', 3600)
+VIEW_FLUSH_INTERVAL = getattr(settings, 'FORUM_VIEW_FLUSH_INTERVAL', 10)
+
+_pending_views = Counter()
+_pending_views_lock = threading.Lock()
+_view_flush_timer = None
+
+
+def thread_generation_key(post_id):
+    return f'forums:thread:{post_id}:generation'
+
+
+def thread_key(post_id, generation):
+    return f'forums:thread:{post_id}:{generation}'
+
+
+def post_likes_key(post_pk):
+    return f'forums:post:{post_pk}:likes'
+
+
+def post_views_key(post_pk):
+    return f'forums:post:{post_pk}:views'
+
+
+def reply_likes_key(reply_pk):
+    return f'forums:reply:{reply_pk}:likes'
+
+
+def new_generation():
+    # Never reused, so documents cached under an evicted generation
+    # counter stay unreachable
+    return time.time_ns()
+
+
+def get_thread_generation(post_id):
+    key = thread_generation_key(post_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, new_generation(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def serialize_reply(reply):
+    """Serialize a reply for the thread document (no per-user fields)"""
+    data = dict(PostReplySerializer(reply).data)
+    data.pop('liked_by_me')
+    return data
+
+
+def build_thread(post, generation):
+    """
+    Build and cache the thread document for an active post, and seed
+    its counter keys from the database
+    """
+    replies = list(
+        PostReply.objects.filter(post=post, is_active=True)
+        .select_related('author')
+        .order_by('created_at')
+    )
+    
+    post_data = dict(ForumPostSerializer(post).data)
+    post_data.pop('liked_by_me')
+    
+    thread = {
+        'generation': generation,
+        'pk': post.pk,
+        'post': post_data,
+        'replies': [serialize_reply(reply) for reply in replies],
+        'reply_pks': [reply.pk for reply in replies],
+    }
+    
+    cache.set(thread_key(post.post_id, generation), thread, THREAD_CACHE_TIMEOUT)
+    cache.add(post_views_key(post.pk), post.view_count, THREAD_CACHE_TIMEOUT)
+    cache.set_many({
+        post_likes_key(post.pk): post.like_count,
+        **{reply_likes_key(reply.pk): reply.like_count for reply in replies}
+    }, THREAD_CACHE_TIMEOUT)
+    return thread
+
+
+def get_thread(post_id):
+    """
+    Get the cached thread document, building it on a miss.
+    Returns None if there is no active post with this post_id.
+    """
+    # Read before the database, so a write in between bumps it past us
+    generation = get_thread_generation(post_id)
+    thread = cache.get(thread_key(post_id, generation))
+    if thread is None:
+        post = ForumPost.objects.filter(post_id=post_id, is_active=True).select_related('author', 'category').first()
+        if post is None:
+            return None
+        thread = build_thread(post, generation)
+    return thread
+
+
+def invalidate_threads(post_ids):
+    """
+    Retire the cached threads of posts changed outside write_through,
+    e.g. by moderation, bulk updates or the admin
+    """
+    for post_id in post_ids:
+        key = thread_generation_key(post_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_generation(), None)
+
+
+def write_through(post_id, patch):
+    """
+    Bump a thread's generation after a committed write and, when no
+    other write came in between, store the cached document patched with
+    patch(thread) under the new generation. patch returns False when it
+    can't apply the change, leaving the thread to be rebuilt.
+    """
+    key = thread_generation_key(post_id)
+    generation = cache.get(key)
+    thread = cache.get(thread_key(post_id, generation)) if generation is not None else None
+    try:
+        bumped = cache.incr(key)
+    except ValueError:
+        cache.set(key, new_generation(), None)
+        return
+    
+    if thread is None or bumped != generation + 1 or patch(thread) is False:
+        return
+    thread['generation'] = bumped
+    cache.set(thread_key(post_id, bumped), thread, THREAD_CACHE_TIMEOUT)
+
+
+def add_reply(post, reply):
+    """
+    Append a new reply to the cached thread of its post
+    """
+    def patch(thread):
+        thread['replies'].append(serialize_reply(reply))
+        thread['reply_pks'].append(reply.pk)
+        thread['post']['reply_count'] += 1
+        thread['post']['last_activity'] = format_datetime(post.last_activity)
+    
+    set_reply_like_count(reply)
+    write_through(post.post_id, patch)
+
+
+def update_post(post, fields):
+    """
+    Write edited post fields (title, content, tags) through to its
+    cached thread
+    """
+    def patch(thread):
+        thread['post'].update({name: getattr(post, name) for name in fields})
+        thread['post']['version'] = post.version
+        thread['post']['updated_at'] = format_datetime(post.updated_at)
+    
+    write_through(post.post_id, patch)
+
+
+def update_reply(reply, fields):
+    """
+    Write edited reply fields (content) through to its cached thread
+    """
+    def patch(thread):
+        if reply.pk not in thread['reply_pks']:
+            return False
+        data = thread['replies'][thread['reply_pks'].index(reply.pk)]
+        data.update({name: getattr(reply, name) for name in fields})
+        data['version'] = reply.version
+        data['updated_at'] = format_datetime(reply.updated_at)
+    
+    write_through(reply.post.post_id, patch)
+
+
+def set_post_like_count(post):
+    cache.set(post_likes_key(post.pk), post.like_count, THREAD_CACHE_TIMEOUT)
+
+
+def set_reply_like_count(reply):
+    cache.set(reply_likes_key(reply.pk), reply.like_count, THREAD_CACHE_TIMEOUT)
+
+
+def record_view(thread):
+    """
+    Count a view in the counter store and buffer it for the database,
+    which gets it within VIEW_FLUSH_INTERVAL seconds. Returns the
+    current view count.
+    """
+    global _view_flush_timer
+    
+    key = post_views_key(thread['pk'])
+    try:
+        views = cache.incr(key)
+    except ValueError:
+        views = thread['post']['view_count'] + 1
+        cache.set(key, views, THREAD_CACHE_TIMEOUT)
+    
+    with _pending_views_lock:
+        _pending_views[thread['pk']] += 1
+        if _view_flush_timer is None:
+            # Flush on a timer rather than on the next view, so a quiet
+            # or crashing worker loses at most one interval of views
+            _view_flush_timer = threading.Timer(
+                VIEW_FLUSH_INTERVAL, tasks.run_task_in_thread, args=(flush_view_counts,)
+            )
+            _view_flush_timer.daemon = True
+            _view_flush_timer.start()
+    return views
+
+
+def flush_view_counts():
+    """
+    Write buffered view counts (and their hot score weight) to the
+    database in one bulk update per shard, and log them for analytics
+    """
+    global _view_flush_timer
+    
+    with _pending_views_lock:
+        pending = dict(_pending_views)
+        _pending_views.clear()
+        if _view_flush_timer is not None:
+            _view_flush_timer.cancel()
+            _view_flush_timer = None
+    
+    if not pending:
+        return
+    
+    now = timezone.now()
+    category_views = Counter()
+    # Post pks are unique across forum shards, so each shard takes its own
+    for alias in sharding.shard_aliases():
+        with transaction.atomic(using=alias):
+            # Locked, so the hot score builds on the stored one rather
+            # than a copy a concurrent like or reply has since replaced
+            posts = list(
+                ForumPost.objects.using(alias).select_for_update().filter(pk__in=pending)
+                .order_by('pk')
+                .only('pk', 'category_id', 'hot_score', 'hot_score_at')
+            )
+            for post in posts:
+                post.view_count = F('view_count') + pending[post.pk]
+                post.add_hot_score(ranking.VIEW_WEIGHT * pending[post.pk], now)
+                category_views[post.category_id] += pending[post.pk]
+            ForumPost.objects.db_manager(alias).bulk_update(posts, ['view_count', 'hot_score', 'hot_score_at'])
+    analytics.record_counts(EngagementEvent.VIEW, category_views)
+
+
+atexit.register(flush_view_counts)
+
+
+def render_thread(thread, user, views):
+    """
+    Merge volatile counters and the user's likes into a cached thread
+    and return the post detail response body
+    """
+    reply_pks = thread['reply_pks']
+    counters = cache.get_many([post_likes_key(thread['pk'])] + [reply_likes_key(pk) for pk in reply_pks])
+    liked_post_ids, liked_reply_ids = PostLike.liked_ids(user, [thread['pk']], reply_pks)
+    
+    post = dict(
+        thread['post'],
+        view_count=views,
+        like_count=counters.get(post_likes_key(thread['pk']), thread['post']['like_count']),
+        liked_by_me=thread['pk'] in liked_post_ids
+    )
+    replies = [
+        dict(
+            reply,
+            like_count=counters.get(reply_likes_key(pk), reply['like_count']),
+            liked_by_me=pk in liked_reply_ids
+        )
+        for pk, reply in zip(reply_pks, thread['replies'])
+    ]
+    
+    return {
+        'post': post,
+        'replies': replies,
+        'reply_count': len(replies)
+    }
@@ -0,0 +1,236 @@
+"""
+Near-duplicate post detection with MinHash and LSH banding.
+
+A post's title and content are split into word 3-gram shingles and
+summarized by NUM_PERM min-hashes; the fraction of equal positions in
+two signatures estimates the Jaccard similarity of their shingle sets.
+Signatures are cut into BANDS bands of ROWS values and each band is
+hashed into a bucket stored in forum_post_signature_bands, so finding
+candidates for a new post is one indexed (band, bucket) lookup per band
+instead of a scan over all posts. Candidates are then verified against
+their stored signatures.
+
+Checking a post and indexing it happen under cache locks on its band
+buckets (bucket_locks), so two similar posts saved at the same time are
+checked one after the other and the second sees the first.
+
+NumPy is optional: with it, signatures are computed with array
+arithmetic; without it, the same values are computed in pure Python.
+"""
+from array import array
+from contextlib import contextmanager
+from hashlib import blake2b
+from random import Random
+import re
+import time
+import zlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import ForumPost, PostSignature, PostSignatureBand
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+MERSENNE_PRIME = (1 << 31) - 1
+MAX_CANDIDATES = 200
+
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 5
+LOCK_RETRY_DELAY = 0.01
+
+# Fixed seed so signatures are stable across processes and deploys
+_random = Random(0x5eed)
+PERMUTATIONS = [
+    (_random.randrange(1, MERSENNE_PRIME), _random.randrange(0, MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+if np is not None:
+    PERM_A = np.array([a for a, _ in PERMUTATIONS], dtype=np.uint64)[:, None]
+    PERM_B = np.array([b for _, b in PERMUTATIONS], dtype=np.uint64)[:, None]
+
+WORD_RE = re.compile(r'\w+')
+
+
+def get_threshold():
+    return getattr(settings, 'FORUM_DUPLICATE_THRESHOLD', 0.8)
+
+
+def get_action():
+    """
+    'flag' queues near-duplicates for moderators, 'block' rejects them.
+    Re-posts of the author's own post are always rejected.
+    """
+    return getattr(settings, 'FORUM_DUPLICATE_ACTION', 'flag')
+
+
+def shingles(text):
+    """
+    Hashed word 3-grams of text (the whole text for very short ones)
+    """
+    words = WORD_RE.findall(text.casefold())
+    if len(words) < SHINGLE_SIZE:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = [' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return {zlib.crc32(gram.encode('utf-8')) % MERSENNE_PRIME for gram in grams}
+
+
+def post_text(title, content):
+    return f"{title}\n{content}"
+
+
+def compute_signature(text):
+    """
+    MinHash signature of text as a tuple of NUM_PERM ints, or None if
+    the text has no words
+    """
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    
+    if np is not None:
+        values = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        return tuple(((PERM_A * values + PERM_B) % MERSENNE_PRIME).min(axis=1).tolist())
+    
+    return tuple(
+        min((a * value + b) % MERSENNE_PRIME for value in hashes)
+        for a, b in PERMUTATIONS
+    )
+
+
+def pack_signature(signature):
+    return array('I', signature).tobytes()
+
+
+def unpack_signature(data):
+    return tuple(array('I', bytes(data)))
+
+
+def similarity(first, second):
+    """
+    Estimated Jaccard similarity of two signatures
+    """
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERM
+
+
+def band_buckets(signature):
+    """
+    One signed 64-bit bucket key per band
+    """
+    buckets = []
+    for band in range(BANDS):
+        rows = array('I', signature[band * ROWS:(band + 1) * ROWS]).tobytes()
+        digest = blake2b(rows, digest_size=8, salt=band.to_bytes(16, 'big')).digest()
+        buckets.append(int.from_bytes(digest, 'big', signed=True))
+    return buckets
+
+
+class DuplicateCheckBusy(Exception):
+    """
+    A similar post held the band bucket locks for longer than LOCK_WAIT
+    """
+
+
+@contextmanager
+def bucket_locks(signature):
+    """
+    Hold cache locks on the band buckets of signature while checking and
+    indexing a post. Any two posts that could match share a bucket, so
+    they are serialized. Enter it around the transaction, so the locks
+    are released only after the commit. Locks are taken in band order.
+    """
+    held = []
+    try:
+        if signature is not None:
+            for band, bucket in enumerate(band_buckets(signature)):
+                key = f'forums:duplicates:lock:{band}:{bucket}'
+                deadline = time.monotonic() + LOCK_WAIT
+                while not cache.add(key, 1, LOCK_TIMEOUT):
+                    if time.monotonic() > deadline:
+                        raise DuplicateCheckBusy()
+                    time.sleep(LOCK_RETRY_DELAY)
+                held.append(key)
+        yield
+    finally:
+        cache.delete_many(held)
+
+
+def find_duplicates(signature, limit=5, exclude=None):
+    """
+    Active posts whose signature is at least FORUM_DUPLICATE_THRESHOLD
+    similar, best first, as (post pk, similarity) pairs. exclude is a
+    post pk to leave out, for a post being edited.
+    """
+    if signature is None:
+        return []
+    
+    condition = Q()
+    for band, bucket in enumerate(band_buckets(signature)):
+        condition |= Q(band=band, bucket=bucket)
+    
+    candidates = PostSignatureBand.objects.filter(condition, post__is_active=True)
+    if exclude is not None:
+        candidates = candidates.exclude(post_id=exclude)
+    candidate_ids = candidates.values_list('post_id', flat=True).distinct()[:MAX_CANDIDATES]
+    
+    threshold = get_threshold()
+    matches = []
+    for post_pk, packed in PostSignature.objects.filter(post_id__in=candidate_ids).values_list('post_id', 'signature'):
+        score = similarity(signature, unpack_signature(packed))
+        if score >= threshold:
+            matches.append((post_pk, score))
+    
+    matches.sort(key=lambda match: -match[1])
+    return matches[:limit]
+
+
+def find_originals(signature, exclude=None):
+    """
+    The active posts a signature near-duplicates, as
+    [(post_id, author_id), ...] best match first
+    """
+    matches = find_duplicates(signature, exclude=exclude)
+    if not matches:
+        return []
+    
+    originals = dict(
+        (pk, (post_id, author_id))
+        for pk, post_id, author_id in ForumPost.objects.filter(pk__in=[pk for pk, _ in matches])
+        .values_list('pk', 'post_id', 'author_id')
+    )
+    return [originals[pk] for pk, _ in matches if pk in originals]
+
+
+def index_posts(signatures):
+    """
+    Store signatures and band buckets for a {post pk: signature} mapping,
+    replacing any existing entries. A None signature (no words left)
+    just removes the post's entries.
+    """
+    if not signatures:
+        return
+    
+    PostSignatureBand.objects.filter(post_id__in=list(signatures)).delete()
+    PostSignature.objects.filter(post_id__in=list(signatures)).delete()
+    
+    signatures = {post_pk: signature for post_pk, signature in signatures.items() if signature is not None}
+    PostSignature.objects.bulk_create([
+        PostSignature(post_id=post_pk, signature=pack_signature(signature))
+        for post_pk, signature in signatures.items()
+    ])
+    PostSignatureBand.objects.bulk_create([
+        PostSignatureBand(post_id=post_pk, band=band, bucket=bucket)
+        for post_pk, signature in signatures.items()
+        for band, bucket in enumerate(band_buckets(signature))
+    ])
@@ -0,0 +1,99 @@
+"""
+Idempotency-Key support for forum write endpoints.
+
+A client retrying a write sends the same Idempotency-Key header. The
+first response for a (user, method, path, key) is stored in the cache
+for FORUM_IDEMPOTENCY_TTL seconds as a compact (fingerprint, status,
+data) tuple under a hashed key; a retry gets that response back, marked
+with Idempotent-Replayed, without the view running again. Reusing a key
+for a different request body is rejected, and a retry arriving while
+the first request is still running gets a 409.
+
+Records live in the FORUM_IDEMPOTENCY_CACHE cache. With several workers
+that cache has to be shared (Redis or memcached): a per-process
+LocMemCache only catches retries that reach the same worker.
+"""
+from functools import wraps
+from hashlib import blake2b
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+
+TTL = getattr(settings, 'FORUM_IDEMPOTENCY_TTL', 86400)
+CACHE_ALIAS = getattr(settings, 'FORUM_IDEMPOTENCY_CACHE', 'default')
+LOCK_TIMEOUT = 30
+MAX_KEY_LENGTH = 255
+
+
+def store_key(request, key):
+    digest = blake2b(
+        f'{request.user.pk}\n{request.method}\n{request.path}\n{key}'.encode('utf-8'),
+        digest_size=16
+    ).hexdigest()
+    return f'forums:idempotency:{digest}'
+
+
+def fingerprint(request):
+    """
+    Short hash of the request body, to detect a key reused for a
+    different request
+    """
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return blake2b(body.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def idempotent(view):
+    """
+    Replay the stored response for a repeated Idempotency-Key.
+    Apply below @api_view, so it runs after authentication.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({
+                'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        cache = caches[CACHE_ALIAS]
+        cache_key = store_key(request, key)
+        request_fingerprint = fingerprint(request)
+        
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return replay(stored, request_fingerprint)
+        
+        lock_key = f'{cache_key}:lock'
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            return Response({
+                'error': 'A request with this Idempotency-Key is still in progress'
+            }, status=status.HTTP_409_CONFLICT)
+        
+        try:
+            response = view(request, *args, **kwargs)
+            # Server errors are not stored, so the client can retry them
+            if response.status_code < 500:
+                cache.set(cache_key, (request_fingerprint, response.status_code, response.data), TTL)
+        finally:
+            cache.delete(lock_key)
+        return response
+    
+    return wrapper
+
+
+def replay(stored, request_fingerprint):
+    stored_fingerprint, status_code, data = stored
+    if stored_fingerprint != request_fingerprint:
+        return Response({
+            'error': 'Idempotency-Key was already used for a different request'
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    
+    response = Response(data, status=status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from apps.forums import sharding
+from apps.forums.caching import invalidate_category_summaries, invalidate_threads
+from apps.forums.models import ArchivedPost, ForumPost, PostReply, PostTag
+from apps.forums.moderation import iter_id_chunks, recount_tag_ids
+from apps.forums.projections import POST_FIELDS, serialize_posts
+from apps.forums.serializers import PostReplySerializer
+
+
+ARCHIVED_POST_FIELDS = tuple(name for name in POST_FIELDS if name != 'liked_by_me')
+
+
+class Command(BaseCommand):
+    """
+    Move cold threads out of the hot forum tables into ArchivedPost:
+    deactivated posts, and locked threads with no recent activity.
+    Locked threads stay readable through the post detail endpoint.
+    Every forum shard is archived in turn. Meant to run on a schedule
+    (e.g. nightly).
+    """
+    help = 'Archive inactive and old locked forum threads'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--inactive-days', type=int, default=30,
+            help='Archive deactivated posts not updated for this many days'
+        )
+        parser.add_argument(
+            '--locked-days', type=int, default=180,
+            help='Archive locked threads without activity for this many days'
+        )
+        parser.add_argument('--compress', action='store_true', help='zlib-compress archived threads')
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--dry-run', action='store_true')
+    
+    def handle(self, *args, **options):
+        now = timezone.now()
+        candidates = ForumPost.objects.filter(
+            Q(is_active=False, updated_at__lt=now - timedelta(days=options['inactive_days'])) |
+            Q(is_active=True, is_locked=True, last_activity__lt=now - timedelta(days=options['locked_days']))
+        )
+        
+        if options['dry_run']:
+            count = sum(sharding.scatter(lambda alias: candidates.using(alias).count()))
+            self.stdout.write(f'{count} posts would be archived')
+            return
+        
+        archived = 0
+        for _ in sharding.each_shard():
+            for chunk in iter_id_chunks(candidates, options['batch_size']):
+                archived += self.archive_chunk(chunk, options['compress'])
+                self.stdout.write(f'Archived {archived} posts...')
+        
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} posts'))
+    
+    def archive_chunk(self, post_ids, compress):
+        # Archives go to the default database, the posts leave their shard
+        with sharding.atomic():
+            posts = ForumPost.objects.filter(pk__in=post_ids).order_by('pk')
+            documents, _ = serialize_posts(posts, fields=ARCHIVED_POST_FIELDS)
+            documents = {document['post_id']: document for document in documents}
+            
+            replies = {}
+            for reply in PostReply.objects.filter(post_id__in=post_ids).select_related('author').order_by('created_at'):
+                data = PostReplySerializer(reply).data
+                data.pop('liked_by_me')
+                data['is_active'] = reply.is_active
+                replies.setdefault(reply.post_id, []).append(data)
+            
+            archives = []
+            for row in posts.values('id', 'post_id', 'title', 'author_id', 'category_id', 'is_active', 'created_at'):
+                archives.append(ArchivedPost(
+                    post_id=row['post_id'],
+                    title=row['title'],
+                    author_id=row['author_id'],
+                    category_id=row['category_id'],
+                    reason='locked' if row['is_active'] else 'inactive',
+                    is_public=row['is_active'],
+                    is_compressed=compress,
+                    payload=ArchivedPost.pack({
+                        'post': documents[str(row['post_id'])],
+                        'replies': replies.get(row['id'], [])
+                    }, compress),
+                    created_at=row['created_at']
+                ))
+            ArchivedPost.objects.bulk_create(archives)
+            
+            tag_ids = list(PostTag.objects.filter(post_id__in=post_ids).values_list('tag_id', flat=True))
+            ForumPost.objects.filter(pk__in=post_ids).delete()
+            recount_tag_ids(tag_ids)
+        
+        invalidate_threads([archive.post_id for archive in archives])
+        invalidate_category_summaries()
+        
+        return len(archives)
+
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.forums import backfills
+from apps.forums.models import BackfillProgress
+
+
+class Command(BaseCommand):
+    """
+    Fill a new column on a large forum table in short keyset batches.
+    Progress is saved after every batch, so the command can be stopped
+    at any time and run again to continue; readers switch to the column
+    once it reports complete.
+    """
+    help = 'Run or resume an online backfill of a forum table column'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?', help=f"One of: {', '.join(backfills.BACKFILLS)}")
+        parser.add_argument('--batch-size', type=int, default=backfills.BATCH_SIZE)
+        parser.add_argument('--sleep', type=float, default=0.1, help='Seconds to pause between batches')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many rows')
+        parser.add_argument('--restart', action='store_true', help='Discard saved progress and start over')
+        parser.add_argument('--status', action='store_true', help='Show the state of every backfill')
+    
+    def handle(self, *args, **options):
+        if options['status'] or not options['name']:
+            self.show_status()
+            return
+        
+        name = options['name']
+        if name not in backfills.BACKFILLS:
+            raise CommandError(f"Unknown backfill '{name}', expected one of: {', '.join(backfills.BACKFILLS)}")
+        
+        if options['restart']:
+            backfills.reset(name)
+        
+        progress = backfills.run(
+            name,
+            batch_size=options['batch_size'],
+            sleep=options['sleep'],
+            limit=options['limit'],
+            log=self.stdout.write
+        )
+        
+        if progress.completed_at:
+            self.stdout.write(self.style.SUCCESS(f'{name} complete ({progress.rows_done} rows)'))
+        else:
+            self.stdout.write(f'{name} paused at pk {progress.last_pk}, run again to continue')
+    
+    def show_status(self):
+        saved = {progress.name: progress for progress in BackfillProgress.objects.all()}
+        for name, backfill in backfills.BACKFILLS.items():
+            progress = saved.get(name)
+            if progress is None:
+                state = 'not started'
+            elif progress.completed_at:
+                state = f'complete ({progress.rows_done} rows)'
+            else:
+                state = f'{progress.rows_done} rows, up to pk {progress.last_pk}'
+            self.stdout.write(f'{name}: {state} - {backfill.description}')
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from apps.forums.models import ForumPost
+from apps.forums.projections import LIST_FIELDS, POST_FIELDS, parse_post_fields, serialize_posts
+from apps.forums.serializers import ForumPostSerializer
+from mental_health_platform.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    """
+    Compare post-page serialization throughput of ForumPostSerializer
+    with the value-based serializers in apps.forums.projections
+    """
+    help = 'Benchmark forum post list serialization and rendering'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--iterations', type=int, default=200)
+    
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        iterations = options['iterations']
+        
+        posts = ForumPost.objects.filter(is_active=True)
+        if not posts.exists():
+            raise CommandError('No active posts to serialize, create some first')
+        
+        compact_fields, _ = parse_post_fields('full', compact=True)
+        
+        cases = (
+            ('ForumPostSerializer', JSONRenderer(),
+             lambda: ForumPostSerializer(list(posts[:page_size]), many=True).data),
+            ('values serializer', JSONRenderer(),
+             lambda: serialize_posts(posts[:page_size], fields=POST_FIELDS)[0]),
+            ('values serializer + fast renderer', FastJSONRenderer(),
+             lambda: serialize_posts(posts[:page_size], fields=POST_FIELDS)[0]),
+            ('compact + fast renderer', FastJSONRenderer(),
+             lambda: serialize_posts(posts[:page_size], fields=compact_fields, compact=True)),
+            ('list default + fast renderer', FastJSONRenderer(),
+             lambda: serialize_posts(posts[:page_size], fields=LIST_FIELDS)[0]),
+        )
+        
+        baseline = None
+        for name, renderer, serialize in cases:
+            size = len(renderer.render(serialize()))
+            
+            started = time.perf_counter()
+            for _ in range(iterations):
+                renderer.render(serialize())
+            elapsed = time.perf_counter() - started
+            
+            rate = iterations / elapsed
+            baseline = baseline or rate
+            self.stdout.write(
+                f'{name:>34}: {rate:>8,.1f} pages/sec  '
+                f'{rate * page_size:>10,.0f} posts/sec  '
+                f'{size:>7,} bytes/page  x{rate / baseline:.1f}'
+            )
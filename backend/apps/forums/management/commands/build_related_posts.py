@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.forums import related
+from apps.forums.models import ForumPost
+
+
+class Command(BaseCommand):
+    """
+    Recompute hashed TF-IDF vectors for all active posts into the
+    memory-mapped index and refresh every post's related-post list.
+    New posts are added incrementally between runs, so this only needs
+    to run occasionally (e.g. nightly) to refresh IDF weights and drop
+    deactivated posts.
+    """
+    help = 'Rebuild the related-posts index'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Posts vectorized per batch')
+        parser.add_argument('--block-size', type=int, default=512, help='Rows per similarity block')
+        parser.add_argument('--limit', type=int, default=related.RELATED_LIMIT, help='Related posts kept per post')
+    
+    def handle(self, *args, **options):
+        if related.np is None:
+            raise CommandError('build_related_posts requires numpy')
+        
+        started = time.monotonic()
+        count = related.build_index(
+            ForumPost.objects.filter(is_active=True),
+            batch_size=options['batch_size'],
+            block_size=options['block_size'],
+            limit=options['limit'],
+            log=self.stdout.write
+        )
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} posts in {time.monotonic() - started:.1f}s ({related.vectors_path()})'
+        ))
@@ -0,0 +1,171 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from apps.forums import duplicates
+from apps.forums.models import ForumPost, ModerationFlag, PostSignature
+from apps.forums.moderation import iter_id_chunks
+from apps.forums.screening import flag_content
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+# Buckets larger than this are compared against their first member only
+MAX_BUCKET_PAIRS = 50
+
+
+class Command(BaseCommand):
+    """
+    Group existing active posts into clusters of near-duplicates.
+    Posts are paired when they share an LSH bucket and their signatures
+    agree on at least --threshold of positions; pairs are merged with
+    union-find. With NumPy installed, bucketing and signature comparison
+    run on a signature matrix; otherwise in pure Python.
+    """
+    help = 'Find clusters of near-duplicate forum posts'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--index', action='store_true', help='Compute missing signatures first')
+        parser.add_argument('--threshold', type=float, default=None)
+        parser.add_argument('--flag', action='store_true', help='Flag all but the oldest post of each cluster')
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        if options['index']:
+            self.index_missing(options['batch_size'])
+        
+        threshold = options['threshold'] or duplicates.get_threshold()
+        post_pks, signatures = self.load_signatures()
+        self.stdout.write(f'Comparing {len(post_pks)} signatures...')
+        
+        if np is not None:
+            pairs = self.similar_pairs_vectorized(signatures, threshold)
+        else:
+            pairs = self.similar_pairs(signatures, threshold)
+        
+        clusters = self.union(len(post_pks), pairs)
+        clusters = [sorted(post_pks[i] for i in members) for members in clusters]
+        clusters.sort(key=len, reverse=True)
+        
+        post_ids = dict(
+            ForumPost.objects.filter(pk__in=[pk for cluster in clusters for pk in cluster])
+            .values_list('pk', 'post_id')
+        )
+        for cluster in clusters:
+            self.stdout.write(f"{len(cluster)} posts: {', '.join(str(post_ids[pk]) for pk in cluster)}")
+        
+        if options['flag']:
+            flagged = self.flag_clusters(clusters, post_ids)
+            self.stdout.write(f'{flagged} posts flagged')
+        
+        self.stdout.write(self.style.SUCCESS(f'{len(clusters)} duplicate clusters found'))
+    
+    def index_missing(self, batch_size):
+        indexed = 0
+        for chunk in iter_id_chunks(ForumPost.objects.filter(signature=None), batch_size):
+            rows = ForumPost.objects.filter(pk__in=chunk).values_list('pk', 'title', 'content')
+            duplicates.index_posts({
+                pk: duplicates.compute_signature(duplicates.post_text(title, content))
+                for pk, title, content in rows
+            })
+            indexed += len(chunk)
+            self.stdout.write(f'Indexed {indexed} posts...')
+    
+    def load_signatures(self):
+        rows = PostSignature.objects.filter(post__is_active=True).order_by('post_id').values_list('post_id', 'signature')
+        post_pks = []
+        packed = []
+        for pk, signature in rows.iterator(chunk_size=5000):
+            post_pks.append(pk)
+            packed.append(bytes(signature))
+        
+        if np is not None:
+            matrix = np.frombuffer(b''.join(packed), dtype=np.uint32).reshape(len(packed), duplicates.NUM_PERM)
+            return post_pks, matrix
+        return post_pks, [duplicates.unpack_signature(data) for data in packed]
+    
+    def bucket_pairs(self, members):
+        """
+        Candidate pairs within one bucket
+        """
+        if len(members) <= MAX_BUCKET_PAIRS:
+            return [(a, b) for index, a in enumerate(members) for b in members[index + 1:]]
+        return [(members[0], b) for b in members[1:]]
+    
+    def similar_pairs_vectorized(self, matrix, threshold):
+        if not len(matrix):
+            return []
+        
+        candidates = set()
+        for band in range(duplicates.BANDS):
+            rows = np.ascontiguousarray(matrix[:, band * duplicates.ROWS:(band + 1) * duplicates.ROWS])
+            _, bucket_ids, counts = np.unique(rows, axis=0, return_inverse=True, return_counts=True)
+            bucket_ids = bucket_ids.reshape(-1)
+            shared = np.flatnonzero(counts[bucket_ids] > 1)
+            if not len(shared):
+                continue
+            order = shared[np.argsort(bucket_ids[shared], kind='stable')]
+            boundaries = np.flatnonzero(np.diff(bucket_ids[order])) + 1
+            for members in np.split(order, boundaries):
+                candidates.update(self.bucket_pairs(members.tolist()))
+        
+        if not candidates:
+            return []
+        
+        pairs = np.array(sorted(candidates), dtype=np.int64)
+        scores = (matrix[pairs[:, 0]] == matrix[pairs[:, 1]]).mean(axis=1)
+        return pairs[scores >= threshold].tolist()
+    
+    def similar_pairs(self, signatures, threshold):
+        candidates = set()
+        for band in range(duplicates.BANDS):
+            buckets = defaultdict(list)
+            for index, signature in enumerate(signatures):
+                buckets[signature[band * duplicates.ROWS:(band + 1) * duplicates.ROWS]].append(index)
+            for members in buckets.values():
+                if len(members) > 1:
+                    candidates.update(self.bucket_pairs(members))
+        
+        return [
+            (a, b) for a, b in candidates
+            if duplicates.similarity(signatures[a], signatures[b]) >= threshold
+        ]
+    
+    def union(self, size, pairs):
+        """
+        Connected components of the pair graph
+        """
+        parent = list(range(size))
+        
+        def find(node):
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+        
+        for a, b in pairs:
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+        
+        components = defaultdict(list)
+        for node in sorted({node for pair in pairs for node in pair}):
+            components[find(node)].append(node)
+        return list(components.values())
+    
+    def flag_clusters(self, clusters, post_ids):
+        already_flagged = set(
+            ModerationFlag.objects.filter(
+                category='duplicate', reply=None, post_id__in=[pk for cluster in clusters for pk in cluster[1:]]
+            ).values_list('post_id', flat=True)
+        )
+        flagged = 0
+        for cluster in clusters:
+            original = str(post_ids[cluster[0]])
+            for pk in cluster[1:]:
+                if pk not in already_flagged:
+                    flag_content(pk, None, {'duplicate': [original]})
+                    flagged += 1
+        return flagged
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from django.utils import timezone
+from apps.forums.models import ForumPost
+from apps.forums import ranking, sharding
+
+
+class Command(BaseCommand):
+    """
+    Re-base every post's hot score to the current time so stored scores
+    stay comparable, on every forum shard. Meant to run periodically
+    (e.g. every 15 minutes).
+    """
+    help = 'Decay stored hot scores of forum posts to the current time'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute scores from lifetime like, view and reply counts'
+        )
+    
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rebuild = options['rebuild']
+        now = timezone.now()
+        
+        posts = ForumPost.objects.order_by('pk')
+        if rebuild:
+            posts = posts.annotate(active_replies=Count('replies', filter=Q(replies__is_active=True)))
+        else:
+            posts = posts.filter(is_active=True)
+        
+        updated = 0
+        for _ in sharding.each_shard():
+            last_pk = 0
+            
+            # Keyset pagination keeps each batch an index range scan
+            while True:
+                batch = list(posts.filter(pk__gt=last_pk).only(
+                    'pk', 'hot_score', 'hot_score_at', 'like_count', 'view_count', 'last_activity'
+                )[:batch_size])
+                if not batch:
+                    break
+                
+                for post in batch:
+                    if rebuild:
+                        post.hot_score = ranking.initial_score(
+                            post.like_count, post.view_count, post.active_replies, post.last_activity, now
+                        )
+                    else:
+                        post.hot_score = ranking.decayed_score(post.hot_score, post.hot_score_at, now)
+                    post.hot_score_at = now
+                
+                ForumPost.objects.bulk_update(batch, ['hot_score', 'hot_score_at'])
+                updated += len(batch)
+                last_pk = batch[-1].pk
+        
+        self.stdout.write(self.style.SUCCESS(f'Updated hot scores for {updated} posts'))
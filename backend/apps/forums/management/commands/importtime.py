@@ -0,0 +1,50 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from mental_health_platform.startup import measure_imports
+
+
+def package_of(module):
+    """Group django.* and apps.* by subpackage, everything else by top-level package"""
+    parts = module.split('.')
+    return '.'.join(parts[:3 if parts[0] in ('django', 'apps') else 1])
+
+
+class Command(BaseCommand):
+    """
+    Report what a worker spends its boot importing: a fresh interpreter
+    runs django.setup() and the warm-up under `python -X importtime`.
+    Run with --settings=mental_health_platform.settings_production to
+    measure production boot; --budget turns the report into a check.
+    """
+    help = 'Report per-module import time of a worker boot'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help='Number of rows to show')
+        parser.add_argument('--sort', choices=('self', 'cumulative'), default='self')
+        parser.add_argument('--group', action='store_true', help='Sum self time per package')
+        parser.add_argument('--budget', type=float, default=None, help='Fail if boot imports exceed this many ms')
+    
+    def handle(self, *args, **options):
+        timings = measure_imports()
+        total_ms = sum(self_us for _, self_us, _, _ in timings) / 1000
+        
+        if options['group']:
+            packages = Counter()
+            for module, self_us, _, _ in timings:
+                packages[package_of(module)] += self_us
+            self.stdout.write(f"{'self ms':>9}  package")
+            for package, self_us in packages.most_common(options['top']):
+                self.stdout.write(f'{self_us / 1000:>9.1f}  {package}')
+        else:
+            column = 1 if options['sort'] == 'self' else 2
+            rows = sorted(timings, key=lambda timing: timing[column], reverse=True)[:options['top']]
+            self.stdout.write(f"{'self ms':>9} {'cumul ms':>9}  module")
+            for module, self_us, cumulative_us, _ in rows:
+                self.stdout.write(f'{self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}  {module}')
+        
+        self.stdout.write(f'{len(timings)} modules imported in {total_ms:.1f} ms')
+        
+        budget = options['budget']
+        if budget is not None and total_ms > budget:
+            raise CommandError(f'Boot imports took {total_ms:.1f} ms, over the {budget:.1f} ms budget')
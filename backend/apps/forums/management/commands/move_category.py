@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.forums import sharding
+from apps.forums.caching import invalidate_threads
+from apps.forums.models import ForumCategory
+
+
+class Command(BaseCommand):
+    """
+    Move a category's posts, replies and the rows attached to them to
+    another forum shard (FORUM_SHARDS). Writes to the category get a 503
+    while it moves; reads are served from the old shard until the switch.
+    An interrupted move can be run again and picks up where it stopped.
+    """
+    help = 'Move a forum category to another shard'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('category', help='Category slug')
+        parser.add_argument('shard', help='Target database alias from FORUM_SHARDS')
+        parser.add_argument('--batch-size', type=int, default=sharding.MOVE_BATCH_SIZE, help='Posts copied per transaction')
+        parser.add_argument(
+            '--wait', type=float, default=None,
+            help='Seconds to let workers reload the shard map (default FORUM_SHARD_MAP_TTL)'
+        )
+    
+    def handle(self, *args, **options):
+        if not sharding.is_enabled():
+            raise CommandError('Sharding is off: FORUM_SHARDS names a single database')
+        if options['shard'] not in sharding.shard_aliases():
+            raise CommandError(f"'{options['shard']}' is not one of FORUM_SHARDS: {', '.join(sharding.shard_aliases())}")
+        
+        try:
+            category = ForumCategory.objects.get(slug=options['category'])
+        except ForumCategory.DoesNotExist:
+            raise CommandError(f"No category '{options['category']}'")
+        
+        started = time.monotonic()
+        moved = sharding.move_category(
+            category, options['shard'],
+            batch_size=options['batch_size'],
+            wait=options['wait'],
+            log=self.stdout.write
+        )
+        invalidate_threads(moved)
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {len(moved)} posts of '{category.slug}' to {options['shard']} in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,106 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from django.core.management.base import BaseCommand
+from apps.forums import sharding
+from apps.forums.matching import init_worker, scan_rows
+from apps.forums.models import ForumPost, ModerationFlag, PostReply
+from apps.forums.moderation import iter_id_chunks
+from apps.forums.screening import flag_content, get_phrases
+
+
+class Command(BaseCommand):
+    """
+    Re-screen existing posts and replies after the phrase lists change.
+    The main process reads batches with keyset pagination and writes
+    flags; matching runs in a pool of worker processes, each holding its
+    own compiled matcher. Content that already has a flag of the same
+    category is skipped. Every forum shard is scanned in turn.
+    """
+    help = 'Re-scan existing forum content against the screening phrase lists'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--include-inactive', action='store_true')
+        parser.add_argument('--dry-run', action='store_true', help='Report matches without creating flags')
+    
+    def handle(self, *args, **options):
+        phrases = get_phrases()
+        self.dry_run = options['dry_run']
+        
+        posts = ForumPost.objects.all()
+        replies = PostReply.objects.all()
+        if not options['include_inactive']:
+            posts = posts.filter(is_active=True)
+            replies = replies.filter(is_active=True)
+        
+        def scan_shards(map_batches):
+            flagged = Counter()
+            for _ in sharding.each_shard():
+                flagged.update(self.scan(posts, replies, options['batch_size'], map_batches))
+            return flagged
+        
+        if options['workers'] > 1:
+            with ProcessPoolExecutor(options['workers'], initializer=init_worker, initargs=(phrases,)) as executor:
+                flagged = scan_shards(executor.map)
+        else:
+            init_worker(phrases)
+            flagged = scan_shards(map)
+        
+        verb = 'would be flagged' if self.dry_run else 'flagged'
+        self.stdout.write(self.style.SUCCESS(
+            f"{flagged['posts']} posts and {flagged['replies']} replies {verb}"
+        ))
+    
+    def scan(self, posts, replies, batch_size, map_batches):
+        flagged = {'posts': 0, 'replies': 0}
+        
+        def post_batches():
+            for chunk in iter_id_chunks(posts, batch_size):
+                rows = posts.filter(pk__in=chunk).values_list('pk', 'title', 'content')
+                yield [(pk, f"{title}\n{content}") for pk, title, content in rows]
+        
+        def reply_batches():
+            for chunk in iter_id_chunks(replies, batch_size):
+                yield list(replies.filter(pk__in=chunk).values_list('pk', 'content'))
+        
+        for results in map_batches(scan_rows, post_batches()):
+            flagged['posts'] += self.save_flags(results, {pk: (pk, None) for pk, _ in results}, 'post_id')
+        
+        for results in map_batches(scan_rows, reply_batches()):
+            targets = dict(
+                PostReply.objects.filter(pk__in=[pk for pk, _ in results])
+                .values_list('pk', 'post_id')
+            )
+            flagged['replies'] += self.save_flags(
+                results, {pk: (post_id, pk) for pk, post_id in targets.items()}, 'reply_id'
+            )
+        
+        return flagged
+    
+    def save_flags(self, results, targets, column):
+        """
+        Flag matched rows, skipping categories they are already flagged for
+        """
+        if not results:
+            return 0
+        
+        existing = ModerationFlag.objects.filter(**{f'{column}__in': list(targets)})
+        if column == 'post_id':
+            existing = existing.filter(reply=None)
+        existing = set(existing.values_list(column, 'category'))
+        
+        flagged = 0
+        for pk, matches in results:
+            matches = {category: phrases for category, phrases in matches.items() if (pk, category) not in existing}
+            if not matches:
+                continue
+            flagged += 1
+            if not self.dry_run:
+                flag_content(*targets[pk], matches)
+        
+        if flagged:
+            self.stdout.write(f'{flagged} new matches in {len(results)} matched rows...')
+        return flagged
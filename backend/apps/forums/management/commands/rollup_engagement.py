@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.forums import analytics
+
+
+class Command(BaseCommand):
+    """
+    Roll the engagement event log up into the hourly and daily analytics
+    tables. Meant to run every minute or so from a scheduler, or as a
+    background worker with --every.
+    """
+    help = 'Roll up forum engagement events into hourly and daily buckets'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=analytics.ROLLUP_BATCH_SIZE)
+        parser.add_argument('--every', type=float, default=None, help='Keep running, rolling up every N seconds')
+    
+    def handle(self, *args, **options):
+        while True:
+            consumed = analytics.rollup(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Rolled up {consumed} engagement events'))
+            if options['every'] is None:
+                break
+            close_old_connections()
+            time.sleep(options['every'])
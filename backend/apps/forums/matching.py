@@ -0,0 +1,112 @@
+"""
+Multi-phrase matching with an Aho–Corasick automaton.
+
+All phrases are compiled into one trie with failure links, so scanning
+a text is a single pass over its characters whatever the number of
+phrases. Matches only count on word boundaries ("suicide" does not
+match inside "suicidemouse"). This module has no Django imports so the
+re-scan command can build matchers in worker processes.
+"""
+from collections import deque
+
+
+def normalize(text):
+    """
+    Case-fold, unify apostrophes and collapse whitespace
+    """
+    return ' '.join(text.casefold().replace('’', "'").split())
+
+
+def is_boundary(text, index):
+    """
+    True if text[index] is outside the text or not a word character
+    """
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+
+class PhraseMatcher:
+    """
+    Compiled automaton over a {phrase: label} mapping
+    """
+    
+    def __init__(self, phrases):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        
+        for phrase, label in phrases.items():
+            key = normalize(phrase)
+            if not key:
+                continue
+            state = 0
+            for char in key:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                    self.goto[state][char] = next_state
+                state = next_state
+            self.output[state] += ((key, label),)
+        
+        # Breadth-first pass: each state's failure link points at the
+        # longest proper suffix that is also a trie path
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] += self.output[self.fail[next_state]]
+    
+    def __len__(self):
+        return len(self.goto)
+    
+    def find(self, text):
+        """
+        Scan text once and return {label: sorted matched phrases}
+        """
+        text = normalize(text)
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        
+        found = {}
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for phrase, label in output[state]:
+                if is_boundary(text, index + 1) and is_boundary(text, index - len(phrase)):
+                    found.setdefault(label, set()).add(phrase)
+        
+        return {label: sorted(phrases) for label, phrases in found.items()}
+
+
+# Worker process helpers for the re-scan command
+
+_worker_matcher = None
+
+
+def init_worker(phrases):
+    global _worker_matcher
+    _worker_matcher = PhraseMatcher(phrases)
+
+
+def scan_rows(rows):
+    """
+    Match a batch of (pk, text) rows, returning (pk, matches) for the
+    rows with any match
+    """
+    results = []
+    for pk, text in rows:
+        matches = _worker_matcher.find(text)
+        if matches:
+            results.append((pk, matches))
+    return results
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('post_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Forum Tag',
+                'verbose_name_plural': 'Forum Tags',
+                'db_table': 'forum_tags',
+                'ordering': ['-post_count', 'name'],
+                'indexes': [models.Index(fields=['-post_count', 'name'], name='forum_tags_popular_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='forums.forumpost')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_links', to='forums.tag')),
+            ],
+            options={
+                'verbose_name': 'Forum Post Tag',
+                'verbose_name_plural': 'Forum Post Tags',
+                'db_table': 'forum_post_tags',
+                'indexes': [models.Index(fields=['tag', 'post'], name='forum_post_tags_tag_idx')],
+                'unique_together': {('post', 'tag')},
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+def backfill_tags(apps, schema_editor):
+    """
+    Build the normalized tag index from the existing JSON tags
+    """
+    ForumPost = apps.get_model('forums', 'ForumPost')
+    Tag = apps.get_model('forums', 'Tag')
+    PostTag = apps.get_model('forums', 'PostTag')
+    
+    tag_ids = {}
+    post_counts = {}
+    links = []
+    
+    for post in ForumPost.objects.only('id', 'tags', 'is_active').iterator(chunk_size=2000):
+        names = []
+        for name in post.tags if isinstance(post.tags, list) else []:
+            name = ' '.join(str(name).split()).lower()[:50]
+            if name and name not in names:
+                names.append(name)
+        
+        if names != post.tags:
+            ForumPost.objects.filter(pk=post.pk).update(tags=names)
+        
+        for name in names:
+            if name not in tag_ids:
+                tag_ids[name] = Tag.objects.get_or_create(name=name)[0].pk
+            if post.is_active:
+                post_counts[name] = post_counts.get(name, 0) + 1
+            links.append(PostTag(post_id=post.pk, tag_id=tag_ids[name]))
+        
+        if len(links) >= 2000:
+            PostTag.objects.bulk_create(links, ignore_conflicts=True)
+            links = []
+    
+    PostTag.objects.bulk_create(links, ignore_conflicts=True)
+    
+    for name, count in post_counts.items():
+        Tag.objects.filter(pk=tag_ids[name]).update(post_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0002_tag_posttag'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
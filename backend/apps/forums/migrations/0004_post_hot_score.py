@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0003_backfill_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumpost',
+            name='hot_score',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='hot_score_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['category', 'is_active', '-hot_score'], name='forum_posts_cat_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['is_active', '-hot_score'], name='forum_posts_hot_idx'),
+        ),
+    ]
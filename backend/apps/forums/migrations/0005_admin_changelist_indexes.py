@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0004_post_hot_score'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['title'], name='forum_posts_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['-created_at'], name='forum_posts_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postlike',
+            index=models.Index(fields=['-created_at'], name='forum_likes_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postreply',
+            index=models.Index(fields=['-created_at'], name='forum_replies_created_idx'),
+        ),
+    ]
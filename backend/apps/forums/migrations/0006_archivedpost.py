@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('forums', '0005_admin_changelist_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.UUIDField(editable=False, unique=True)),
+                ('title', models.CharField(max_length=200)),
+                ('reason', models.CharField(choices=[('inactive', 'Inactive'), ('locked', 'Locked')], max_length=20)),
+                ('is_public', models.BooleanField(default=False)),
+                ('is_compressed', models.BooleanField(default=False)),
+                ('payload', models.BinaryField()),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('author', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_forum_posts', to=settings.AUTH_USER_MODEL)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_posts', to='forums.forumcategory')),
+            ],
+            options={
+                'verbose_name': 'Archived Forum Post',
+                'verbose_name_plural': 'Archived Forum Posts',
+                'db_table': 'forum_archived_posts',
+                'ordering': ['-archived_at'],
+            },
+        ),
+    ]
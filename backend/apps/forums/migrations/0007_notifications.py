@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('authentication', '0001_initial'),
+        ('forums', '0006_archivedpost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forum_notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Forum Notification Counter',
+                'verbose_name_plural': 'Forum Notification Counters',
+                'db_table': 'forum_notification_counters',
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('kind', models.CharField(choices=[('post_reply', 'Reply to post'), ('reply_reply', 'Reply to reply'), ('post_like', 'Post like'), ('reply_like', 'Reply like')], max_length=20)),
+                ('actor_count', models.IntegerField(default=1)),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_actor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='forums.forumpost')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forum_notifications', to=settings.AUTH_USER_MODEL)),
+                ('reply', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='forums.postreply')),
+            ],
+            options={
+                'verbose_name': 'Forum Notification',
+                'verbose_name_plural': 'Forum Notifications',
+                'db_table': 'forum_notifications',
+                'ordering': ['-updated_at', '-id'],
+                'indexes': [models.Index(fields=['recipient', '-updated_at', '-id'], name='forum_notif_inbox_idx'), models.Index(fields=['recipient', 'kind', 'post', 'is_read'], name='forum_notif_coalesce_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_user_stats(apps, schema_editor):
+    """
+    Compute initial per-user totals with grouped counts
+    """
+    ForumPost = apps.get_model('forums', 'ForumPost')
+    PostReply = apps.get_model('forums', 'PostReply')
+    PostLike = apps.get_model('forums', 'PostLike')
+    UserForumStats = apps.get_model('forums', 'UserForumStats')
+    
+    stats = {}
+    
+    def add(queryset, column, field):
+        rows = queryset.exclude(**{column: None}).order_by().values(column).annotate(total=models.Count('pk'))
+        for row in rows:
+            entry = stats.setdefault(row[column], {'post_count': 0, 'reply_count': 0, 'likes_received': 0})
+            entry[field] += row['total']
+    
+    add(ForumPost.objects.filter(is_active=True), 'author', 'post_count')
+    add(PostReply.objects.filter(is_active=True), 'author', 'reply_count')
+    add(PostLike.objects.all(), 'post__author', 'likes_received')
+    add(PostLike.objects.all(), 'reply__author', 'likes_received')
+    
+    last_posts = ForumPost.objects.order_by().values('author').annotate(latest=models.Max('created_at'))
+    last_replies = PostReply.objects.order_by().values('author').annotate(latest=models.Max('created_at'))
+    last_active = {}
+    for row in list(last_posts) + list(last_replies):
+        last_active[row['author']] = max(row['latest'], last_active.get(row['author'], row['latest']))
+    
+    UserForumStats.objects.bulk_create([
+        UserForumStats(user_id=user_id, last_active_at=last_active.get(user_id), **stats.get(user_id, {}))
+        for user_id in set(stats) | set(last_active)
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('forums', '0007_notifications'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='UserForumStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forum_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.IntegerField(default=0)),
+                ('reply_count', models.IntegerField(default=0)),
+                ('likes_received', models.IntegerField(default=0)),
+                ('last_active_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Forum User Stats',
+                'verbose_name_plural': 'Forum User Stats',
+                'db_table': 'forum_user_stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='forum_posts_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postreply',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='forum_replies_author_idx'),
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
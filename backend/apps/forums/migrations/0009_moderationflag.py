@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('forums', '0008_user_forum_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationFlag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flag_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('category', models.CharField(choices=[('crisis', 'Crisis language'), ('spam', 'Spam')], max_length=20)),
+                ('matched_phrases', models.JSONField(blank=True, default=list)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('resolved', 'Resolved'), ('dismissed', 'Dismissed')], default='open', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='moderation_flags', to='forums.forumpost')),
+                ('reply', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='moderation_flags', to='forums.postreply')),
+                ('resolved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Moderation Flag',
+                'verbose_name_plural': 'Moderation Flags',
+                'db_table': 'forum_moderation_flags',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'category', '-created_at'], name='forum_flags_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0009_moderationflag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSignature',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='forums.forumpost')),
+                ('signature', models.BinaryField()),
+            ],
+            options={
+                'verbose_name': 'Post Signature',
+                'verbose_name_plural': 'Post Signatures',
+                'db_table': 'forum_post_signatures',
+            },
+        ),
+        migrations.AlterField(
+            model_name='moderationflag',
+            name='category',
+            field=models.CharField(choices=[('crisis', 'Crisis language'), ('spam', 'Spam'), ('duplicate', 'Near-duplicate post')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='PostSignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_bands', to='forums.forumpost')),
+            ],
+            options={
+                'verbose_name': 'Post Signature Band',
+                'verbose_name_plural': 'Post Signature Bands',
+                'db_table': 'forum_post_signature_bands',
+                'indexes': [models.Index(fields=['band', 'bucket'], name='forum_sig_bands_bucket_idx')],
+                'unique_together': {('post', 'band')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0010_post_signatures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='forums.forumpost')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='forums.forumpost')),
+            ],
+            options={
+                'verbose_name': 'Related Post',
+                'verbose_name_plural': 'Related Posts',
+                'db_table': 'forum_related_posts',
+                'indexes': [models.Index(fields=['post', '-score'], name='forum_related_score_idx')],
+                'unique_together': {('post', 'related')},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:36
+
+from django.db import migrations, models
+
+
+EXCERPT_LENGTH = 200
+
+
+def backfill_excerpts(apps, schema_editor):
+    """
+    Compute excerpts for existing posts (same rules as models.make_excerpt)
+    """
+    ForumPost = apps.get_model('forums', 'ForumPost')
+    
+    batch = []
+    for post in ForumPost.objects.only('id', 'content').iterator(chunk_size=2000):
+        text = ' '.join(post.content.split())
+        if len(text) > EXCERPT_LENGTH:
+            cut = text[:EXCERPT_LENGTH - 1]
+            if ' ' in cut:
+                cut = cut.rsplit(' ', 1)[0]
+            text = cut.rstrip(' .,;:') + '…'
+        post.excerpt = text
+        batch.append(post)
+        
+        if len(batch) >= 2000:
+            ForumPost.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    
+    ForumPost.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0011_relatedpost'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='forumpost',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
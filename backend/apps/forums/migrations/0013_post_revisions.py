@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('forums', '0012_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumpost',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='postreply',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name='PostRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('changes', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('editor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='forums.forumpost')),
+                ('reply', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='forums.postreply')),
+            ],
+            options={
+                'verbose_name': 'Post Revision',
+                'verbose_name_plural': 'Post Revisions',
+                'db_table': 'forum_post_revisions',
+                'indexes': [models.Index(fields=['post', 'reply', '-version'], name='forum_revisions_post_idx')],
+            },
+        ),
+    ]
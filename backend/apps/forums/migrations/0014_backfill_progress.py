@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0013_post_revisions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_pk', models.BigIntegerField(default=0)),
+                ('rows_done', models.BigIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Backfill Progress',
+                'verbose_name_plural': 'Backfill Progress',
+                'db_table': 'forum_backfills',
+            },
+        ),
+        # Nullable without a default: no table rewrite. Filled in by
+        # `manage.py backfill post_reply_total`.
+        migrations.AddField(
+            model_name='forumpost',
+            name='reply_total',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:42
+
+from django.db import migrations, models
+
+from apps.forums.online_schema import AddIndexOnline
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction
+    atomic = False
+    
+    dependencies = [
+        ('forums', '0014_backfill_progress'),
+    ]
+    
+    operations = [
+        AddIndexOnline(
+            model_name='postreply',
+            index=models.Index(fields=['post', 'is_active'], name='forum_replies_post_active_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0015_reply_post_active_index'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='ShardMap',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shard', serialize=False, to='forums.forumcategory')),
+                ('shard', models.CharField(max_length=100)),
+                ('is_moving', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Shard Map Entry',
+                'verbose_name_plural': 'Shard Map',
+                'db_table': 'forum_shard_map',
+            },
+        ),
+    ]
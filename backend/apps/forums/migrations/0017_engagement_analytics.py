@@ -0,0 +1,68 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0016_shard_map'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='EngagementEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'View'), (2, 'Like'), (3, 'Post'), (4, 'Reply')])),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='forums.forumcategory')),
+            ],
+            options={
+                'verbose_name': 'Engagement Event',
+                'verbose_name_plural': 'Engagement Events',
+                'db_table': 'forum_engagement_events',
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyEngagement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('views', models.BigIntegerField(default=0)),
+                ('likes', models.IntegerField(default=0)),
+                ('posts', models.IntegerField(default=0)),
+                ('replies', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='forums.forumcategory')),
+            ],
+            options={
+                'verbose_name': 'Hourly Engagement',
+                'verbose_name_plural': 'Hourly Engagement',
+                'db_table': 'forum_engagement_hourly',
+                'indexes': [models.Index(fields=['bucket_start'], name='forum_eng_hourly_start_idx')],
+                'unique_together': {('category', 'bucket_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyEngagement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('views', models.BigIntegerField(default=0)),
+                ('likes', models.IntegerField(default=0)),
+                ('posts', models.IntegerField(default=0)),
+                ('replies', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='forums.forumcategory')),
+            ],
+            options={
+                'verbose_name': 'Daily Engagement',
+                'verbose_name_plural': 'Daily Engagement',
+                'db_table': 'forum_engagement_daily',
+                'indexes': [models.Index(fields=['bucket_start'], name='forum_eng_daily_start_idx')],
+                'unique_together': {('category', 'bucket_start')},
+            },
+        ),
+    ]
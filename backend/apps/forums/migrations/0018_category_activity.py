@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_category_activity(apps, schema_editor):
+    """
+    Latest post or reply of each user in each category, from grouped
+    maxima
+    """
+    ForumPost = apps.get_model('forums', 'ForumPost')
+    PostReply = apps.get_model('forums', 'PostReply')
+    CategoryActivity = apps.get_model('forums', 'CategoryActivity')
+    
+    last_active = {}
+    for queryset, category in ((ForumPost.objects, 'category'), (PostReply.objects, 'post__category')):
+        rows = (
+            queryset.filter(is_active=True).order_by()
+            .values_list(category, 'author').annotate(latest=models.Max('created_at'))
+        )
+        for category_id, user_id, latest in rows:
+            key = (category_id, user_id)
+            last_active[key] = max(latest, last_active.get(key, latest))
+    
+    CategoryActivity.objects.bulk_create([
+        CategoryActivity(category_id=category_id, user_id=user_id, last_active_at=latest)
+        for (category_id, user_id), latest in last_active.items()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('forums', '0017_engagement_analytics'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='CategoryActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_active_at', models.DateTimeField()),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='forums.forumcategory')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Category Activity',
+                'verbose_name_plural': 'Category Activity',
+                'db_table': 'forum_category_activity',
+                'indexes': [models.Index(fields=['last_active_at', 'category'], name='forum_cat_activity_recent_idx')],
+                'unique_together': {('category', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_category_activity, migrations.RunPython.noop),
+    ]
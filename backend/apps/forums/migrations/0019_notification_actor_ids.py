@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:35
+
+from django.db import migrations, models
+
+
+def backfill_actor_ids(apps, schema_editor):
+    """
+    Seed unread notifications with their last actor, the only one known
+    """
+    Notification = apps.get_model('forums', 'Notification')
+    
+    batch = []
+    unread = Notification.objects.filter(is_read=False, last_actor__isnull=False)
+    for notification in unread.only('id', 'last_actor_id').iterator(chunk_size=2000):
+        notification.actor_ids = [notification.last_actor_id]
+        batch.append(notification)
+        
+        if len(batch) >= 2000:
+            Notification.objects.bulk_update(batch, ['actor_ids'])
+            batch = []
+    
+    Notification.objects.bulk_update(batch, ['actor_ids'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forums', '0018_category_activity'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(backfill_actor_ids, migrations.RunPython.noop),
+    ]
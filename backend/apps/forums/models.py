@@ -1,6 +1,11 @@
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+import json
 import uuid
+import zlib
+from . import ranking
 
 
 class ForumCategory(models.Model):
@@ -41,6 +46,23 @@ class ForumCategory(models.Model):
         return self.posts.filter(is_active=True).order_by('-created_at').first()
 
 
+EXCERPT_LENGTH = 200
+
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    """
+    Plain-text preview of a post body: whitespace collapsed and cut at a
+    word boundary to at most `length` characters
+    """
+    text = ' '.join(content.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut.rstrip(' .,;:') + '\u2026'
+
+
 class ForumPost(models.Model):
     """
     Main forum posts created by users
@@ -48,6 +70,8 @@ class ForumPost(models.Model):
     post_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     title = models.CharField(max_length=200)
     content = models.TextField()
+    # Derived from content on save, so post lists never read the body
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default='')
     
     # Relationships
     author = models.ForeignKey(
@@ -71,6 +95,17 @@ class ForumPost(models.Model):
     view_count = models.IntegerField(default=0)
     like_count = models.IntegerField(default=0)
     
+    # Bumped by every edit, for optimistic concurrency (see revisions.py)
+    version = models.PositiveIntegerField(default=1)
+    
+    # Active reply count, maintained on write. NULL until the
+    # post_reply_total backfill has reached the row (see backfills.py).
+    reply_total = models.IntegerField(null=True, blank=True)
+    
+    # Trending rank, time-decayed as of hot_score_at (see ranking.py)
+    hot_score = models.FloatField(default=ranking.POST_WEIGHT)
+    hot_score_at = models.DateTimeField(default=timezone.now)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -81,10 +116,28 @@ class ForumPost(models.Model):
         verbose_name = 'Forum Post'
         verbose_name_plural = 'Forum Posts'
         ordering = ['-is_pinned', '-last_activity']
+        indexes = [
+            models.Index(fields=['category', 'is_active', '-hot_score'], name='forum_posts_cat_hot_idx'),
+            models.Index(fields=['is_active', '-hot_score'], name='forum_posts_hot_idx'),
+            models.Index(fields=['title'], name='forum_posts_title_idx'),
+            models.Index(fields=['-created_at'], name='forum_posts_created_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='forum_posts_author_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} by {self.author.username}"
     
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.reply_total is None:
+            self.reply_total = 0
+        # Counter and score saves leave the content, and the excerpt, alone
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.excerpt = make_excerpt(self.content)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+    
     @property
     def reply_count(self):
         """Get number of replies to this post"""
@@ -98,7 +151,50 @@ class ForumPost(models.Model):
     def increment_view_count(self):
         """Increment view count when post is viewed"""
         self.view_count += 1
-        self.save(update_fields=['view_count'])
+        self.add_hot_score(ranking.VIEW_WEIGHT)
+        self.save(update_fields=['view_count', 'hot_score', 'hot_score_at'])
+    
+    def add_hot_score(self, weight, now=None):
+        """
+        Decay the stored hot score to now and add an engagement weight.
+        Callers save hot_score and hot_score_at with their own update.
+        """
+        now = now or timezone.now()
+        self.hot_score = max(0.0, ranking.decayed_score(self.hot_score, self.hot_score_at, now) + weight)
+        self.hot_score_at = now
+    
+    def sync_tags(self):
+        """
+        Mirror the JSON tags list into the normalized Tag/PostTag index.
+        The JSON field is kept (normalized) for API compatibility.
+        """
+        names = Tag.normalize_list(self.tags)
+        if names != self.tags:
+            self.tags = names
+            self.save(update_fields=['tags'])
+        
+        current = dict(self.tag_links.values_list('tag__name', 'tag_id'))
+        added = [name for name in names if name not in current]
+        removed = [tag_id for name, tag_id in current.items() if name not in names]
+        
+        if added:
+            Tag.objects.bulk_create([Tag(name=name) for name in added], ignore_conflicts=True)
+            tags = Tag.objects.filter(name__in=added)
+            if tags.db != self._state.db:
+                # The post is on a category shard: copy the tags there
+                # for the link rows to point at (see sharding.py)
+                Tag.objects.using(self._state.db).bulk_create(list(tags), ignore_conflicts=True)
+            PostTag.objects.bulk_create(
+                [PostTag(post=self, tag=tag) for tag in tags],
+                ignore_conflicts=True
+            )
+            if self.is_active:
+                tags.update(post_count=models.F('post_count') + 1)
+        
+        if removed:
+            PostTag.objects.filter(post=self, tag_id__in=removed).delete()
+            if self.is_active:
+                Tag.objects.filter(id__in=removed).update(post_count=models.F('post_count') - 1)
 
 
 class PostReply(models.Model):
@@ -130,6 +226,7 @@ class PostReply(models.Model):
     # Reply metadata
     is_active = models.BooleanField(default=True)
     like_count = models.IntegerField(default=0)
+    version = models.PositiveIntegerField(default=1)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -140,6 +237,11 @@ class PostReply(models.Model):
         verbose_name = 'Forum Reply'
         verbose_name_plural = 'Forum Replies'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='forum_replies_created_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='forum_replies_author_idx'),
+            models.Index(fields=['post', 'is_active'], name='forum_replies_post_active_idx'),
+        ]
     
     def __str__(self):
         return f"Reply by {self.author.username} on {self.post.title}"
@@ -150,6 +252,86 @@ class PostReply(models.Model):
         return self.parent_reply is not None
 
 
+class Tag(models.Model):
+    """
+    Normalized tag used to index forum posts
+    """
+    MAX_LENGTH = 50
+    
+    name = models.CharField(max_length=MAX_LENGTH, unique=True)
+    
+    # Denormalized number of active posts carrying this tag
+    post_count = models.IntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'forum_tags'
+        verbose_name = 'Forum Tag'
+        verbose_name_plural = 'Forum Tags'
+        ordering = ['-post_count', 'name']
+        indexes = [
+            models.Index(fields=['-post_count', 'name'], name='forum_tags_popular_idx'),
+        ]
+    
+    def __str__(self):
+        return self.name
+    
+    @classmethod
+    def normalize(cls, name):
+        """Lowercase and collapse whitespace so 'Sad ' and 'sad' are one tag"""
+        return ' '.join(str(name).split()).lower()[:cls.MAX_LENGTH]
+    
+    @classmethod
+    def normalize_list(cls, names):
+        """Normalize a list of tag names, dropping blanks and duplicates"""
+        normalized = []
+        for name in names or []:
+            name = cls.normalize(name)
+            if name and name not in normalized:
+                normalized.append(name)
+        return normalized
+    
+    @classmethod
+    def prefix_filter(cls, prefix):
+        """
+        Range lookup equivalent to startswith that can use the plain
+        B-tree index on name on every database backend
+        """
+        prefix = cls.normalize(prefix)
+        return models.Q(name__gte=prefix, name__lt=prefix + '\uffff')
+
+
+class PostTag(models.Model):
+    """
+    Link table between posts and normalized tags
+    """
+    post = models.ForeignKey(
+        ForumPost,
+        on_delete=models.CASCADE,
+        related_name='tag_links'
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_links'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'forum_post_tags'
+        verbose_name = 'Forum Post Tag'
+        verbose_name_plural = 'Forum Post Tags'
+        unique_together = [['post', 'tag']]
+        indexes = [
+            models.Index(fields=['tag', 'post'], name='forum_post_tags_tag_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.tag.name} on {self.post.title}"
+
+
 class PostLike(models.Model):
     """
     Track user likes on posts and replies
@@ -185,8 +367,533 @@ class PostLike(models.Model):
             ['user', 'post'],
             ['user', 'reply']
         ]
+        indexes = [
+            models.Index(fields=['-created_at'], name='forum_likes_created_idx'),
+        ]
     
     def __str__(self):
         if self.post:
             return f"{self.user.username} liked post: {self.post.title}"
-        return f"{self.user.username} liked reply: {self.reply.reply_id}"
\ No newline at end of file
+        return f"{self.user.username} liked reply: {self.reply.reply_id}"
+    
+    @classmethod
+    def liked_ids(cls, user, post_ids=(), reply_ids=()):
+        """
+        Get which of the given post and reply primary keys user has liked,
+        using one query for each kind instead of one per row
+        """
+        liked_post_ids = set()
+        liked_reply_ids = set()
+        
+        if user is None or not user.is_authenticated:
+            return liked_post_ids, liked_reply_ids
+        
+        if post_ids:
+            liked_post_ids = set(
+                cls.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True)
+            )
+        if reply_ids:
+            liked_reply_ids = set(
+                cls.objects.filter(user=user, reply_id__in=reply_ids).values_list('reply_id', flat=True)
+            )
+        
+        return liked_post_ids, liked_reply_ids
+
+
+class ArchivedPost(models.Model):
+    """
+    Cold storage for threads moved out of forum_posts/forum_replies.
+    The thread is kept as one JSON document, optionally zlib-compressed.
+    """
+    REASON_CHOICES = [
+        ('inactive', 'Inactive'),
+        ('locked', 'Locked'),
+    ]
+    
+    post_id = models.UUIDField(unique=True, editable=False)
+    title = models.CharField(max_length=200)
+    
+    # Relationships (kept nullable so archives outlive users/categories)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='archived_forum_posts'
+    )
+    category = models.ForeignKey(
+        ForumCategory,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='archived_posts'
+    )
+    
+    # Archive metadata
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    is_public = models.BooleanField(default=False)  # served through post detail read-through
+    is_compressed = models.BooleanField(default=False)
+    payload = models.BinaryField()
+    
+    # Timestamps
+    created_at = models.DateTimeField()  # of the original post
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'forum_archived_posts'
+        verbose_name = 'Archived Forum Post'
+        verbose_name_plural = 'Archived Forum Posts'
+        ordering = ['-archived_at']
+    
+    def __str__(self):
+        return f"{self.title} (archived)"
+    
+    @staticmethod
+    def pack(data, compress=False):
+        """Encode a thread document for the payload column"""
+        raw = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode('utf-8')
+        return zlib.compress(raw, 6) if compress else raw
+    
+    @property
+    def thread(self):
+        """Decode the archived thread document"""
+        raw = bytes(self.payload)
+        if self.is_compressed:
+            raw = zlib.decompress(raw)
+        return json.loads(raw)
+
+
+class Notification(models.Model):
+    """
+    Inbox entry telling a user about replies and likes on their content.
+    Repeated events on the same target coalesce into one unread entry.
+    """
+    KIND_CHOICES = [
+        ('post_reply', 'Reply to post'),
+        ('reply_reply', 'Reply to reply'),
+        ('post_like', 'Post like'),
+        ('reply_like', 'Reply like'),
+    ]
+    
+    notification_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    
+    # Relationships
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='forum_notifications'
+    )
+    post = models.ForeignKey(
+        ForumPost,
+        on_delete=models.CASCADE,
+        related_name='notifications'
+    )
+    reply = models.ForeignKey(
+        PostReply,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='notifications'
+    )  # the recipient's reply, for reply_reply and reply_like
+    last_actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+'
+    )
+    
+    # Coalescing
+    actor_count = models.IntegerField(default=1)
+    actor_ids = models.JSONField(default=list, blank=True)  # distinct users behind an unread entry
+    is_read = models.BooleanField(default=False)
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)  # time of the latest coalesced event
+    
+    class Meta:
+        db_table = 'forum_notifications'
+        verbose_name = 'Forum Notification'
+        verbose_name_plural = 'Forum Notifications'
+        ordering = ['-updated_at', '-id']
+        indexes = [
+            models.Index(fields=['recipient', '-updated_at', '-id'], name='forum_notif_inbox_idx'),
+            models.Index(fields=['recipient', 'kind', 'post', 'is_read'], name='forum_notif_coalesce_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} for {self.recipient.username}"
+
+
+class NotificationCounter(models.Model):
+    """
+    Unread notification count per user, kept up to date on writes so the
+    inbox never needs a COUNT query
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='forum_notification_counter'
+    )
+    unread_count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'forum_notification_counters'
+        verbose_name = 'Forum Notification Counter'
+        verbose_name_plural = 'Forum Notification Counters'
+    
+    def __str__(self):
+        return f"{self.unread_count} unread for {self.user.username}"
+    
+    @classmethod
+    def get_unread_count(cls, user):
+        return cls.objects.filter(user=user).values_list('unread_count', flat=True).first() or 0
+
+
+class UserForumStats(models.Model):
+    """
+    Per-user forum activity totals, adjusted incrementally on writes and
+    moderation (see activity.py) so profiles never aggregate the forum
+    tables
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='forum_stats'
+    )
+    post_count = models.IntegerField(default=0)
+    reply_count = models.IntegerField(default=0)
+    likes_received = models.IntegerField(default=0)
+    last_active_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'forum_user_stats'
+        verbose_name = 'Forum User Stats'
+        verbose_name_plural = 'Forum User Stats'
+    
+    def __str__(self):
+        return f"Forum stats for {self.user.username}"
+
+
+class CategoryActivity(models.Model):
+    """
+    When a user last posted or replied in a category, upserted on writes
+    (see activity.py), so a category's active users are one indexed count
+    """
+    category = models.ForeignKey(ForumCategory, on_delete=models.CASCADE, related_name='+')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    last_active_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'forum_category_activity'
+        verbose_name = 'Category Activity'
+        verbose_name_plural = 'Category Activity'
+        unique_together = [['category', 'user']]
+        indexes = [
+            models.Index(fields=['last_active_at', 'category'], name='forum_cat_activity_recent_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} in {self.category_id} at {self.last_active_at}"
+
+
+class ModerationFlag(models.Model):
+    """
+    Moderator queue entry raised by content screening (see screening.py)
+    """
+    CATEGORY_CHOICES = [
+        ('crisis', 'Crisis language'),
+        ('spam', 'Spam'),
+        ('duplicate', 'Near-duplicate post'),
+    ]
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('resolved', 'Resolved'),
+        ('dismissed', 'Dismissed'),
+    ]
+    
+    flag_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    matched_phrases = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    
+    # Relationships
+    post = models.ForeignKey(
+        ForumPost,
+        on_delete=models.CASCADE,
+        related_name='moderation_flags'
+    )
+    reply = models.ForeignKey(
+        PostReply,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='moderation_flags'
+    )  # set when the flagged content is a reply
+    resolved_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'forum_moderation_flags'
+        verbose_name = 'Moderation Flag'
+        verbose_name_plural = 'Moderation Flags'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'category', '-created_at'], name='forum_flags_queue_idx'),
+        ]
+    
+    def __str__(self):
+        target = f"reply {self.reply_id}" if self.reply_id else f"post {self.post_id}"
+        return f"{self.get_category_display()} on {target}"
+
+
+class PostSignature(models.Model):
+    """
+    MinHash signature of a post's text (see duplicates.py), packed as
+    NUM_PERM unsigned 32-bit ints
+    """
+    post = models.OneToOneField(
+        ForumPost,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature'
+    )
+    signature = models.BinaryField()
+    
+    class Meta:
+        db_table = 'forum_post_signatures'
+        verbose_name = 'Post Signature'
+        verbose_name_plural = 'Post Signatures'
+    
+    def __str__(self):
+        return f"Signature of post {self.post_id}"
+
+
+class PostSignatureBand(models.Model):
+    """
+    LSH band bucket of a post signature; posts sharing any (band, bucket)
+    are near-duplicate candidates
+    """
+    post = models.ForeignKey(
+        ForumPost,
+        on_delete=models.CASCADE,
+        related_name='signature_bands'
+    )
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+    
+    class Meta:
+        db_table = 'forum_post_signature_bands'
+        verbose_name = 'Post Signature Band'
+        verbose_name_plural = 'Post Signature Bands'
+        unique_together = [['post', 'band']]
+        indexes = [
+            models.Index(fields=['band', 'bucket'], name='forum_sig_bands_bucket_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Band {self.band} of post {self.post_id}"
+
+
+class RelatedPost(models.Model):
+    """
+    Precomputed nearest neighbour of a post by text similarity
+    (see related.py)
+    """
+    post = models.ForeignKey(
+        ForumPost,
+        on_delete=models.CASCADE,
+        related_name='related_links'
+    )
+    related = models.ForeignKey(
+        ForumPost,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()  # cosine similarity
+    
+    class Meta:
+        db_table = 'forum_related_posts'
+        verbose_name = 'Related Post'
+        verbose_name_plural = 'Related Posts'
+        unique_together = [['post', 'related']]
+        indexes = [
+            models.Index(fields=['post', '-score'], name='forum_related_score_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.post_id} -> {self.related_id} ({self.score:.2f})"
+
+
+class PostRevision(models.Model):
+    """
+    Append-only edit history of a post or reply. Each row holds the
+    changes that turn version + 1 back into `version`, as word-level
+    deltas for text fields (see revisions.py).
+    """
+    post = models.ForeignKey(
+        ForumPost,
+        on_delete=models.CASCADE,
+        related_name='revisions'
+    )
+    reply = models.ForeignKey(
+        PostReply,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='revisions'
+    )  # set when the edited content is a reply
+    version = models.PositiveIntegerField()
+    changes = models.JSONField(default=dict)
+    editor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'forum_post_revisions'
+        verbose_name = 'Post Revision'
+        verbose_name_plural = 'Post Revisions'
+        indexes = [
+            models.Index(fields=['post', 'reply', '-version'], name='forum_revisions_post_idx'),
+        ]
+    
+    def __str__(self):
+        target = f"reply {self.reply_id}" if self.reply_id else f"post {self.post_id}"
+        return f"Version {self.version} of {target}"
+
+
+class BackfillProgress(models.Model):
+    """
+    Resumable state of a keyset backfill (see backfills.py)
+    """
+    name = models.CharField(max_length=100, unique=True)
+    last_pk = models.BigIntegerField(default=0)
+    rows_done = models.BigIntegerField(default=0)
+    
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'forum_backfills'
+        verbose_name = 'Backfill Progress'
+        verbose_name_plural = 'Backfill Progress'
+    
+    def __str__(self):
+        state = 'complete' if self.completed_at else f'at pk {self.last_pk}'
+        return f"{self.name} ({state})"
+
+
+class ShardMap(models.Model):
+    """
+    Database holding a category's posts, replies and likes when forum
+    content is sharded by category (see sharding.py). Categories without
+    an entry live on the default database.
+    """
+    category = models.OneToOneField(
+        ForumCategory,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='shard'
+    )
+    shard = models.CharField(max_length=100)  # database alias
+    # Set while move_category copies the category; writes are refused
+    is_moving = models.BooleanField(default=False)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'forum_shard_map'
+        verbose_name = 'Shard Map Entry'
+        verbose_name_plural = 'Shard Map'
+    
+    def __str__(self):
+        return f"{self.category} on {self.shard}"
+
+
+class EngagementEvent(models.Model):
+    """
+    Append-only log of forum engagement, consumed by the analytics
+    rollup (see analytics.py). Views are logged in batches, one row per
+    category and flush.
+    """
+    VIEW = 1
+    LIKE = 2
+    POST = 3
+    REPLY = 4
+    KIND_CHOICES = [
+        (VIEW, 'View'),
+        (LIKE, 'Like'),
+        (POST, 'Post'),
+        (REPLY, 'Reply'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    category = models.ForeignKey(ForumCategory, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'forum_engagement_events'
+        verbose_name = 'Engagement Event'
+        verbose_name_plural = 'Engagement Events'
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} x{self.count} in {self.category_id} at {self.created_at}"
+
+
+class EngagementBucket(models.Model):
+    """
+    Engagement totals of one category over one time bucket (UTC)
+    """
+    category = models.ForeignKey(ForumCategory, on_delete=models.CASCADE, related_name='+')
+    bucket_start = models.DateTimeField()
+    views = models.BigIntegerField(default=0)
+    likes = models.IntegerField(default=0)
+    posts = models.IntegerField(default=0)
+    replies = models.IntegerField(default=0)
+    
+    class Meta:
+        abstract = True
+    
+    def __str__(self):
+        return f"{self.category_id} from {self.bucket_start}"
+
+
+class HourlyEngagement(EngagementBucket):
+    class Meta:
+        db_table = 'forum_engagement_hourly'
+        verbose_name = 'Hourly Engagement'
+        verbose_name_plural = 'Hourly Engagement'
+        unique_together = [['category', 'bucket_start']]
+        indexes = [
+            models.Index(fields=['bucket_start'], name='forum_eng_hourly_start_idx'),
+        ]
+
+
+class DailyEngagement(EngagementBucket):
+    class Meta:
+        db_table = 'forum_engagement_daily'
+        verbose_name = 'Daily Engagement'
+        verbose_name_plural = 'Daily Engagement'
+        unique_together = [['category', 'bucket_start']]
+        indexes = [
+            models.Index(fields=['bucket_start'], name='forum_eng_daily_start_idx'),
+        ]
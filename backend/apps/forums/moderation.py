@@ -0,0 +1,267 @@
+"""
+Set-based bulk moderation.
+
+Every operation walks the target ids in primary key order, CHUNK_SIZE
+at a time, and applies one UPDATE (or DELETE) per table per chunk.
+Denormalized counters and last_activity for the touched posts, replies
+and tags are then recomputed with correlated subqueries in the same
+chunk, so no model instances are loaded. Per-user activity totals are
+adjusted by grouped per-author deltas taken before each change. Post
+updates set updated_at, which the typeahead index syncs from.
+
+With forum sharding, each operation acts on the current shard (see
+sharding.use_shard); remove_user_content visits every shard.
+"""
+from django.db import router
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import activity, sharding
+from .caching import invalidate_category_summaries, invalidate_threads
+from .models import ForumPost, PostLike, PostReply, PostTag, Tag
+
+
+CHUNK_SIZE = 1000
+
+POST_ACTIONS = {
+    'lock': {'is_locked': True},
+    'unlock': {'is_locked': False},
+    'pin': {'is_pinned': True},
+    'unpin': {'is_pinned': False},
+}
+
+
+def iter_id_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yield lists of primary keys from queryset using keyset pagination
+    """
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1]
+
+
+def count_subquery(queryset, column):
+    """
+    Correlated COUNT(*) of queryset rows whose column matches the outer pk
+    """
+    counts = queryset.filter(**{column: OuterRef('pk')}).order_by().values(column).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def recount_post_likes(post_ids):
+    ForumPost.objects.filter(pk__in=post_ids).update(
+        like_count=count_subquery(PostLike.objects.all(), 'post')
+    )
+
+
+def recount_reply_likes(reply_ids):
+    PostReply.objects.filter(pk__in=reply_ids).update(
+        like_count=count_subquery(PostLike.objects.all(), 'reply')
+    )
+
+
+def recount_post_replies(post_ids):
+    ForumPost.objects.filter(pk__in=post_ids).update(
+        reply_total=count_subquery(PostReply.objects.filter(is_active=True), 'post')
+    )
+
+
+def refresh_last_activity(post_ids):
+    """
+    Reset last_activity to the newest active reply (or the post itself)
+    """
+    latest_reply = (
+        PostReply.objects.filter(post=OuterRef('pk'), is_active=True)
+        .order_by()
+        .values('post')
+        .annotate(latest=Max('created_at'))
+        .values('latest')
+    )
+    ForumPost.objects.filter(pk__in=post_ids).update(
+        last_activity=Coalesce(Subquery(latest_reply), F('created_at'))
+    )
+
+
+def recount_tags(post_ids):
+    """
+    Recount active posts for every tag attached to the given posts
+    """
+    recount_tag_ids(PostTag.objects.filter(post_id__in=post_ids).values_list('tag_id', flat=True))
+
+
+def recount_tag_ids(tag_ids):
+    """
+    Recount active posts for the given tags
+    """
+    if not sharding.is_enabled():
+        Tag.objects.filter(pk__in=tag_ids).update(
+            post_count=count_subquery(PostTag.objects.filter(post__is_active=True), 'tag')
+        )
+        return
+    
+    # Tags live on the default database, their posts on every shard
+    tag_ids = list(tag_ids)
+    
+    def count_links(alias):
+        return (
+            PostTag.objects.using(alias).filter(tag_id__in=tag_ids, post__is_active=True)
+            .order_by().values('tag_id').annotate(total=Count('pk')).values_list('tag_id', 'total')
+        )
+    
+    counts = {}
+    for rows in sharding.scatter(lambda alias: list(count_links(alias))):
+        for tag_id, total in rows:
+            counts[tag_id] = counts.get(tag_id, 0) + total
+    tags = list(Tag.objects.filter(pk__in=tag_ids).only('pk'))
+    for tag in tags:
+        tag.post_count = counts.get(tag.pk, 0)
+    Tag.objects.bulk_update(tags, ['post_count'])
+
+
+def invalidate_post_threads(post_ids):
+    """
+    Drop cached post detail threads for the given post primary keys,
+    and the category summary their counts feed
+    """
+    invalidate_threads(ForumPost.objects.filter(pk__in=post_ids).values_list('post_id', flat=True))
+    invalidate_category_summaries()
+
+
+class CrossShardMove(Exception):
+    """
+    Posts can't be moved to a category on another forum shard; the
+    whole category moves with `manage.py move_category` instead
+    """
+
+
+def update_posts(posts, **changes):
+    """
+    Apply a plain column update (lock, pin, move, ...) to posts
+    """
+    category = changes.get('category')
+    if (
+        category is not None
+        and sharding.db_for_category(category.pk) != router.db_for_write(ForumPost)
+        and posts.exists()
+    ):
+        raise CrossShardMove(f'{category} is on another forum shard')
+    
+    updated = 0
+    for chunk in iter_id_chunks(posts):
+        updated += ForumPost.objects.filter(pk__in=chunk).update(updated_at=timezone.now(), **changes)
+        invalidate_post_threads(chunk)
+    return updated
+
+
+def set_posts_active(posts, is_active):
+    """
+    Deactivate (or restore) posts. Deactivation cascades to their
+    replies; restoring brings back the posts only.
+    """
+    updated = 0
+    for chunk in iter_id_chunks(posts):
+        with sharding.atomic():
+            sign = 1 if is_active else -1
+            activity.apply_deltas('post_count', activity.author_counts(
+                ForumPost.objects.filter(pk__in=chunk, is_active=not is_active)
+            ), sign)
+            updated += ForumPost.objects.filter(pk__in=chunk).update(is_active=is_active, updated_at=timezone.now())
+            if not is_active:
+                replies = PostReply.objects.filter(post_id__in=chunk, is_active=True)
+                activity.apply_deltas('reply_count', activity.author_counts(replies), sign)
+                replies.update(is_active=False)
+                recount_post_replies(chunk)
+            recount_tags(chunk)
+        invalidate_post_threads(chunk)
+    return updated
+
+
+def descendant_reply_ids(reply_ids):
+    """
+    Ids of every reply nested below reply_ids, at any depth, one query
+    per level (per CHUNK_SIZE parents)
+    """
+    seen = set(reply_ids)
+    descendants = []
+    level = list(reply_ids)
+    while level:
+        children = []
+        for start in range(0, len(level), CHUNK_SIZE):
+            children += PostReply.objects.filter(
+                parent_reply_id__in=level[start:start + CHUNK_SIZE]
+            ).values_list('pk', flat=True)
+        level = [pk for pk in children if pk not in seen]
+        seen.update(level)
+        descendants += level
+    return descendants
+
+
+def set_replies_active(replies, is_active):
+    """
+    Deactivate (or restore) replies. Deactivation cascades to every
+    reply nested below them, however deep.
+    """
+    updated = 0
+    for chunk in iter_id_chunks(replies):
+        with sharding.atomic():
+            sign = 1 if is_active else -1
+            activity.apply_deltas('reply_count', activity.author_counts(
+                PostReply.objects.filter(pk__in=chunk, is_active=not is_active)
+            ), sign)
+            updated += PostReply.objects.filter(pk__in=chunk).update(is_active=is_active)
+            if not is_active:
+                descendants = descendant_reply_ids(chunk)
+                for start in range(0, len(descendants), CHUNK_SIZE):
+                    nested = PostReply.objects.filter(pk__in=descendants[start:start + CHUNK_SIZE], is_active=True)
+                    activity.apply_deltas('reply_count', activity.author_counts(nested), sign)
+                    nested.update(is_active=False)
+            post_ids = list(PostReply.objects.filter(pk__in=chunk).values_list('post_id', flat=True).distinct())
+            recount_post_replies(post_ids)
+            refresh_last_activity(post_ids)
+        invalidate_post_threads(post_ids)
+    return updated
+
+
+def delete_likes(likes):
+    """
+    Delete likes and recount the posts and replies they pointed at
+    """
+    deleted = 0
+    for chunk in iter_id_chunks(likes):
+        with sharding.atomic():
+            targets = PostLike.objects.filter(pk__in=chunk)
+            post_ids = list(targets.exclude(post=None).values_list('post_id', flat=True).distinct())
+            reply_ids = list(targets.exclude(reply=None).values_list('reply_id', flat=True).distinct())
+            activity.apply_deltas('likes_received', activity.author_counts(targets, 'post__author'), -1)
+            activity.apply_deltas('likes_received', activity.author_counts(targets, 'reply__author'), -1)
+            deleted += targets.delete()[0]
+            recount_post_likes(post_ids)
+            recount_reply_likes(reply_ids)
+        invalidate_post_threads(post_ids + list(
+            PostReply.objects.filter(pk__in=reply_ids).values_list('post_id', flat=True)
+        ))
+    return deleted
+
+
+def remove_user_content(user):
+    """
+    Remove a spam wave by one user: deactivate their posts (and all
+    replies under them) and replies, and delete their likes, on every
+    shard
+    """
+    def remove(alias):
+        return {
+            'posts': set_posts_active(ForumPost.objects.filter(author=user, is_active=True), False),
+            'replies': set_replies_active(PostReply.objects.filter(author=user, is_active=True), False),
+            'likes': delete_likes(PostLike.objects.filter(user=user)),
+        }
+    
+    removed = sharding.scatter(remove)
+    return {kind: sum(shard_removed[kind] for shard_removed in removed) for kind in ('posts', 'replies', 'likes')}
@@ -0,0 +1,210 @@
+"""
+Notification fan-out for replies and likes.
+
+Views schedule notify_reply()/notify_like() with tasks.run_after_commit.
+Each call turns one forum event into notification events for the
+affected users and delivers them in one batch: unread notifications for
+the same target are coalesced ("5 people liked your post"), new ones
+are bulk inserted, and per-user unread counters are bumped with one
+UPDATE per distinct increment.
+
+An unread notification keeps the ids of the distinct users behind it,
+so the same user acting twice counts once, and retract_like() takes an
+unliking user back out (dropping the notification when nobody is left).
+"""
+from collections import Counter, defaultdict, namedtuple
+
+from django.db import router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import sharding
+from .models import ForumPost, Notification, NotificationCounter, PostLike, PostReply
+
+
+Event = namedtuple('Event', ['recipient_id', 'kind', 'post_id', 'reply_id', 'actor_id'])
+
+
+def deliver(events):
+    """
+    Coalesce events into unread notifications or insert new ones
+    """
+    events = [event for event in events if event.recipient_id != event.actor_id]
+    if not events:
+        return
+    
+    now = timezone.now()
+    
+    with transaction.atomic(using=router.db_for_write(Notification)):
+        targets = Q()
+        for event in events:
+            targets |= Q(
+                recipient_id=event.recipient_id,
+                kind=event.kind,
+                post_id=event.post_id,
+                reply_id=event.reply_id
+            )
+        
+        unread = {
+            (n.recipient_id, n.kind, n.post_id, n.reply_id): n
+            for n in Notification.objects.select_for_update().filter(targets, is_read=False)
+        }
+        
+        created = {}
+        coalesced = {}
+        for event in events:
+            key = (event.recipient_id, event.kind, event.post_id, event.reply_id)
+            notification = unread.get(key) or created.get(key)
+            
+            if notification is None:
+                created[key] = Notification(
+                    recipient_id=event.recipient_id,
+                    kind=event.kind,
+                    post_id=event.post_id,
+                    reply_id=event.reply_id,
+                    last_actor_id=event.actor_id,
+                    actor_ids=[event.actor_id],
+                    updated_at=now
+                )
+            else:
+                # actor_ids runs from the oldest to the latest actor
+                if event.actor_id in notification.actor_ids:
+                    notification.actor_ids.remove(event.actor_id)
+                else:
+                    notification.actor_count += 1
+                notification.actor_ids.append(event.actor_id)
+                notification.last_actor_id = event.actor_id
+                notification.updated_at = now
+                if notification.pk:
+                    coalesced[key] = notification
+        
+        Notification.objects.bulk_create(created.values())
+        Notification.objects.bulk_update(coalesced.values(), ['actor_count', 'actor_ids', 'last_actor', 'updated_at'])
+        
+        increment_unread(Counter(notification.recipient_id for notification in created.values()))
+
+
+def increment_unread(counts):
+    """
+    Add to unread counters, given a {user_id: increment} mapping
+    """
+    if not counts:
+        return
+    
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id) for user_id in counts],
+        ignore_conflicts=True
+    )
+    
+    by_increment = defaultdict(list)
+    for user_id, increment in counts.items():
+        by_increment[increment].append(user_id)
+    
+    for increment, user_ids in by_increment.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(
+            unread_count=F('unread_count') + increment
+        )
+
+
+def mark_read(user, notification_ids=None):
+    """
+    Mark the user's notifications (or the given ones) as read and update
+    the unread counter. Returns the number marked.
+    """
+    def mark(alias):
+        unread = Notification.objects.using(alias).filter(recipient=user, is_read=False)
+        if notification_ids is not None:
+            unread = unread.filter(notification_id__in=notification_ids)
+        return unread.update(is_read=True)
+    
+    with transaction.atomic():
+        # Notifications live on their post's shard, the counter on default
+        marked = sum(sharding.scatter(mark))
+        if notification_ids is None:
+            NotificationCounter.objects.filter(user=user).update(unread_count=0)
+        elif marked:
+            NotificationCounter.objects.filter(user=user).update(unread_count=F('unread_count') - marked)
+    
+    return marked
+
+
+def notify_reply(reply_pk):
+    """
+    Notify the post author, and the parent reply's author for a nested
+    reply
+    """
+    reply = (
+        PostReply.objects.filter(pk=reply_pk)
+        .select_related('post', 'parent_reply')
+        .only('author_id', 'post_id', 'post__author_id', 'parent_reply_id', 'parent_reply__author_id')
+        .first()
+    )
+    if reply is None:
+        return
+    
+    events = []
+    parent = reply.parent_reply
+    if parent is not None:
+        events.append(Event(parent.author_id, 'reply_reply', reply.post_id, parent.pk, reply.author_id))
+    if parent is None or parent.author_id != reply.post.author_id:
+        events.append(Event(reply.post.author_id, 'post_reply', reply.post_id, None, reply.author_id))
+    
+    deliver(events)
+
+
+def notify_like(like_pk):
+    """
+    Notify the author of a liked post or reply
+    """
+    like = (
+        PostLike.objects.filter(pk=like_pk)
+        .select_related('post', 'reply')
+        .only('user_id', 'post_id', 'post__author_id', 'reply_id', 'reply__author_id', 'reply__post_id')
+        .first()
+    )
+    if like is None:
+        return
+    
+    if like.reply_id:
+        deliver([Event(like.reply.author_id, 'reply_like', like.reply.post_id, like.reply_id, like.user_id)])
+    else:
+        deliver([Event(like.post.author_id, 'post_like', like.post_id, None, like.user_id)])
+
+
+def retract_like(recipient_id, kind, post_pk, reply_pk, actor_id):
+    """
+    Take an unliking user out of the unread like notification they
+    contributed to; read notifications are left as they were
+    """
+    with transaction.atomic(using=router.db_for_write(Notification)):
+        notification = Notification.objects.select_for_update().filter(
+            recipient_id=recipient_id, kind=kind, post_id=post_pk, reply_id=reply_pk, is_read=False
+        ).first()
+        if notification is None or actor_id not in notification.actor_ids:
+            return
+        
+        notification.actor_ids.remove(actor_id)
+        notification.actor_count -= 1
+        if notification.actor_count < 1:
+            notification.delete()
+            increment_unread({recipient_id: -1})
+            return
+        
+        if notification.last_actor_id == actor_id:
+            notification.last_actor_id = notification.actor_ids[-1] if notification.actor_ids else None
+        notification.save(update_fields=['actor_count', 'actor_ids', 'last_actor'])
+
+
+def notify_unlike(user_pk, post_pk=None, reply_pk=None):
+    """
+    Retract a removed like from the author's unread notification
+    """
+    if reply_pk is not None:
+        reply = PostReply.objects.filter(pk=reply_pk).only('author_id', 'post_id').first()
+        if reply is not None:
+            retract_like(reply.author_id, 'reply_like', reply.post_id, reply.pk, user_pk)
+        return
+    
+    post = ForumPost.objects.filter(pk=post_pk).only('author_id').first()
+    if post is not None:
+        retract_like(post.author_id, 'post_like', post.pk, None, user_pk)
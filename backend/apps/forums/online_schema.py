@@ -0,0 +1,107 @@
+"""
+Migration operations for changing large forum tables without long locks.
+
+A plain AddIndex holds a lock that blocks writes to the table for the
+whole index build. AddIndexOnline builds it with CREATE INDEX
+CONCURRENTLY on PostgreSQL instead, which cannot run in a transaction,
+so migrations using it set `atomic = False` and contain nothing else.
+A concurrent build that failed halfway leaves an INVALID index behind;
+it is dropped before retrying. On other backends (SQLite in development)
+the index is added normally.
+
+New columns on these tables are added nullable and without a default,
+which is a catalog-only change, then filled in by a resumable keyset
+backfill (see backfills.py) rather than in the migration itself.
+"""
+from django.db import NotSupportedError
+from django.db.migrations.operations import AddIndex, RemoveIndex
+
+
+def is_postgresql(schema_editor):
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+def ensure_not_in_transaction(operation, schema_editor):
+    if schema_editor.connection.in_atomic_block:
+        raise NotSupportedError(
+            f"{operation.__class__.__name__} cannot run inside a transaction "
+            "(set atomic = False on the migration)"
+        )
+
+
+def drop_invalid_index(schema_editor, name):
+    """
+    Drop an index left INVALID by an interrupted concurrent build
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid '
+            'WHERE pg_class.relname = %s AND NOT pg_index.indisvalid',
+            [name]
+        )
+        invalid = cursor.fetchone() is not None
+    if invalid:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class AddIndexOnline(AddIndex):
+    """
+    AddIndex that does not block writes on PostgreSQL
+    """
+    atomic = False
+    
+    def describe(self):
+        return f"Create index {self.index.name} online on {self.model_name}"
+    
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if is_postgresql(schema_editor):
+            ensure_not_in_transaction(self, schema_editor)
+            drop_invalid_index(schema_editor, self.index.name)
+            schema_editor.add_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.add_index(model, self.index)
+    
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if is_postgresql(schema_editor):
+            ensure_not_in_transaction(self, schema_editor)
+            schema_editor.remove_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, self.index)
+
+
+class RemoveIndexOnline(RemoveIndex):
+    """
+    RemoveIndex that does not block writes on PostgreSQL
+    """
+    atomic = False
+    
+    def describe(self):
+        return f"Remove index {self.name} online from {self.model_name}"
+    
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        index = from_state.models[app_label, self.model_name_lower].get_index_by_name(self.name)
+        if is_postgresql(schema_editor):
+            ensure_not_in_transaction(self, schema_editor)
+            schema_editor.remove_index(model, index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, index)
+    
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        index = to_state.models[app_label, self.model_name_lower].get_index_by_name(self.name)
+        if is_postgresql(schema_editor):
+            ensure_not_in_transaction(self, schema_editor)
+            schema_editor.add_index(model, index, concurrently=True)
+        else:
+            schema_editor.add_index(model, index)
@@ -0,0 +1,81 @@
+"""
+Keyset (cursor) pagination for newest-first lists.
+
+Pages are ordered by (field, pk) descending and a cursor encodes the
+last row's position, so each page is an index range scan no matter how
+deep the client has scrolled. Cursors are opaque base64 strings.
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(value, pk):
+    """
+    Opaque cursor for the position after the row with (value, pk)
+    """
+    raw = f"{value.isoformat()}|{pk}"
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor into (value, pk), or None if invalid
+    """
+    try:
+        value, pk = urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(value), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def page_size_param(request):
+    """
+    Read the page_size query parameter, clamped to MAX_PAGE_SIZE
+    """
+    try:
+        page_size = int(request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        page_size = DEFAULT_PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def keyset_filter(queryset, request, field):
+    """
+    Order queryset newest first by (field, pk) and skip to the request's
+    cursor. Returns (queryset, error).
+    """
+    cursor = request.GET.get('cursor', '')
+    
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            return None, 'Invalid cursor'
+        value, pk = position
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+    
+    return queryset.order_by(f'-{field}', '-pk'), None
+
+
+def keyset_page(queryset, request, field):
+    """
+    Fetch one page of a newest-first list, reading one extra row to know
+    whether there is a next page. Returns (rows, next_cursor, error).
+    """
+    page_size = page_size_param(request)
+    queryset, error = keyset_filter(queryset, request, field)
+    if error:
+        return None, None, error
+    
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(getattr(rows[-1], field), rows[-1].pk)
+    
+    return rows, next_cursor, None
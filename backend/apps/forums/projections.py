@@ -0,0 +1,244 @@
+"""
+Value-based serialization for forum post lists.
+
+ForumPostSerializer builds each post field by field from model instances,
+and its nested category serializer runs a COUNT per row. The functions
+here fetch only the columns a response needs with .values(), compute
+reply counts in a subquery and category post counts in one grouped query,
+and turn rows into dicts with a per-field-set converter that is built
+once and reused. With fields=full the output matches ForumPostSerializer
+exactly.
+
+Lists default to LIST_FIELDS: a server-computed excerpt instead of the
+post body and the category slug instead of the nested category, so the
+body is never read from the table and no category query runs. Clients
+ask for anything else with `fields`.
+"""
+from functools import lru_cache
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import backfills
+from .models import ForumCategory, PostLike, PostReply
+
+
+POST_FIELDS = (
+    'post_id', 'title', 'content', 'author', 'category',
+    'tags', 'is_pinned', 'is_locked', 'view_count',
+    'like_count', 'reply_count', 'liked_by_me', 'version',
+    'created_at', 'updated_at', 'last_activity'
+)
+
+# Fields beyond ForumPostSerializer's, available through `fields`
+EXTRA_FIELDS = ('excerpt', 'category_slug')
+
+AVAILABLE_FIELDS = POST_FIELDS + EXTRA_FIELDS
+
+# Default projection of post lists
+LIST_FIELDS = (
+    'post_id', 'title', 'excerpt', 'author', 'category_slug',
+    'tags', 'is_pinned', 'is_locked', 'view_count',
+    'like_count', 'reply_count', 'liked_by_me',
+    'created_at', 'last_activity'
+)
+
+# Fields left out by compact=1
+COMPACT_EXCLUDED_FIELDS = ('content',)
+
+CATEGORY_FIELDS = ('name', 'description', 'slug', 'icon', 'color', 'post_count', 'order')
+
+# Columns each output field reads from a .values() row
+POST_FIELD_COLUMNS = {
+    'post_id': ('post_id',),
+    'title': ('title',),
+    'content': ('content',),
+    'excerpt': ('excerpt',),
+    'author': ('author__username', 'author__display_name', 'author__user_id'),
+    'category': ('category_id',),
+    'category_slug': ('category__slug',),
+    'tags': ('tags',),
+    'is_pinned': ('is_pinned',),
+    'is_locked': ('is_locked',),
+    'view_count': ('view_count',),
+    'like_count': ('like_count',),
+    'reply_count': ('active_reply_count',),
+    'liked_by_me': ('id',),
+    'version': ('version',),
+    'created_at': ('created_at',),
+    'updated_at': ('updated_at',),
+    'last_activity': ('last_activity',),
+}
+
+
+def format_datetime(value):
+    """
+    Format a datetime the way DRF's DateTimeField does
+    """
+    if value is None:
+        return None
+    value = timezone.localtime(value) if timezone.is_aware(value) else value
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def format_uuid(value):
+    """
+    Format a UUID the way DRF's UUIDField does
+    """
+    return str(value) if value is not None else None
+
+
+def active_reply_count():
+    """
+    A post's active reply count: the reply_total column once its
+    backfill is complete, otherwise a subquery counting active replies
+    """
+    if backfills.is_complete('post_reply_total'):
+        return F('reply_total')
+    replies = (
+        PostReply.objects.filter(post=OuterRef('pk'), is_active=True)
+        .order_by()
+        .values('post')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(replies, output_field=IntegerField()), 0)
+
+
+def parse_post_fields(value, compact=False):
+    """
+    Parse a comma separated `fields` parameter into a tuple of post
+    fields: LIST_FIELDS when empty, POST_FIELDS for 'full'. Returns
+    (fields, error).
+    """
+    if not value:
+        fields = LIST_FIELDS
+    elif value == 'full':
+        fields = POST_FIELDS
+    else:
+        fields = tuple(name.strip() for name in value.split(',') if name.strip())
+        unknown = [name for name in fields if name not in AVAILABLE_FIELDS]
+        if unknown:
+            return None, f"Unknown fields: {', '.join(unknown)}"
+    
+    if compact:
+        fields = tuple(name for name in fields if name not in COMPACT_EXCLUDED_FIELDS)
+    
+    return fields, None
+
+
+@lru_cache(maxsize=64)
+def compile_post_converter(fields, compact):
+    """
+    Build a function turning a .values() row into an output dict for the
+    given fields. Cached, so field dispatch happens once per field set.
+    """
+    converters = []
+    for name in fields:
+        if name == 'author':
+            converters.append((name, lambda row, ctx: {
+                'username': row['author__username'],
+                'display_name': row['author__display_name'],
+                'user_id': format_uuid(row['author__user_id']),
+            }))
+        elif name == 'category':
+            if compact:
+                converters.append((name, lambda row, ctx: ctx['categories'][row['category_id']]['slug']))
+            else:
+                converters.append((name, lambda row, ctx: ctx['categories'][row['category_id']]))
+        elif name == 'liked_by_me':
+            converters.append((name, lambda row, ctx: row['id'] in ctx['liked_post_ids']))
+        elif name == 'post_id':
+            converters.append((name, lambda row, ctx: format_uuid(row['post_id'])))
+        elif name in ('created_at', 'updated_at', 'last_activity'):
+            converters.append((name, lambda row, ctx, column=name: format_datetime(row[column])))
+        else:
+            column = POST_FIELD_COLUMNS[name][0]
+            converters.append((name, lambda row, ctx, column=column: row[column]))
+    
+    def convert(row, ctx):
+        return {name: converter(row, ctx) for name, converter in converters}
+    
+    return convert
+
+
+def serialize_categories(category_ids):
+    """
+    Serialize categories like ForumCategorySerializer, counting active
+    posts for all of them in a single grouped query
+    """
+    if not category_ids:
+        return {}
+    
+    categories = (
+        ForumCategory.objects.filter(pk__in=category_ids)
+        .annotate(active_post_count=Count('posts', filter=Q(posts__is_active=True)))
+        .values('id', 'active_post_count', *[name for name in CATEGORY_FIELDS if name != 'post_count'])
+    )
+    
+    return {
+        category['id']: {
+            name: category['active_post_count'] if name == 'post_count' else category[name]
+            for name in CATEGORY_FIELDS
+        }
+        for category in categories
+    }
+
+
+def serialize_posts(posts, user=None, fields=POST_FIELDS, compact=False):
+    """
+    Serialize a (sliced) ForumPost queryset into a list of dicts.
+    
+    Returns (posts, categories). In compact mode each post's category is
+    just its slug and categories holds one entry per slug; otherwise
+    categories is None and each post embeds its category.
+    """
+    columns = {'id'}
+    for name in fields:
+        columns.update(POST_FIELD_COLUMNS[name])
+    
+    if 'reply_count' in fields:
+        posts = posts.annotate(active_reply_count=active_reply_count())
+    rows = list(posts.values(*columns))
+    
+    ctx = {'categories': {}, 'liked_post_ids': set()}
+    if 'category' in fields:
+        ctx['categories'] = serialize_categories({row['category_id'] for row in rows})
+    if 'liked_by_me' in fields and user is not None and user.is_authenticated and rows:
+        ctx['liked_post_ids'] = set(
+            PostLike.objects.filter(user=user, post_id__in=[row['id'] for row in rows])
+            .values_list('post_id', flat=True)
+        )
+    
+    convert = compile_post_converter(tuple(fields), compact)
+    data = [convert(row, ctx) for row in rows]
+    
+    if compact and 'category' in fields:
+        return data, {category['slug']: category for category in ctx['categories'].values()}
+    return data, None
+
+
+def post_list_options(request):
+    """
+    Read the `fields` and `compact` query parameters of a post list
+    request. Returns (fields, compact, error).
+    """
+    compact = request.GET.get('compact', '') in ('1', 'true')
+    fields, error = parse_post_fields(request.GET.get('fields', ''), compact)
+    return fields, compact, error
+
+
+def post_list_payload(posts, request, fields, compact):
+    """
+    Serialize a post page and return the response keys for it:
+    'posts', plus 'categories' in compact mode
+    """
+    data, categories = serialize_posts(posts, request.user, fields, compact)
+    payload = {'posts': data}
+    if categories is not None:
+        payload['categories'] = categories
+    return payload
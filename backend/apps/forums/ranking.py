@@ -0,0 +1,47 @@
+"""
+Time-decayed "hot" score for forum posts.
+
+Each post stores the score as of hot_score_at. Engagement adds a weight
+after decaying the stored value to the current time, so a like or reply
+only touches its own row. decay_hot_scores re-bases every row to a common
+time in batches so the stored scores stay comparable for ORDER BY.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+
+HALF_LIFE_HOURS = getattr(settings, 'FORUM_HOT_HALF_LIFE_HOURS', 12)
+
+# Engagement weights
+POST_WEIGHT = 1.0
+LIKE_WEIGHT = 1.0
+REPLY_WEIGHT = 2.0
+VIEW_WEIGHT = 0.05
+
+
+def decay_factor(since, now=None):
+    """Fraction of a score left after the time between since and now"""
+    if since is None:
+        return 1.0
+    now = now or timezone.now()
+    hours = max((now - since).total_seconds(), 0) / 3600
+    return 0.5 ** (hours / HALF_LIFE_HOURS)
+
+
+def decayed_score(score, since, now=None):
+    """Decay a stored score from since to now"""
+    return score * decay_factor(since, now)
+
+
+def initial_score(like_count, view_count, reply_count, since, now=None):
+    """
+    Approximate score for a post rebuilt from its lifetime counters,
+    treating all engagement as if it happened at `since`
+    """
+    weight = (
+        POST_WEIGHT
+        + like_count * LIKE_WEIGHT
+        + view_count * VIEW_WEIGHT
+        + reply_count * REPLY_WEIGHT
+    )
+    return decayed_score(weight, since, now)
@@ -0,0 +1,291 @@
+"""
+Related-post recommendations from hashed TF-IDF vectors.
+
+Post text is tokenized and feature-hashed into DIMENSIONS signed
+buckets, weighted by inverse document frequency and L2-normalized, so
+the dot product of two vectors is their cosine similarity.
+
+build_related_posts computes all vectors in one vectorized pass into a
+memory-mapped file of (post pk, vector) records, then stores the top
+RELATED_LIMIT neighbours of every post in forum_related_posts. New posts
+are vectorized with the stored IDF weights, compared against the mapped
+matrix, appended to it and merged into their neighbours' lists, so
+serving related posts is always one indexed query. Edited posts go
+through the same path, replacing their record and links.
+
+NumPy is optional for the rest of the forum but required here: without
+it the batch job refuses to run and new posts are not added.
+"""
+import math
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Q
+
+from .models import ForumPost, RelatedPost
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+DIMENSIONS = 1024
+RELATED_LIMIT = 10
+MIN_SCORE = 0.1
+
+WORD_RE = re.compile(r'[^\W\d_]{2,}')
+
+STOP_WORDS = frozenset('''
+    a about after again all am an and any are as at be because been before
+    being but by can could did do does doing don for from had has have
+    having he her here hers him his how if in into is it its just me more
+    most my no not now of off on once only or other our out over own same
+    she should so some such than that the their them then there these
+    they this those through to too under until up very was we were what
+    when where which while who why will with would you your
+'''.split())
+
+_append_lock = threading.Lock()
+
+if np is not None:
+    RECORD_DTYPE = np.dtype([('post', '<i8'), ('vector', '<f4', (DIMENSIONS,))])
+
+
+def get_index_dir():
+    return Path(getattr(settings, 'FORUM_RELATED_INDEX_DIR', settings.BASE_DIR / 'var' / 'related'))
+
+
+def vectors_path():
+    return get_index_dir() / 'vectors.dat'
+
+
+def idf_path():
+    return get_index_dir() / 'idf.npy'
+
+
+def tokenize(text):
+    return [word for word in WORD_RE.findall(text.casefold()) if word not in STOP_WORDS]
+
+
+def hash_features(text):
+    """
+    Hashed (bucket, sign) arrays for the tokens of text
+    """
+    hashes = np.array([zlib.crc32(token.encode('utf-8')) for token in tokenize(text)], dtype=np.uint32)
+    buckets = (hashes % DIMENSIONS).astype(np.intp)
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    return buckets, signs
+
+
+def term_frequencies(texts):
+    """
+    Matrix of signed, sublinear term counts, one row per text
+    """
+    matrix = np.zeros((len(texts), DIMENSIONS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        buckets, signs = hash_features(text)
+        np.add.at(matrix[row], buckets, signs)
+    return np.sign(matrix) * np.log1p(np.abs(matrix))
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def post_text(title, content, tags):
+    # The title and tags are repeated to weigh them above body text
+    tag_text = ' '.join(tags) if isinstance(tags, list) else ''
+    return f"{title} {title} {tag_text} {tag_text} {content}"
+
+
+def top_neighbours(scores, limit, exclude=None):
+    """
+    Indices and scores of the best `limit` entries of a score vector
+    """
+    if exclude is not None:
+        scores[exclude] = -1.0
+    limit = min(limit, len(scores))
+    if limit <= 0:
+        return [], []
+    top = np.argpartition(-scores, limit - 1)[:limit]
+    top = top[np.argsort(-scores[top])]
+    top = top[scores[top] >= MIN_SCORE]
+    return top, scores[top]
+
+
+def build_index(posts, batch_size=1000, block_size=512, limit=RELATED_LIMIT, log=None):
+    """
+    Rebuild the vector file, IDF weights and related-post table for the
+    given posts queryset. Returns the number of posts indexed.
+    """
+    rows = list(posts.order_by('pk').values_list('pk', 'title', 'content', 'tags'))
+    count = len(rows)
+    get_index_dir().mkdir(parents=True, exist_ok=True)
+    
+    if not count:
+        vectors_path().unlink(missing_ok=True)
+        idf_path().unlink(missing_ok=True)
+        RelatedPost.objects.all().delete()
+        return 0
+    
+    tmp_path = vectors_path().with_suffix('.tmp')
+    records = np.memmap(tmp_path, dtype=RECORD_DTYPE, mode='w+', shape=(count,))
+    
+    # Pass 1: term frequencies and document frequencies
+    document_frequency = np.zeros(DIMENSIONS, dtype=np.int64)
+    for start in range(0, count, batch_size):
+        batch = rows[start:start + batch_size]
+        matrix = term_frequencies([post_text(title, content, tags) for _, title, content, tags in batch])
+        document_frequency += np.count_nonzero(matrix, axis=0)
+        records['post'][start:start + len(batch)] = [pk for pk, _, _, _ in batch]
+        records['vector'][start:start + len(batch)] = matrix
+        if log:
+            log(f'Vectorized {start + len(batch)} posts...')
+    
+    # Pass 2: IDF weighting and normalization in place
+    idf = (np.log((1 + count) / (1 + document_frequency)) + 1).astype(np.float32)
+    for start in range(0, count, batch_size):
+        block = records['vector'][start:start + batch_size]
+        block *= idf
+        normalize_rows(block)
+    records.flush()
+    del records
+    
+    os.replace(tmp_path, vectors_path())
+    np.save(idf_path(), idf)
+    
+    # Pass 3: top-k neighbours per post, block by block
+    RelatedPost.objects.exclude(post__in=posts).delete()
+    records = load_records()
+    vectors = records['vector'][:count]
+    post_pks = records['post'][:count]
+    for start in range(0, count, block_size):
+        scores = vectors[start:start + block_size] @ vectors.T
+        links = []
+        for offset, row in enumerate(scores):
+            top, top_scores = top_neighbours(row, limit, exclude=start + offset)
+            links.extend(
+                RelatedPost(post_id=int(post_pks[start + offset]), related_id=int(post_pks[index]), score=float(score))
+                for index, score in zip(top, top_scores)
+            )
+        with transaction.atomic():
+            RelatedPost.objects.filter(post_id__in=post_pks[start:start + block_size].tolist()).delete()
+            RelatedPost.objects.bulk_create(links)
+        if log:
+            log(f'Linked {min(start + block_size, count)} posts...')
+    
+    return count
+
+
+def load_records():
+    """
+    Read-only memory map of the vector file, or None if missing
+    """
+    path = vectors_path()
+    count = path.stat().st_size // RECORD_DTYPE.itemsize if path.exists() else 0
+    if not count:
+        return None
+    # A record still being appended by another worker is left out
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+
+
+def add_post(post_pk, limit=RELATED_LIMIT):
+    """
+    Vectorize a new or edited post, link it to its nearest neighbours
+    (and them to it when it beats their current list) and append it to
+    the index, or overwrite its record there after an edit
+    """
+    if np is None or not idf_path().exists():
+        return
+    
+    post = ForumPost.objects.filter(pk=post_pk, is_active=True).values_list('title', 'content', 'tags').first()
+    records = load_records()
+    if post is None or records is None:
+        return
+    
+    idf = np.load(idf_path())
+    vector = normalize_rows(term_frequencies([post_text(*post)]) * idf)[0]
+    
+    scores = records['vector'] @ vector
+    own_records = np.flatnonzero(records['post'] == post_pk)
+    top, top_scores = top_neighbours(scores, limit, exclude=own_records)
+    neighbours = {int(records['post'][index]): float(score) for index, score in zip(top, top_scores)}
+    # With forum sharding, neighbours on other shards can't be linked
+    present = set(ForumPost.objects.filter(pk__in=list(neighbours)).values_list('pk', flat=True))
+    neighbours = {pk: score for pk, score in neighbours.items() if pk in present}
+    
+    with transaction.atomic(using=router.db_for_write(RelatedPost)):
+        # Links in either direction were scored against the old text
+        RelatedPost.objects.filter(Q(post_id=post_pk) | Q(related_id=post_pk)).delete()
+        RelatedPost.objects.bulk_create([
+            RelatedPost(post_id=post_pk, related_id=related_pk, score=score)
+            for related_pk, score in neighbours.items()
+        ])
+        merge_into_neighbours(post_pk, neighbours, limit)
+    
+    record = np.zeros(1, dtype=RECORD_DTYPE)
+    record['post'] = post_pk
+    record['vector'] = vector
+    with _append_lock, open(vectors_path(), 'r+b') as vectors_file:
+        if len(own_records):
+            vectors_file.seek(int(own_records[0]) * RECORD_DTYPE.itemsize)
+        else:
+            vectors_file.seek(0, os.SEEK_END)
+        vectors_file.write(record.tobytes())
+
+
+def merge_into_neighbours(post_pk, neighbours, limit):
+    """
+    Add post_pk to each neighbour's related list where it scores above
+    the neighbour's weakest link, keeping at most `limit` links
+    """
+    weakest = {}
+    counts = {}
+    for related_from, score in RelatedPost.objects.filter(post_id__in=list(neighbours)).values_list('post_id', 'score'):
+        counts[related_from] = counts.get(related_from, 0) + 1
+        weakest[related_from] = min(score, weakest.get(related_from, math.inf))
+    
+    links = []
+    for neighbour_pk, score in neighbours.items():
+        if counts.get(neighbour_pk, 0) < limit or score > weakest[neighbour_pk]:
+            links.append(RelatedPost(post_id=neighbour_pk, related_id=post_pk, score=score))
+    RelatedPost.objects.bulk_create(links, ignore_conflicts=True)
+    
+    for link in links:
+        if counts.get(link.post_id, 0) >= limit:
+            overflow = RelatedPost.objects.filter(post_id=link.post_id).order_by('-score').values_list('pk', flat=True)[limit:]
+            RelatedPost.objects.filter(pk__in=list(overflow)).delete()
+
+
+def get_related(post_id, limit=RELATED_LIMIT):
+    """
+    Related active posts of a post, best first, in one indexed query
+    """
+    rows = (
+        RelatedPost.objects.filter(post__post_id=post_id, related__is_active=True)
+        .order_by('-score')
+        .values(
+            'score', 'related__post_id', 'related__title', 'related__category__slug',
+            'related__like_count', 'related__created_at'
+        )[:limit]
+    )
+    return [
+        {
+            'post_id': row['related__post_id'],
+            'title': row['related__title'],
+            'category': row['related__category__slug'],
+            'like_count': row['related__like_count'],
+            'created_at': row['related__created_at'],
+            'score': row['score'],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,159 @@
+"""
+Edits with optimistic concurrency and compact revision history.
+
+An edit names the version it was based on and is applied with a
+conditional UPDATE ... WHERE version = n, so of two concurrent edits of
+the same version only the first succeeds; the other gets a conflict
+instead of silently overwriting it.
+
+The current text lives only in the post or reply row. Each PostRevision
+stores reverse deltas: for every changed text field, the word-level
+edits that turn the new text back into the previous one, so a small
+change to a long post costs a few bytes. Other fields (tags) are stored
+whole. Older versions are rebuilt by applying deltas newest first.
+"""
+from difflib import SequenceMatcher
+import re
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ForumPost, PostReply, PostRevision, make_excerpt
+
+
+TOKEN_RE = re.compile(r'\s+|\S+')
+
+TEXT_FIELDS = ('title', 'content')
+POST_EDIT_FIELDS = ('title', 'content', 'tags')
+REPLY_EDIT_FIELDS = ('content',)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text)
+
+
+def make_delta(new, old):
+    """
+    Edits turning text `new` into `old`, as [start, end, replacement]
+    token ranges of `new`
+    """
+    new_tokens = tokenize(new)
+    old_tokens = tokenize(old)
+    matcher = SequenceMatcher(None, new_tokens, old_tokens, autojunk=False)
+    return [
+        [i1, i2, ''.join(old_tokens[j1:j2])]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != 'equal'
+    ]
+
+
+def apply_delta(text, delta):
+    tokens = tokenize(text)
+    pieces = []
+    position = 0
+    for start, end, replacement in delta:
+        pieces.extend(tokens[position:start])
+        pieces.append(replacement)
+        position = end
+    pieces.extend(tokens[position:])
+    return ''.join(pieces)
+
+
+def diff_changes(old, new):
+    """
+    Reverse changes for the fields that differ between two value dicts
+    """
+    return {
+        name: make_delta(new[name], old[name]) if name in TEXT_FIELDS else old[name]
+        for name in new
+        if new[name] != old[name]
+    }
+
+
+def undo_changes(values, changes):
+    values = dict(values)
+    for name, change in changes.items():
+        values[name] = apply_delta(values[name], change) if name in TEXT_FIELDS else change
+    return values
+
+
+class EditConflict(Exception):
+    """
+    The content was edited since the version the edit was based on
+    """
+    def __init__(self, current_version):
+        super().__init__(current_version)
+        self.current_version = current_version
+
+
+def apply_edit(instance, version, values, editor):
+    """
+    Apply an edit based on `version` to a post or reply instance.
+    Updates the instance in place and returns the names of the changed
+    fields; raises EditConflict if it is no longer at `version`.
+    """
+    if instance.version != version:
+        raise EditConflict(instance.version)
+    
+    old = {name: getattr(instance, name) for name in values}
+    changes = diff_changes(old, values)
+    if not changes:
+        return []
+    
+    now = timezone.now()
+    updates = {name: values[name] for name in changes}
+    if 'content' in updates and isinstance(instance, ForumPost):
+        updates['excerpt'] = make_excerpt(updates['content'])
+    
+    model = type(instance)
+    with transaction.atomic(using=instance._state.db):
+        updated = model.objects.filter(pk=instance.pk, version=version).update(
+            version=F('version') + 1, updated_at=now, **updates
+        )
+        if not updated:
+            current = model.objects.filter(pk=instance.pk).values_list('version', flat=True).first()
+            raise EditConflict(current)
+        
+        PostRevision.objects.create(
+            post_id=instance.pk if isinstance(instance, ForumPost) else instance.post_id,
+            reply_id=instance.pk if isinstance(instance, PostReply) else None,
+            version=version,
+            changes=changes,
+            editor=editor,
+        )
+    
+    for name, value in updates.items():
+        setattr(instance, name, value)
+    instance.version = version + 1
+    instance.updated_at = now
+    return list(changes)
+
+
+def get_history(instance, fields):
+    """
+    All versions of a post or reply, newest first, as dicts of version,
+    editor, edited_at and the given fields. The first version's editor
+    is None (the author) and its edited_at the creation time.
+    """
+    revisions = PostRevision.objects.select_related('editor').order_by('-version')
+    if isinstance(instance, PostReply):
+        revisions = revisions.filter(reply=instance)
+    else:
+        revisions = revisions.filter(post=instance, reply=None)
+    
+    history = []
+    version = instance.version
+    values = {name: getattr(instance, name) for name in fields}
+    for revision in revisions:
+        history.append({
+            'version': version,
+            'editor': revision.editor.username if revision.editor else None,
+            'edited_at': revision.created_at,
+            **values
+        })
+        version = revision.version
+        values = undo_changes(values, revision.changes)
+    
+    history.append({'version': version, 'editor': None, 'edited_at': instance.created_at, **values})
+    return history
@@ -0,0 +1,142 @@
+"""
+Screening of new posts and replies for crisis language and spam.
+
+Phrase lists come from FORUM_SCREENING_PHRASES ({category: phrases},
+where phrases is a list or the path of a text file with one phrase per
+line) on top of DEFAULT_PHRASES, and are compiled once into a single
+PhraseMatcher. A match raises a ModerationFlag for moderators; crisis
+matches also make the create endpoints return crisis resources to the
+author. Content is never blocked by screening.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+
+from .matching import PhraseMatcher
+from .models import ModerationFlag
+
+
+DEFAULT_PHRASES = {
+    'crisis': [
+        'kill myself', 'killing myself', 'end my life', 'ending my life',
+        'take my own life', 'want to die', 'wanna die', 'wish i was dead',
+        'wish i were dead', 'better off dead', 'better off without me',
+        "don't want to live", 'dont want to live', 'no reason to live',
+        'suicide', 'suicidal', 'hurt myself', 'hurting myself', 'self harm',
+        'self-harm', 'cut myself', 'cutting myself', 'overdose',
+        "can't go on", 'cant go on', 'goodbye forever',
+    ],
+    'spam': [
+        'buy now', 'click here', 'free money', 'limited time offer',
+        'work from home', 'make money fast', 'crypto giveaway',
+        'guaranteed income', 'online casino', 'cheap pills',
+        'dm me for prices', 'follow my page',
+    ],
+}
+
+DEFAULT_CRISIS_RESOURCES = [
+    {
+        'name': 'Find a Helpline',
+        'description': 'Free, confidential crisis lines in your country',
+        'url': 'https://findahelpline.com',
+    },
+    {
+        'name': '988 Suicide & Crisis Lifeline (US)',
+        'description': 'Call or text 988',
+        'url': 'https://988lifeline.org',
+    },
+    {
+        'name': 'Samaritans (UK & Ireland)',
+        'description': 'Call 116 123',
+        'url': 'https://www.samaritans.org',
+    },
+    {
+        'name': 'Emergency services',
+        'description': 'If you are in immediate danger, call your local emergency number (112 / 911)',
+        'url': None,
+    },
+]
+
+
+def load_phrases(source):
+    """
+    Read a phrase list given inline or as a file path
+    """
+    if isinstance(source, str):
+        with open(source, encoding='utf-8') as phrase_file:
+            return [line.strip() for line in phrase_file if line.strip() and not line.startswith('#')]
+    return list(source)
+
+
+def get_phrases():
+    """
+    Build the {phrase: category} mapping from defaults and settings
+    """
+    sources = dict(DEFAULT_PHRASES)
+    sources.update(getattr(settings, 'FORUM_SCREENING_PHRASES', {}))
+    
+    phrases = {}
+    for category, source in sources.items():
+        for phrase in load_phrases(source):
+            phrases[phrase] = category
+    return phrases
+
+
+@lru_cache(maxsize=1)
+def get_matcher():
+    """
+    Compiled matcher for the configured phrases, built once per process
+    """
+    return PhraseMatcher(get_phrases())
+
+
+def get_crisis_resources():
+    return getattr(settings, 'FORUM_CRISIS_RESOURCES', DEFAULT_CRISIS_RESOURCES)
+
+
+def screen_text(text):
+    """
+    Match text against all phrase lists: {category: matched phrases}
+    """
+    if not getattr(settings, 'FORUM_SCREENING_ENABLED', True):
+        return {}
+    return get_matcher().find(text)
+
+
+def flag_content(post_id, reply_id, matches):
+    """
+    Queue one moderation flag per matched category
+    """
+    ModerationFlag.objects.bulk_create([
+        ModerationFlag(post_id=post_id, reply_id=reply_id, category=category, matched_phrases=phrases)
+        for category, phrases in matches.items()
+    ])
+
+
+def screen_post(post):
+    """
+    Screen a new post's title and content. Returns the matches.
+    """
+    matches = screen_text(f"{post.title}\n{post.content}")
+    if matches:
+        flag_content(post.pk, None, matches)
+    return matches
+
+
+def screen_reply(reply):
+    """
+    Screen a new reply's content. Returns the matches.
+    """
+    matches = screen_text(reply.content)
+    if matches:
+        flag_content(reply.post_id, reply.pk, matches)
+    return matches
+
+
+def screening_payload(matches):
+    """
+    Extra response keys for the author of screened content
+    """
+    if 'crisis' in matches:
+        return {'crisis_resources': get_crisis_resources()}
+    return {}
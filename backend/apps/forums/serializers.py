@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import ForumCategory, ForumPost, PostReply, PostLike
+from .models import ForumCategory, ForumPost, PostReply, PostLike, Tag, Notification
 
 
 class ForumCategorySerializer(serializers.ModelSerializer):
@@ -29,14 +29,22 @@ class ForumPostSerializer(serializers.ModelSerializer):
     author = AuthorSerializer(read_only=True)
     category = ForumCategorySerializer(read_only=True)
     reply_count = serializers.ReadOnlyField()
+    liked_by_me = serializers.SerializerMethodField()
     
     class Meta:
         model = ForumPost
         fields = (
             'post_id', 'title', 'content', 'author', 'category', 
             'tags', 'is_pinned', 'is_locked', 'view_count', 
-            'like_count', 'reply_count', 'created_at', 'updated_at', 'last_activity'
+            'like_count', 'reply_count', 'liked_by_me', 'version',
+            'created_at', 'updated_at', 'last_activity'
         )
+    
+    def get_liked_by_me(self, obj):
+        """
+        Read from the batched 'liked_post_ids' set passed in context
+        """
+        return obj.pk in self.context.get('liked_post_ids', ())
 
 
 class ForumPostCreateSerializer(serializers.ModelSerializer):
@@ -59,6 +67,21 @@ class ForumPostCreateSerializer(serializers.ModelSerializer):
         except ForumCategory.DoesNotExist:
             raise serializers.ValidationError("Invalid category or category is not active")
     
+    def validate_tags(self, value):
+        """
+        Validate and normalize the tags list
+        """
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Tags must be a list")
+        
+        tags = Tag.normalize_list(value)
+        
+        # Limit to 10 tags max
+        if len(tags) > 10:
+            raise serializers.ValidationError("Maximum 10 tags allowed")
+        
+        return tags
+    
     def create(self, validated_data):
         """
         Create a new forum post
@@ -68,21 +91,63 @@ class ForumPostCreateSerializer(serializers.ModelSerializer):
             category=category,
             **validated_data
         )
+        post.sync_tags()
         return post
 
 
+class ForumPostUpdateSerializer(serializers.Serializer):
+    """
+    Serializer for editing a post; `version` is the version the edit is
+    based on
+    """
+    version = serializers.IntegerField(min_value=1)
+    title = serializers.CharField(max_length=200, required=False)
+    content = serializers.CharField(required=False)
+    tags = serializers.ListField(required=False)
+    
+    def validate_tags(self, value):
+        """
+        Validate and normalize the tags list
+        """
+        tags = Tag.normalize_list(value)
+        if len(tags) > 10:
+            raise serializers.ValidationError("Maximum 10 tags allowed")
+        return tags
+
+
 class PostReplySerializer(serializers.ModelSerializer):
     """
     Serializer for post replies (read)
     """
     author = AuthorSerializer(read_only=True)
     is_nested_reply = serializers.ReadOnlyField()
+    liked_by_me = serializers.SerializerMethodField()
     
     class Meta:
         model = PostReply
         fields = (
             'reply_id', 'content', 'author', 'parent_reply', 
-            'is_nested_reply', 'like_count', 'created_at', 'updated_at'
+            'is_nested_reply', 'like_count', 'liked_by_me', 'version', 'created_at', 'updated_at'
+        )
+    
+    def get_liked_by_me(self, obj):
+        """
+        Read from the batched 'liked_reply_ids' set passed in context
+        """
+        return obj.pk in self.context.get('liked_reply_ids', ())
+
+
+class UserReplySerializer(PostReplySerializer):
+    """
+    Serializer for a user's replies listed outside their thread
+    """
+    post_id = serializers.UUIDField(source='post.post_id', read_only=True)
+    post_title = serializers.CharField(source='post.title', read_only=True)
+    
+    class Meta(PostReplySerializer.Meta):
+        fields = (
+            'reply_id', 'content', 'post_id', 'post_title', 'parent_reply',
+            'is_nested_reply', 'like_count', 'liked_by_me', 'version', 'created_at', 'updated_at'
         )
 
 
@@ -150,6 +215,15 @@ class ForumPostListSerializer(serializers.ModelSerializer):
         return None
 
 
+class TagSerializer(serializers.ModelSerializer):
+    """
+    Serializer for normalized tags
+    """
+    class Meta:
+        model = Tag
+        fields = ('name', 'post_count')
+
+
 class PostLikeSerializer(serializers.ModelSerializer):
     """
     Serializer for post/reply likes
@@ -158,4 +232,49 @@ class PostLikeSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = PostLike
-        fields = ('user', 'created_at')
\ No newline at end of file
+        fields = ('user', 'created_at')
+
+
+class PostReplyUpdateSerializer(serializers.Serializer):
+    """
+    Serializer for editing a reply; `version` is the version the edit is
+    based on
+    """
+    version = serializers.IntegerField(min_value=1)
+    content = serializers.CharField()
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    """
+    Serializer for inbox notifications
+    """
+    MESSAGES = {
+        'post_reply': ('replied to your post', 'people replied to your post'),
+        'reply_reply': ('replied to your reply', 'people replied to your reply'),
+        'post_like': ('liked your post', 'people liked your post'),
+        'reply_like': ('liked your reply', 'people liked your reply'),
+    }
+    
+    post_id = serializers.UUIDField(source='post.post_id', read_only=True)
+    post_title = serializers.CharField(source='post.title', read_only=True)
+    reply_id = serializers.UUIDField(source='reply.reply_id', read_only=True, allow_null=True)
+    last_actor = AuthorSerializer(read_only=True)
+    message = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Notification
+        fields = (
+            'notification_id', 'kind', 'message', 'post_id', 'post_title', 'reply_id',
+            'last_actor', 'actor_count', 'is_read', 'created_at', 'updated_at'
+        )
+    
+    def get_message(self, obj):
+        """
+        Human readable summary, e.g. "5 people liked your post"
+        """
+        single, plural = self.MESSAGES[obj.kind]
+        if obj.actor_count > 1:
+            return f"{obj.actor_count} {plural}"
+        actor = obj.last_actor
+        name = (actor.display_name or actor.username) if actor else 'Someone'
+        return f"{name} {single}"
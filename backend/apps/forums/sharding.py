@@ -0,0 +1,592 @@
+"""
+Optional sharding of forum content by category.
+
+With more than one database alias in FORUM_SHARDS, each category's
+posts and everything attached to them (replies, likes, tag links,
+revisions, moderation flags, notifications, duplicate signatures and
+related-post links) live on the shard named by its ShardMap entry, or
+on the default database without one. Users, categories, tags and all
+other tables stay on the default database; the rows of them that shard
+content points at are copied to the shard, so joins and foreign keys
+work inside it, and refreshed there when they are saved.
+
+Views that act on one post, reply or category are wrapped in @routed,
+which pins the request to that category's shard; CategoryShardRouter
+then sends every query on a sharded model there. Cross-category lists
+run on every shard concurrently and merge the pages: search, trending
+and tag pages by offset (gather_post_page), a user's posts, replies and
+notifications by cursor (gather_keyset_page). Bulk moderation, the
+admin (which gets a shard filter) and the batch jobs visit each shard
+in turn (each_shard). Primary keys of sharded tables come from a
+separate range per shard (init_shard), since caches and cursors key
+rows by pk.
+
+move_category (`manage.py move_category`) moves a category between
+shards: writes to it are refused while it moves, reads keep using the
+old shard until the switch.
+
+Sharding is opt-in: the base settings have one database and no
+router (settings_sharding adds local SQLite shards). The related-post
+index (build_related_posts) and duplicate clustering still cover the
+default database only.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import cmp_to_key, wraps
+import heapq
+from itertools import islice
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, NotSupportedError, close_old_connections, connections, router, transaction
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.authentication.models import AnonymousUser
+from .models import (
+    ForumCategory, ForumPost, ModerationFlag, Notification, PostLike, PostReply, PostRevision,
+    PostSignature, PostSignatureBand, PostTag, RelatedPost, ShardMap, Tag
+)
+from .pagination import encode_cursor, keyset_page, page_size_param
+from .projections import serialize_posts
+
+
+SHARDED_MODELS = (
+    ForumPost, PostReply, PostLike, PostTag, PostRevision, ModerationFlag,
+    Notification, PostSignature, PostSignatureBand, RelatedPost,
+)
+SHARDED_LABELS = frozenset(model._meta.label for model in SHARDED_MODELS)
+
+# Default-database rows that shard content refers to, copied to shards
+MIRRORED_MODELS = (AnonymousUser, ForumCategory, Tag)
+MIRRORED_LABELS = frozenset(model._meta.label for model in MIRRORED_MODELS)
+
+# Primary keys of sharded tables on the n-th shard start at n * ID_SPAN
+ID_SPAN = 1 << 40
+
+LOCATION_TIMEOUT = 86400
+MOVE_BATCH_SIZE = 200
+
+_current = ContextVar('forum_shard', default=None)
+
+_map_lock = threading.Lock()
+_map = {
+    'shards': {},  # category id -> alias
+    'slugs': {},  # category slug -> category id
+    'moving': frozenset(),
+    'loaded_at': None,
+}
+
+
+def shard_aliases():
+    return list(getattr(settings, 'FORUM_SHARDS', [DEFAULT_DB_ALIAS]))
+
+
+def is_enabled():
+    return len(getattr(settings, 'FORUM_SHARDS', ())) > 1
+
+
+def load_map(force=False):
+    """
+    The shard map, reloaded from the default database at most every
+    FORUM_SHARD_MAP_TTL seconds
+    """
+    ttl = getattr(settings, 'FORUM_SHARD_MAP_TTL', 30)
+    now = time.monotonic()
+    if not force and _map['loaded_at'] is not None and now - _map['loaded_at'] < ttl:
+        return _map
+    
+    rows = list(
+        ShardMap.objects.using(DEFAULT_DB_ALIAS)
+        .values_list('category_id', 'category__slug', 'shard', 'is_moving')
+    )
+    with _map_lock:
+        _map.update(
+            shards={category_id: shard for category_id, _, shard, _ in rows},
+            slugs={slug: category_id for category_id, slug, _, _ in rows},
+            moving=frozenset(category_id for category_id, _, _, is_moving in rows if is_moving),
+            loaded_at=now
+        )
+    return _map
+
+
+def db_for_category(category_id):
+    if not is_enabled():
+        return DEFAULT_DB_ALIAS
+    return load_map()['shards'].get(category_id, DEFAULT_DB_ALIAS)
+
+
+def post_category(post_id):
+    """
+    Category id of the post with this post_id, from any shard
+    """
+    key = f'forums:shard:post:{post_id}'
+    category_id = cache.get(key)
+    if category_id is None:
+        for alias in shard_aliases():
+            category_id = (
+                ForumPost.objects.using(alias).filter(post_id=post_id)
+                .values_list('category_id', flat=True).first()
+            )
+            if category_id is not None:
+                cache.set(key, category_id, LOCATION_TIMEOUT)
+                break
+    return category_id
+
+
+def reply_category(reply_id):
+    """
+    Category id of the reply with this reply_id, from any shard
+    """
+    key = f'forums:shard:reply:{reply_id}'
+    category_id = cache.get(key)
+    if category_id is None:
+        for alias in shard_aliases():
+            category_id = (
+                PostReply.objects.using(alias).filter(reply_id=reply_id)
+                .values_list('post__category_id', flat=True).first()
+            )
+            if category_id is not None:
+                cache.set(key, category_id, LOCATION_TIMEOUT)
+                break
+    return category_id
+
+
+def current_shard():
+    return _current.get()
+
+
+@contextmanager
+def use_shard(alias):
+    """
+    Send queries on sharded models without a more specific route to alias
+    """
+    token = _current.set(alias)
+    try:
+        yield alias
+    finally:
+        _current.reset(token)
+
+
+def each_shard():
+    """
+    Iterate over the shard aliases with sharded models routed to each
+    in turn, for jobs that walk all forum content
+    """
+    for alias in shard_aliases():
+        with use_shard(alias):
+            yield alias
+
+
+@contextmanager
+def atomic():
+    """
+    A transaction on the default database and, when sharded models are
+    routed to another shard, on that shard too
+    """
+    alias = router.db_for_write(ForumPost)
+    with transaction.atomic():
+        if alias == DEFAULT_DB_ALIAS:
+            yield
+        else:
+            with transaction.atomic(using=alias):
+                yield
+
+
+class CategoryShardRouter:
+    """
+    Database router for sharded forum content. Does nothing unless
+    FORUM_SHARDS names more than one database.
+    """
+    
+    def db_for_read(self, model, **hints):
+        return self.route(model, hints.get('instance'))
+    
+    def db_for_write(self, model, **hints):
+        return self.route(model, hints.get('instance'))
+    
+    def route(self, model, instance):
+        if not is_enabled():
+            return None
+        if model._meta.label not in SHARDED_LABELS:
+            return DEFAULT_DB_ALIAS
+        
+        if instance is not None:
+            label = instance._meta.label
+            if label == 'forums.ForumPost' and instance._state.adding and instance.category_id:
+                return db_for_category(instance.category_id)
+            if label in SHARDED_LABELS and instance._state.db:
+                return instance._state.db
+            if label == 'forums.ForumCategory':
+                return db_for_category(instance.pk)
+        return _current.get()
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_enabled() and MIRRORED_LABELS & {obj1._meta.label, obj2._meta.label}:
+            return True
+        return None
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Data migrations (no model_name) only run on the default
+        # database; shards start out empty
+        if db != DEFAULT_DB_ALIAS and model_name is None:
+            return False
+        return None
+
+
+def mirror(objs, alias):
+    """
+    Copy default-database rows (users, categories, tags) to a shard, or
+    update the copies already there
+    """
+    if alias == DEFAULT_DB_ALIAS:
+        return
+    for obj in objs:
+        model = type(obj)
+        copy = model(**{field.attname: getattr(obj, field.attname) for field in model._meta.concrete_fields})
+        copy.save_base(raw=True, using=alias)
+
+
+def refresh_mirrors(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    """
+    post_save receiver updating the shard copies of a saved user or
+    category (connected in ForumsConfig.ready)
+    """
+    if raw or using != DEFAULT_DB_ALIAS or not is_enabled():
+        return
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in sender._meta.concrete_fields
+        if not field.primary_key and (update_fields is None or field.name in update_fields)
+    }
+    for alias in shard_aliases():
+        if alias != DEFAULT_DB_ALIAS:
+            sender._base_manager.using(alias).filter(pk=instance.pk).update(**values)
+
+
+def request_category(request, kwargs):
+    if 'post_id' in kwargs:
+        return post_category(kwargs['post_id'])
+    if 'reply_id' in kwargs:
+        return reply_category(kwargs['reply_id'])
+    slug = kwargs.get('category_slug')
+    if slug is None and request.method == 'POST' and hasattr(request.data, 'get'):
+        slug = request.data.get('category_slug')
+    # Only mapped categories are in the map; the rest are on default
+    return load_map()['slugs'].get(slug)
+
+
+def routed(view):
+    """
+    Run a view on the shard of the post, reply or category it acts on:
+    post_id, reply_id or category_slug in the URL, or the category_slug
+    of a new post. Writes to a category that is being moved get a 503.
+    Apply below @api_view.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not is_enabled():
+            return view(request, *args, **kwargs)
+        
+        category_id = request_category(request, kwargs)
+        if category_id is None:
+            return view(request, *args, **kwargs)
+        
+        alias = db_for_category(category_id)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            if category_id in load_map()['moving']:
+                return Response({
+                    'error': 'This category is being moved, please try again shortly'
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            if request.user.is_authenticated:
+                mirror([request.user], alias)
+        
+        with use_shard(alias):
+            return view(request, *args, **kwargs)
+    
+    return wrapper
+
+
+def run_on_shard(func, alias):
+    """Run func(alias) pinned to the shard on a pool thread, releasing its connection"""
+    try:
+        with use_shard(alias):
+            return func(alias)
+    finally:
+        close_old_connections()
+
+
+def scatter(func, aliases=None):
+    """
+    Call func(alias) for every shard, concurrently, and return the results
+    in shard order. Inside a transaction the calls run one after another
+    on this thread's connections, which hold the uncommitted rows.
+    """
+    aliases = shard_aliases() if aliases is None else aliases
+    if len(aliases) == 1 or any(connections[alias].in_atomic_block for alias in aliases):
+        results = []
+        for alias in aliases:
+            with use_shard(alias):
+                results.append(func(alias))
+        return results
+    
+    with ThreadPoolExecutor(max_workers=len(aliases), thread_name_prefix='forum-shards') as executor:
+        return list(executor.map(lambda alias: run_on_shard(func, alias), aliases))
+
+
+def order_comparator(ordering):
+    descending = [name.startswith('-') for name in ordering]
+    
+    def compare(row, other):
+        for value, other_value, reverse in zip(row, other, descending):
+            if value != other_value:
+                return (1 if value < other_value else -1) if reverse else (-1 if value < other_value else 1)
+        return 0
+    
+    return cmp_to_key(compare)
+
+
+def gather_post_page(posts, start, end, user, fields, compact, count=True):
+    """
+    Serialize rows start:end of a ForumPost queryset run on every shard,
+    in the queryset's order. Returns (total, posts, categories) like
+    serialize_posts plus the total row count (None without count).
+    """
+    ordering = [*(posts.query.order_by or ForumPost._meta.ordering), '-pk']
+    columns = [name.lstrip('-') for name in ordering]
+    
+    def top_rows(alias):
+        shard_posts = posts.using(alias)
+        rows = shard_posts.order_by(*ordering).values_list(*columns)[:end]
+        return shard_posts.count() if count else None, [(*row, alias) for row in rows]
+    
+    results = scatter(top_rows)
+    total = sum(shard_count for shard_count, _ in results) if count else None
+    page = list(islice(heapq.merge(*[rows for _, rows in results], key=order_comparator(ordering)), start, end))
+    
+    data, categories = serialize_page(posts.order_by(*ordering), [row[-2:] for row in page], user, fields, compact)
+    return total, data, categories
+
+
+def serialize_page(posts, page, user, fields, compact):
+    """
+    Serialize a merged page of (pk, alias) pairs, in page order, from a
+    ForumPost queryset ordered like the page. Returns (posts, categories)
+    like serialize_posts.
+    """
+    page_pks = {}
+    for pk, alias in page:
+        page_pks.setdefault(alias, []).append(pk)
+    
+    def serialize(alias):
+        return serialize_posts(posts.using(alias).filter(pk__in=page_pks[alias]), user, fields, compact)
+    
+    aliases = list(page_pks)
+    serialized = dict(zip(aliases, scatter(serialize, aliases))) if aliases else {}
+    
+    # Each shard's rows come back in page order; interleave them as merged
+    shard_data = {alias: iter(data) for alias, (data, _) in serialized.items()}
+    data = [next(shard_data[alias]) for _, alias in page]
+    
+    categories = None
+    if compact and 'category' in fields:
+        categories = {}
+        for _, shard_categories in serialized.values():
+            categories.update(shard_categories)
+    return data, categories
+
+
+def gather_keyset_page(queryset, request, field):
+    """
+    keyset_page over every shard: each shard reads its own page and the
+    pages are merged newest first. Primary keys are unique across
+    shards, so cursors work as they are.
+    """
+    if not is_enabled():
+        return keyset_page(queryset, request, field)
+    
+    results = scatter(lambda alias: keyset_page(queryset.using(alias), request, field))
+    error = results[0][2]
+    if error:
+        return None, None, error
+    
+    page_size = page_size_param(request)
+    merged = heapq.merge(
+        *[rows for rows, _, _ in results], key=lambda row: (getattr(row, field), row.pk), reverse=True
+    )
+    rows = list(islice(merged, page_size + 1))
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(getattr(rows[-1], field), rows[-1].pk)
+    
+    return rows, next_cursor, None
+
+
+def init_shard(alias):
+    """
+    Move the id sequences of sharded tables on a shard to its own range,
+    so primary keys stay unique across shards. Idempotent.
+    """
+    start = shard_aliases().index(alias) * ID_SPAN
+    if not start:
+        return
+    
+    connection = connections[alias]
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        raise NotSupportedError(f'Sharding needs SQLite or PostgreSQL shards, not {connection.vendor}')
+    
+    with connection.cursor() as cursor:
+        for model in SHARDED_MODELS:
+            pk = model._meta.pk
+            if pk.is_relation:
+                continue
+            table = model._meta.db_table
+            cursor.execute(f'SELECT MAX({connection.ops.quote_name(pk.column)}) FROM {connection.ops.quote_name(table)}')
+            highest = cursor.fetchone()[0]
+            if highest is not None and highest >= start:
+                continue
+            
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT setval(pg_get_serial_sequence(%s, %s), %s)', [table, pk.column, start])
+                continue
+            cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, start])
+            elif row[0] < start:
+                cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s', [start, table])
+
+
+def copy_rows(rows, target, remap):
+    """
+    Insert rows into target under new primary keys, pointing their
+    foreign keys at the new keys recorded in remap ({label: {old: new}}),
+    and record theirs there. Rows are inserted in the order given, so a
+    self-reference must come after the row it points at.
+    """
+    if not rows:
+        return
+    model = type(rows[0])
+    mapping = remap.setdefault(model._meta.label, {})
+    relations = [
+        (field.attname, remap[field.related_model._meta.label])
+        for field in model._meta.concrete_fields
+        if field.is_relation and field.related_model._meta.label in remap
+    ]
+    
+    for row in rows:
+        old_pk = row.pk
+        for attname, keys in relations:
+            value = getattr(row, attname)
+            if value is not None:
+                setattr(row, attname, keys[value])
+        if not model._meta.pk.is_relation:
+            row.pk = None
+        row._state.adding = True
+        # raw keeps created_at/updated_at instead of stamping them now
+        row.save_base(raw=True, using=target, force_insert=True)
+        mapping[old_pk] = row.pk
+
+
+def copy_posts(pks, source, target):
+    """
+    Copy posts and everything attached to them from source to target in
+    one transaction. Posts already copied by an interrupted move are
+    skipped. Related-post links are not copied (their neighbours may be
+    in other categories); build_related_posts recreates them.
+    """
+    posts = list(ForumPost.objects.using(source).filter(pk__in=pks).order_by('pk'))
+    copied = set(
+        ForumPost.objects.using(target).filter(post_id__in=[post.post_id for post in posts])
+        .values_list('post_id', flat=True)
+    )
+    posts = [post for post in posts if post.post_id not in copied]
+    if not posts:
+        return []
+    pks = [post.pk for post in posts]
+    
+    replies = list(PostReply.objects.using(source).filter(post__in=pks).order_by('pk'))
+    reply_pks = [reply.pk for reply in replies]
+    likes = list(PostLike.objects.using(source).filter(Q(post__in=pks) | Q(reply__in=reply_pks)))
+    post_tags = list(PostTag.objects.using(source).filter(post__in=pks))
+    revisions = list(PostRevision.objects.using(source).filter(post__in=pks))
+    flags = list(ModerationFlag.objects.using(source).filter(post__in=pks))
+    notifications = list(Notification.objects.using(source).filter(post__in=pks))
+    signatures = list(PostSignature.objects.using(source).filter(post__in=pks))
+    bands = list(PostSignatureBand.objects.using(source).filter(post__in=pks))
+    
+    user_ids = {
+        *(post.author_id for post in posts), *(reply.author_id for reply in replies),
+        *(like.user_id for like in likes), *(revision.editor_id for revision in revisions),
+        *(flag.resolved_by_id for flag in flags),
+        *(notification.recipient_id for notification in notifications),
+        *(notification.last_actor_id for notification in notifications),
+    }
+    user_ids.discard(None)
+    
+    with transaction.atomic(using=target):
+        mirror(AnonymousUser.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=user_ids), target)
+        mirror(Tag.objects.using(DEFAULT_DB_ALIAS).filter(pk__in={link.tag_id for link in post_tags}), target)
+        
+        remap = {}
+        for rows in (posts, replies, likes, post_tags, revisions, flags, notifications, signatures, bands):
+            copy_rows(rows, target, remap)
+    
+    return [post.post_id for post in posts]
+
+
+def set_shard(category, alias, is_moving):
+    ShardMap.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        category=category, defaults={'shard': alias, 'is_moving': is_moving}
+    )
+    load_map(force=True)
+
+
+def move_category(category, target, batch_size=MOVE_BATCH_SIZE, wait=None, log=None):
+    """
+    Move a category's content to the target shard. Returns the post_ids
+    of the moved posts; callers drop their cached threads.
+    
+    The category is marked as moving and, after `wait` seconds for every
+    worker to reload the map (FORUM_SHARD_MAP_TTL by default), copied in
+    batches. Then the map is switched to the target and, after another
+    wait for readers of the old shard, the source rows are deleted.
+    """
+    if target not in shard_aliases():
+        raise ValueError(f"'{target}' is not in FORUM_SHARDS")
+    wait = getattr(settings, 'FORUM_SHARD_MAP_TTL', 30) if wait is None else wait
+    
+    source = load_map(force=True)['shards'].get(category.pk, DEFAULT_DB_ALIAS)
+    if source == target:
+        return []
+    
+    init_shard(target)
+    mirror([category], target)
+    set_shard(category, source, is_moving=True)
+    time.sleep(wait)
+    
+    moved = []
+    posts = ForumPost.objects.using(source).filter(category=category).order_by('pk').values_list('pk', flat=True)
+    last_pk = 0
+    while True:
+        chunk = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not chunk:
+            break
+        moved += copy_posts(chunk, source, target)
+        last_pk = chunk[-1]
+        if log:
+            log(f'{category.slug}: copied {len(moved)} posts to {target}')
+    
+    set_shard(category, target, is_moving=False)
+    time.sleep(wait)
+    
+    # Cascades to replies, likes and the rest on the source shard
+    deleted, _ = ForumPost.objects.using(source).filter(category=category).delete()
+    if log:
+        log(f'{category.slug}: deleted {deleted} rows from {source}')
+    return moved
@@ -0,0 +1,113 @@
+"""
+Serializers for the staff-only moderation and analytics endpoints.
+
+They are imported by their views on first use, so API workers don't
+load them (or the analytics module behind EngagementQuerySerializer)
+at boot.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+from . import analytics
+from .models import ForumCategory
+from apps.authentication.models import AnonymousUser
+
+
+class BulkModerationSerializer(serializers.Serializer):
+    """
+    Serializer for bulk moderation requests.
+    Targets are selected by any combination of ids, author and pattern.
+    """
+    ACTIONS = ('lock', 'unlock', 'pin', 'unpin', 'deactivate', 'restore', 'move', 'remove_user_content')
+    
+    action = serializers.ChoiceField(choices=ACTIONS)
+    target = serializers.ChoiceField(choices=('posts', 'replies'), default='posts')
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, max_length=10000)
+    author = serializers.UUIDField(required=False)
+    pattern = serializers.CharField(required=False, min_length=3, max_length=200)
+    category_slug = serializers.SlugField(required=False)
+    
+    def validate_author(self, value):
+        """
+        Validate that the author exists
+        """
+        try:
+            return AnonymousUser.objects.get(user_id=value)
+        except AnonymousUser.DoesNotExist:
+            raise serializers.ValidationError("Invalid author")
+    
+    def validate_category_slug(self, value):
+        """
+        Validate that the category exists
+        """
+        try:
+            return ForumCategory.objects.get(slug=value)
+        except ForumCategory.DoesNotExist:
+            raise serializers.ValidationError("Invalid category")
+    
+    def validate(self, attrs):
+        """
+        Check the action has what it needs
+        """
+        action = attrs['action']
+        
+        if action == 'remove_user_content':
+            if 'author' not in attrs:
+                raise serializers.ValidationError("remove_user_content requires an author")
+            return attrs
+        
+        if not any(key in attrs for key in ('ids', 'author', 'pattern')):
+            raise serializers.ValidationError("Select targets with ids, author and/or pattern")
+        
+        if action == 'move' and 'category_slug' not in attrs:
+            raise serializers.ValidationError("move requires a category_slug")
+        
+        if attrs['target'] == 'replies' and action not in ('deactivate', 'restore'):
+            raise serializers.ValidationError("Replies can only be deactivated or restored")
+        
+        return attrs
+
+
+class EngagementQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of an engagement time series. interval is a number
+    of hours or days ("6h", "1d"); without it, ranges up to two days are
+    hourly and longer ones daily. The range defaults to the last day
+    (hourly) or 30 days (daily).
+    """
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    interval = serializers.RegexField(r'^[1-9][0-9]{0,3}[hd]$', required=False)
+    category = serializers.SlugField(required=False)
+    group = serializers.ChoiceField(choices=('total', 'category'), default='total')
+    
+    def validate_category(self, value):
+        """
+        Validate that the category exists
+        """
+        try:
+            return ForumCategory.objects.get(slug=value)
+        except ForumCategory.DoesNotExist:
+            raise serializers.ValidationError("Invalid category")
+    
+    def validate(self, attrs):
+        """
+        Fill in the defaults and check the range
+        """
+        end = attrs.setdefault('end', timezone.now())
+        if 'interval' in attrs:
+            unit = analytics.HOUR if attrs['interval'][-1] == 'h' else analytics.DAY
+            width = int(attrs['interval'][:-1]) * unit
+        elif 'start' in attrs and end - attrs['start'] > timedelta(days=2):
+            width = analytics.DAY
+        else:
+            width = analytics.HOUR
+        attrs['width'] = width
+        
+        start = attrs.setdefault('start', end - timedelta(days=1 if width < analytics.DAY else 30))
+        if start >= end:
+            raise serializers.ValidationError("start must be before end")
+        if (end - start).total_seconds() / width > analytics.MAX_BUCKETS:
+            raise serializers.ValidationError(f"At most {analytics.MAX_BUCKETS} buckets per series")
+        return attrs
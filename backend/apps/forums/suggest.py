@@ -0,0 +1,363 @@
+"""
+In-memory typeahead over post titles, tag names and category names.
+
+Each kind of suggestion lives in a PrefixIndex: a sorted array of
+normalized keys with a parallel array of references, searched with
+bisect. A title is indexed from its start and from the next few word
+starts, so "sleep" also finds "Can't sleep at night". A lookup is a
+binary search for the prefix's key range and a segment tree walk that
+takes the heaviest entries of the range first, so its cost depends on
+the number of suggestions asked for, not on the number of titles.
+
+The index is per process. It is built on first use, synced every
+FORUM_SUGGEST_SYNC_INTERVAL seconds from posts updated since the last
+sync (tags and categories are small and reloaded whole), rebuilt every
+FORUM_SUGGEST_REBUILD_INTERVAL seconds to drop anything a bulk UPDATE
+changed without touching updated_at or once too many changes have
+piled up on top of the last build, and updated immediately in the
+process that creates or edits a post. Posts are read from every forum
+shard.
+"""
+from array import array
+from bisect import bisect_left
+import heapq
+from itertools import chain
+import threading
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+from . import sharding
+from .matching import normalize
+from .models import ForumCategory, ForumPost, Tag
+
+
+SYNC_INTERVAL = getattr(settings, 'FORUM_SUGGEST_SYNC_INTERVAL', 30)
+REBUILD_INTERVAL = getattr(settings, 'FORUM_SUGGEST_REBUILD_INTERVAL', 3600)
+CACHE_TIMEOUT = getattr(settings, 'FORUM_SUGGEST_CACHE_TIMEOUT', 30)
+
+KEY_LENGTH = 32
+TITLE_WORD_STARTS = 4
+COMPACT_THRESHOLD = 10000
+MIN_PREFIX_LENGTH = 2
+
+
+def title_keys(text):
+    """
+    Index keys for a title: the title from its start and from each of
+    the next few words, truncated to KEY_LENGTH
+    """
+    text = normalize(text)
+    keys = []
+    position = 0
+    while position != -1 and len(keys) < TITLE_WORD_STARTS:
+        keys.append(text[position:position + KEY_LENGTH])
+        position = text.find(' ', position)
+        if position != -1:
+            position += 1
+    return keys
+
+
+class PrefixIndex:
+    """
+    Sorted keys with parallel references, plus per-reference payload
+    and ranking weight.
+    
+    The bulk of the entries sit in immutable base arrays with a segment
+    tree over their weights, so the heaviest entries of a key range come
+    out first however far apart they sort. Later additions go to a small
+    sorted overlay, and base entries of removed or re-added references
+    are skipped through a tombstone set, so neither copies the base
+    arrays. needs_compaction() says when the overlay is due to be folded
+    into a rebuilt index.
+    """
+    
+    def __init__(self):
+        self.keys = []
+        self.refs = []
+        self.weights = array('d')
+        self.tree = array('q', [-1, -1])
+        self.size = 1
+        self.stale = set()  # refs whose base entries are dead
+        self.overlay_keys = []
+        self.overlay_refs = []
+        self.items = {}  # ref -> (text, payload, weight, keys)
+    
+    def __len__(self):
+        return len(self.items)
+    
+    @classmethod
+    def build(cls, rows, make_keys):
+        """
+        Build from (ref, text, payload, weight) rows with one sort
+        """
+        index = cls()
+        pairs = []
+        for ref, text, payload, weight in rows:
+            keys = make_keys(text)
+            index.items[ref] = (text, payload, weight, keys)
+            pairs.extend((key, ref) for key in keys)
+        pairs.sort()
+        index.keys = [key for key, _ in pairs]
+        index.refs = [ref for _, ref in pairs]
+        index.weights = array('d', (index.items[ref][2] for ref in index.refs))
+        index.build_tree()
+        return index
+    
+    def build_tree(self):
+        """
+        Segment tree holding, for each node, the position of the
+        heaviest base entry below it (-1 for none)
+        """
+        count = len(self.keys)
+        size = 1
+        while size < max(count, 1):
+            size *= 2
+        tree = array('q', [-1]) * (2 * size)
+        tree[size:size + count] = array('q', range(count))
+        weights = self.weights
+        for node in range(size - 1, 0, -1):
+            left, right = tree[2 * node], tree[2 * node + 1]
+            tree[node] = left if right == -1 or (left != -1 and weights[left] >= weights[right]) else right
+        self.tree = tree
+        self.size = size
+    
+    def heaviest(self, start, end):
+        """
+        Position of the heaviest base entry in start:end, or -1
+        """
+        tree, weights = self.tree, self.weights
+        best = -1
+        start += self.size
+        end += self.size
+        while start < end:
+            if start & 1:
+                candidate = tree[start]
+                if candidate != -1 and (best == -1 or weights[candidate] > weights[best]
+                                        or (weights[candidate] == weights[best] and candidate < best)):
+                    best = candidate
+                start += 1
+            if end & 1:
+                end -= 1
+                candidate = tree[end]
+                if candidate != -1 and (best == -1 or weights[candidate] > weights[best]
+                                        or (weights[candidate] == weights[best] and candidate < best)):
+                    best = candidate
+            start //= 2
+            end //= 2
+        return best
+    
+    def needs_compaction(self):
+        return len(self.overlay_keys) > COMPACT_THRESHOLD or len(self.stale) > COMPACT_THRESHOLD
+    
+    def add(self, ref, text, payload, weight, make_keys):
+        self.remove(ref)
+        keys = make_keys(text)
+        self.items[ref] = (text, payload, weight, keys)
+        for key in keys:
+            position = bisect_left(self.overlay_keys, key)
+            self.overlay_keys.insert(position, key)
+            self.overlay_refs.insert(position, ref)
+    
+    def remove(self, ref):
+        item = self.items.pop(ref, None)
+        if item is None:
+            return
+        # Base entries can't move; they are skipped from now on
+        self.stale.add(ref)
+        for key in item[3]:
+            position = bisect_left(self.overlay_keys, key)
+            while position < len(self.overlay_keys) and self.overlay_keys[position] == key:
+                if self.overlay_refs[position] == ref:
+                    del self.overlay_keys[position]
+                    del self.overlay_refs[position]
+                    break
+                position += 1
+    
+    def matches(self, ref, prefix):
+        # Keys are truncated, so long prefixes are checked in full
+        return len(prefix) <= KEY_LENGTH or ' ' + prefix in ' ' + normalize(self.items[ref][0])
+    
+    def search(self, prefix, limit):
+        """
+        Payloads of entries with a word starting with prefix, highest
+        weight first
+        """
+        key = prefix[:KEY_LENGTH]
+        found = {}
+        
+        # Overlay entries, few until the next compaction
+        position = bisect_left(self.overlay_keys, key)
+        while position < len(self.overlay_keys) and self.overlay_keys[position].startswith(key):
+            ref = self.overlay_refs[position]
+            position += 1
+            if ref not in found and self.matches(ref, prefix):
+                found[ref] = self.items[ref][2]
+        
+        # The `limit` heaviest live base entries, split around each pick
+        start = bisect_left(self.keys, key)
+        end = bisect_left(self.keys, key + '\U0010ffff')
+        heap = []
+        
+        def push(start, end):
+            if start < end:
+                best = self.heaviest(start, end)
+                heapq.heappush(heap, (-self.weights[best], best, start, end))
+        
+        push(start, end)
+        taken = 0
+        while heap and taken < limit:
+            _, best, start, end = heapq.heappop(heap)
+            push(start, best)
+            push(best + 1, end)
+            ref = self.refs[best]
+            if ref in found or ref in self.stale or not self.matches(ref, prefix):
+                continue
+            found[ref] = self.items[ref][2]
+            taken += 1
+        
+        ranked = sorted(found, key=lambda ref: -found[ref])
+        return [self.items[ref][1] for ref in ranked[:limit]]
+
+
+_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_state = {
+    'posts': None,
+    'tags': None,
+    'categories': None,
+    'built_at': 0.0,
+    'synced_at': 0.0,
+    'watermark': None,
+}
+
+
+def post_row(pk, post_id, title, weight):
+    return pk, title, {'post_id': str(post_id), 'title': title}, weight
+
+
+def load_tags():
+    rows = Tag.objects.filter(post_count__gt=0).values_list('pk', 'name', 'post_count')
+    return PrefixIndex.build(
+        ((pk, name, {'name': name, 'post_count': count}, count) for pk, name, count in rows),
+        lambda text: [normalize(text)[:KEY_LENGTH]]
+    )
+
+
+def load_categories():
+    rows = ForumCategory.objects.filter(is_active=True).values_list('pk', 'name', 'slug', 'order')
+    return PrefixIndex.build(
+        ((pk, name, {'name': name, 'slug': slug}, -order) for pk, name, slug, order in rows),
+        title_keys
+    )
+
+
+def rebuild():
+    """
+    Build all indexes from the database
+    """
+    posts = ForumPost.objects.filter(is_active=True)
+    latest = sharding.scatter(lambda alias: posts.using(alias).aggregate(latest=Max('updated_at'))['latest'])
+    watermark = max(filter(None, latest), default=None)
+    rows = chain.from_iterable(
+        posts.using(alias).values_list('pk', 'post_id', 'title', 'hot_score').iterator(chunk_size=5000)
+        for alias in sharding.shard_aliases()
+    )
+    post_index = PrefixIndex.build((post_row(*row) for row in rows), title_keys)
+    tag_index = load_tags()
+    category_index = load_categories()
+    
+    with _lock:
+        now = time.monotonic()
+        _state.update(
+            posts=post_index, tags=tag_index, categories=category_index,
+            built_at=now, synced_at=now, watermark=watermark
+        )
+
+
+def sync():
+    """
+    Apply posts changed since the last sync and reload tags and categories
+    """
+    posts = ForumPost.objects.all()
+    if _state['watermark'] is not None:
+        posts = posts.filter(updated_at__gt=_state['watermark'])
+    posts = posts.values_list('pk', 'post_id', 'title', 'hot_score', 'is_active', 'updated_at')
+    changed = chain.from_iterable(sharding.scatter(lambda alias: list(posts.using(alias))))
+    tag_index = load_tags()
+    category_index = load_categories()
+    
+    with _lock:
+        for pk, post_id, title, weight, is_active, updated_at in changed:
+            if is_active:
+                _state['posts'].add(*post_row(pk, post_id, title, weight), title_keys)
+            else:
+                _state['posts'].remove(pk)
+            if _state['watermark'] is None or updated_at > _state['watermark']:
+                _state['watermark'] = updated_at
+        _state.update(tags=tag_index, categories=category_index, synced_at=time.monotonic())
+
+
+def needs_rebuild():
+    return (
+        _state['posts'] is None
+        or time.monotonic() - _state['built_at'] > REBUILD_INTERVAL
+        or _state['posts'].needs_compaction()
+    )
+
+
+def ensure_fresh():
+    """
+    Rebuild or sync when due. Only the first build blocks; while one
+    thread refreshes, others keep serving the current index.
+    """
+    if not needs_rebuild() and time.monotonic() - _state['synced_at'] <= SYNC_INTERVAL:
+        return
+    if not _refresh_lock.acquire(blocking=_state['posts'] is None):
+        return
+    try:
+        if needs_rebuild():
+            rebuild()
+        elif time.monotonic() - _state['synced_at'] > SYNC_INTERVAL:
+            sync()
+    finally:
+        _refresh_lock.release()
+
+
+def index_post(post):
+    """
+    Add, update or remove a post in this process's index right away
+    """
+    if _state['posts'] is None:
+        return
+    with _lock:
+        if post.is_active:
+            _state['posts'].add(*post_row(post.pk, post.post_id, post.title, post.hot_score), title_keys)
+        else:
+            _state['posts'].remove(post.pk)
+
+
+def suggest(query, limit=5):
+    """
+    Suggestions for a typed prefix: {'posts', 'tags', 'categories'}.
+    Responses are cached for CACHE_TIMEOUT seconds per prefix.
+    """
+    prefix = normalize(query)
+    if len(prefix) < MIN_PREFIX_LENGTH:
+        return {'posts': [], 'tags': [], 'categories': []}
+    
+    cache_key = f'forums:suggest:{limit}:{quote(prefix)}'
+    suggestions = cache.get(cache_key)
+    if suggestions is None:
+        ensure_fresh()
+        with _lock:
+            suggestions = {
+                'posts': _state['posts'].search(prefix, limit),
+                'tags': _state['tags'].search(prefix, limit),
+                'categories': _state['categories'].search(prefix, limit),
+            }
+        cache.set(cache_key, suggestions, CACHE_TIMEOUT)
+    return suggestions
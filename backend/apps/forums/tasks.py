@@ -0,0 +1,61 @@
+"""
+Minimal background execution for side effects of forum writes.
+
+run_after_commit() schedules a function to run once the current
+transaction commits. With FORUM_TASKS_ASYNC enabled it runs on a small
+thread pool, so notification fan-out and similar work stays off the
+request path; otherwise it runs inline right after the commit. Tasks run
+in a copy of the caller's context, so they keep its forum shard.
+"""
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'FORUM_TASK_WORKERS', 2),
+            thread_name_prefix='forum-tasks'
+        )
+    return _executor
+
+
+def run_task(func, *args):
+    """Run a task, logging instead of raising failures"""
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Forum task %s failed', func.__name__)
+
+
+def run_task_in_thread(func, *args):
+    """Run a task on a pool thread, releasing its database connection"""
+    try:
+        run_task(func, *args)
+    finally:
+        close_old_connections()
+
+
+def run_after_commit(func, *args):
+    """
+    Run func(*args) after the current transaction commits
+    """
+    context = contextvars.copy_context()
+    
+    def submit():
+        if getattr(settings, 'FORUM_TASKS_ASYNC', False):
+            get_executor().submit(context.run, run_task_in_thread, func, *args)
+        else:
+            context.run(run_task, func, *args)
+    
+    transaction.on_commit(submit)
@@ -1,3 +1,2381 @@
-from django.test import TestCase
+import contextvars
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.admin import site
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import NotSupportedError, connection, models, transaction
+from django.db.models import F
+from django.db.migrations.loader import MigrationLoader
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from apps.authentication.models import AnonymousUser
+from mental_health_platform import batch, profiling, renderers, settings_production, startup, throttling
+from . import activity, analytics, backfills, caching, duplicates, idempotency, moderation, notifications, pagination, projections, ranking, related, revisions, screening, sharding, suggest, tasks
+from .admin import ForumPostAdmin, PostReplyAdmin
+from .management.commands import cluster_duplicates
+from .matching import PhraseMatcher
+from .models import (
+    ArchivedPost, BackfillProgress, DailyEngagement, EngagementEvent, ForumCategory, ForumPost, HourlyEngagement,
+    ModerationFlag, Notification, NotificationCounter, PostReply, PostLike, PostRevision, PostSignature, PostSignatureBand,
+    PostTag, RelatedPost, Tag
+)
+from .online_schema import AddIndexOnline
+from .serializers import ForumPostSerializer, PostReplyCreateSerializer
+
+
+class AdminChangelistQueryTests(TestCase):
+    """
+    Changelist pages must not issue per-row queries
+    """
+    MAX_QUERIES = 12
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = AnonymousUser.objects.create_superuser(username='moderator', password='password123')
+        cls.category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+    
+    def setUp(self):
+        self.client.force_login(self.admin)
+    
+    def create_content(self, count):
+        for i in range(count):
+            author = AnonymousUser.objects.create_user(username=f'user{ForumPost.objects.count()}')
+            post = ForumPost.objects.create(title=f'Post {i}', content='...', author=author, category=self.category)
+            reply = PostReply.objects.create(content='...', author=author, post=post)
+            PostReply.objects.create(content='...', author=self.admin, post=post, parent_reply=reply)
+            PostLike.objects.create(user=self.admin, post=post)
+            PostLike.objects.create(user=author, reply=reply)
+    
+    def count_changelist_queries(self, url_name, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name), params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+    
+    def assertConstantQueries(self, url_name, params=None):
+        self.create_content(2)
+        small = self.count_changelist_queries(url_name, params)
+        self.create_content(20)
+        large = self.count_changelist_queries(url_name, params)
+        
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, self.MAX_QUERIES)
+    
+    def test_category_changelist(self):
+        self.assertConstantQueries('admin:forums_forumcategory_changelist')
+    
+    def test_post_changelist(self):
+        self.assertConstantQueries('admin:forums_forumpost_changelist')
+    
+    def test_post_changelist_search(self):
+        self.assertConstantQueries('admin:forums_forumpost_changelist', {'q': 'post'})
+    
+    def test_reply_changelist(self):
+        self.assertConstantQueries('admin:forums_postreply_changelist')
+    
+    def test_like_changelist(self):
+        self.assertConstantQueries('admin:forums_postlike_changelist')
+    
+    def test_like_changelist_lists_likes(self):
+        self.create_content(2)
+        url = reverse('admin:forums_postlike_changelist')
+        
+        response = self.client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 4)
+        self.assertEqual(len(response.context['cl'].result_list), 4)
+        
+        response = self.client.get(url, {'q': '@moderator'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        self.assertEqual({like.user_id for like in response.context['cl'].result_list}, {self.admin.pk})
+    
+    def test_post_search_is_index_backed(self):
+        self.create_content(3)
+        response = self.client.get(reverse('admin:forums_forumpost_changelist'), {'q': 'post 1'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        
+        response = self.client.get(reverse('admin:forums_forumpost_changelist'), {'q': '@user0'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+
+class BackfillTests(TestCase):
+    """
+    Keyset backfills resume where they stopped, and reads switch to the
+    backfilled column only once it is complete
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author', password='password123')
+        cls.category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        cls.posts = []
+        for i in range(5):
+            post = ForumPost.objects.create(title=f'Post {i}', content='...', author=cls.author, category=cls.category)
+            for _ in range(i):
+                PostReply.objects.create(content='...', author=cls.author, post=post)
+            PostReply.objects.create(content='...', author=cls.author, post=post, is_active=False)
+            cls.posts.append(post)
+        # Rows that existed before the column did
+        ForumPost.objects.update(reply_total=None)
+    
+    def setUp(self):
+        backfills._complete.clear()
+    
+    def tearDown(self):
+        backfills._complete.clear()
+    
+    def test_backfill_resumes_from_saved_progress(self):
+        progress = backfills.run('post_reply_total', batch_size=1, limit=2)
+        self.assertEqual(progress.last_pk, self.posts[1].pk)
+        self.assertIsNone(progress.completed_at)
+        self.assertFalse(backfills.is_complete('post_reply_total'))
+        self.assertEqual(ForumPost.objects.filter(reply_total=None).count(), 3)
+        
+        progress = backfills.run('post_reply_total', batch_size=2)
+        self.assertIsNotNone(progress.completed_at)
+        self.assertEqual(progress.rows_done, 5)
+        self.assertEqual(BackfillProgress.objects.count(), 1)
+        self.assertEqual(
+            list(ForumPost.objects.order_by('pk').values_list('reply_total', flat=True)),
+            [0, 1, 2, 3, 4]
+        )
+    
+    def test_reads_switch_after_completion(self):
+        posts = ForumPost.objects.order_by('pk')
+        with CaptureQueriesContext(connection) as queries:
+            before, _ = projections.serialize_posts(posts, fields=('post_id', 'reply_count'))
+        self.assertTrue(any('forum_replies' in query['sql'] for query in queries))
+        
+        backfills.run('post_reply_total')
+        self.assertTrue(backfills.is_complete('post_reply_total'))
+        
+        with CaptureQueriesContext(connection) as queries:
+            after, _ = projections.serialize_posts(posts, fields=('post_id', 'reply_count'))
+        self.assertFalse(any('forum_replies' in query['sql'] for query in queries))
+        self.assertEqual(before, after)
+    
+    def test_writes_maintain_column(self):
+        backfills.run('post_reply_total')
+        post = self.posts[2]
+        
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.post(
+            reverse('forums:reply_to_post', args=[post.post_id]), {'content': 'Same here'}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        post.refresh_from_db()
+        self.assertEqual(post.reply_total, 3)
+        
+        moderation.set_replies_active(PostReply.objects.filter(post=post, is_active=True), False)
+        post.refresh_from_db()
+        self.assertEqual(post.reply_total, 0)
+        
+        created = ForumPost.objects.create(title='New', content='...', author=self.author, category=self.category)
+        self.assertEqual(created.reply_total, 0)
+
+
+class OnlineIndexTests(TransactionTestCase):
+    """
+    AddIndexOnline builds and drops indexes outside a transaction
+    """
+    INDEX_NAME = 'forum_replies_test_online_idx'
+    
+    def apply(self, forwards):
+        state = MigrationLoader(connection).project_state()
+        operation = AddIndexOnline(
+            model_name='postreply',
+            index=models.Index(fields=['post', 'created_at'], name=self.INDEX_NAME)
+        )
+        new_state = state.clone()
+        operation.state_forwards('forums', new_state)
+        with connection.schema_editor(atomic=False) as editor:
+            if forwards:
+                operation.database_forwards('forums', editor, state, new_state)
+            else:
+                operation.database_backwards('forums', editor, new_state, state)
+    
+    def index_names(self):
+        with connection.cursor() as cursor:
+            return set(connection.introspection.get_constraints(cursor, PostReply._meta.db_table))
+    
+    def test_add_and_remove_index(self):
+        self.apply(forwards=True)
+        self.assertIn(self.INDEX_NAME, self.index_names())
+        self.apply(forwards=False)
+        self.assertNotIn(self.INDEX_NAME, self.index_names())
+    
+    @skipUnless(connection.vendor == 'postgresql', 'CREATE INDEX CONCURRENTLY is PostgreSQL only')
+    def test_refuses_to_run_in_transaction(self):
+        with self.assertRaises(NotSupportedError), transaction.atomic():
+            self.apply(forwards=True)
+
+
+class StartupTests(SimpleTestCase):
+    def test_production_settings_drop_dev_apps(self):
+        self.assertNotIn('django_extensions', settings_production.INSTALLED_APPS)
+        self.assertIn('django.contrib.admin.apps.SimpleAdminConfig', settings_production.INSTALLED_APPS)
+        self.assertFalse(settings_production.DEBUG)
+    
+    def test_production_settings_share_the_cache(self):
+        self.assertNotIn('locmem', settings_production.CACHES['default']['BACKEND'])
+        self.assertEqual(list(settings_production.DATABASES), ['default'])
+        self.assertEqual(settings_production.FORUM_SHARDS, ['default'])
+    
+    def test_boot_defers_sharding_and_staff_serializers(self):
+        script = (
+            'import sys, django; django.setup(); '
+            'print("apps.forums.sharding" in sys.modules); '
+            'from mental_health_platform.startup import warm_up; warm_up(); '
+            'print("apps.forums.staff_serializers" in sys.modules)'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE='mental_health_platform.settings_production')
+        )
+        self.assertEqual(result.stdout.split(), ['False', 'False'])
+    
+    def test_admin_urls_resolve_lazily(self):
+        self.assertEqual(resolve('/admin/forums/forumpost/').url_name, 'forums_forumpost_changelist')
+        self.assertEqual(reverse('admin:index'), '/admin/')
+    
+    def test_warm_up(self):
+        models, patterns = startup.warm_up()
+        self.assertGreater(models, 0)
+        self.assertGreater(patterns, 0)
+    
+    def test_parse_importtime(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |     apps.forums.ranking\n'
+            'import time:       300 |        420 |   apps.forums.models\n'
+        )
+        self.assertEqual(startup.parse_importtime(output), [
+            ('apps.forums.ranking', 120, 120, 2),
+            ('apps.forums.models', 300, 420, 1),
+        ])
+
+
+# Sharding is opt-in: its tests need --settings=mental_health_platform.settings_sharding
+SHARDED = 'shard_1' in settings.DATABASES
+
+
+@skipUnless(SHARDED, 'forum sharding tests need the settings_sharding databases')
+@override_settings(FORUM_SHARDS=['default', 'shard_1'], FORUM_SHARD_MAP_TTL=0, FORUM_TASKS_ASYNC=False)
+class ShardingTests(TestCase):
+    """
+    Category sharding: moving a category and serving it from its shard
+    """
+    databases = {'default', 'shard_1'} if SHARDED else {'default'}
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.reader = AnonymousUser.objects.create_user(username='reader')
+        cls.anxiety = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        cls.depression = ForumCategory.objects.create(name='Depression', slug='depression')
+        cls.posts = [
+            ForumPost.objects.create(
+                title=f'Sleep {i}', content='...', author=cls.author,
+                category=cls.anxiety if i % 2 else cls.depression
+            )
+            for i in range(6)
+        ]
+        cls.posts[1].tags = ['insomnia']
+        cls.posts[1].sync_tags()
+        reply = PostReply.objects.create(content='Me too', author=cls.reader, post=cls.posts[1])
+        PostLike.objects.create(user=cls.reader, post=cls.posts[1])
+        PostLike.objects.create(user=cls.author, reply=reply)
+    
+    def setUp(self):
+        cache.clear()
+        # Buffered post views are written to the test databases
+        self.addCleanup(caching.flush_view_counts)
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+    
+    def move(self, slug='anxiety', shard='shard_1'):
+        call_command('move_category', slug, shard, '--wait', '0', stdout=StringIO())
+    
+    def test_move_category(self):
+        self.move()
+        
+        self.assertFalse(ForumPost.objects.using('default').filter(category=self.anxiety).exists())
+        self.assertFalse(PostReply.objects.using('default').exists())
+        moved = ForumPost.objects.using('shard_1').filter(category=self.anxiety)
+        self.assertEqual(
+            sorted(moved.values_list('post_id', flat=True)),
+            sorted(post.post_id for post in self.posts[1::2])
+        )
+        self.assertTrue(all(pk >= sharding.ID_SPAN for pk in moved.values_list('pk', flat=True)))
+        self.assertEqual(PostReply.objects.using('shard_1').get().post.post_id, self.posts[1].post_id)
+        self.assertEqual(PostLike.objects.using('shard_1').count(), 2)
+        self.assertEqual(PostTag.objects.using('shard_1').get().tag.name, 'insomnia')
+        self.assertEqual(ForumPost.objects.using('default').count(), 3)
+        
+        # Running it again finds nothing left to move
+        self.move()
+        self.assertEqual(moved.count(), 3)
+    
+    def test_saved_categories_reach_their_shard_copies(self):
+        self.move()
+        self.anxiety.name = 'Anxiety & panic'
+        self.anxiety.save()
+        
+        self.assertEqual(ForumCategory.objects.using('shard_1').get(pk=self.anxiety.pk).name, 'Anxiety & panic')
+    
+    def test_api_is_served_from_shard(self):
+        self.move()
+        post = self.posts[1]
+        
+        response = self.client.get(reverse('forums:post_detail', args=[post.post_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['replies']), 1)
+        
+        response = self.client.post(reverse('forums:reply_to_post', args=[post.post_id]), {'content': 'Same'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(PostReply.objects.using('shard_1').count(), 2)
+        
+        response = self.client.post(reverse('forums:like_post', args=[self.posts[3].post_id]))
+        self.assertIn(response.status_code, (200, 201))
+        self.assertEqual(ForumPost.objects.using('shard_1').get(post_id=self.posts[3].post_id).like_count, 1)
+        
+        response = self.client.post(reverse('forums:create_post'), {
+            'title': 'Racing thoughts', 'content': 'At night', 'category_slug': 'anxiety'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(ForumPost.objects.using('shard_1').filter(title='Racing thoughts').exists())
+        
+        response = self.client.get(reverse('forums:category_posts', args=['anxiety']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['pagination']['total'], 4)
+    
+    def test_writes_refused_while_moving(self):
+        sharding.set_shard(self.anxiety, 'default', is_moving=True)
+        response = self.client.post(reverse('forums:reply_to_post', args=[self.posts[1].post_id]), {'content': 'Same'}, format='json')
+        self.assertEqual(response.status_code, 503)
+        
+        response = self.client.get(reverse('forums:post_detail', args=[self.posts[1].post_id]))
+        self.assertEqual(response.status_code, 200)
+    
+    def test_search_merges_shards(self):
+        ForumPost.objects.filter(pk=self.posts[4].pk).update(is_pinned=True)
+        self.move()
+        expected = [self.posts[4].post_id, *(post.post_id for post in reversed(self.posts) if post != self.posts[4])]
+        
+        pages = [
+            self.client.get(reverse('forums:search_posts'), {'q': 'sleep', 'page': page, 'page_size': 4}).data
+            for page in (1, 2)
+        ]
+        self.assertEqual(pages[0]['pagination']['total'], 6)
+        self.assertTrue(pages[0]['pagination']['has_next'])
+        self.assertEqual(
+            [str(post['post_id']) for page in pages for post in page['posts']],
+            [str(post_id) for post_id in expected]
+        )
+    
+    def test_notifications_across_shards(self):
+        self.move()
+        with self.captureOnCommitCallbacks(execute=True):
+            for post in self.posts[2:4]:
+                self.client.post(reverse('forums:like_post', args=[post.post_id]))
+        self.assertEqual(Notification.objects.using('shard_1').count(), 1)
+        
+        self.client.force_authenticate(self.author)
+        response = self.client.get(reverse('forums:notifications'), {'page_size': 1})
+        self.assertEqual(response.data['unread_count'], 2)
+        first = response.data['notifications']
+        response = self.client.get(reverse('forums:notifications'), {'page_size': 1, 'cursor': response.data['next_cursor']})
+        self.assertIsNone(response.data['next_cursor'])
+        self.assertEqual(
+            {str(notification['post_id']) for notification in first + response.data['notifications']},
+            {str(post.post_id) for post in self.posts[2:4]}
+        )
+        
+        response = self.client.post(reverse('forums:notifications_read'), {}, format='json')
+        self.assertEqual((response.data['marked'], response.data['unread_count']), (2, 0))
+        self.assertFalse(Notification.objects.using('shard_1').filter(is_read=False).exists())
+    
+    def test_lists_merge_shards(self):
+        for i, post in enumerate(self.posts):
+            ForumPost.objects.filter(pk=post.pk).update(hot_score=i)
+        self.move()
+        
+        response = self.client.get(reverse('forums:trending_posts'), {'limit': 4})
+        self.assertEqual(
+            [post['post_id'] for post in response.data['posts']],
+            [str(post.post_id) for post in self.posts[:1:-1]]
+        )
+        
+        response = self.client.get(reverse('forums:tag_posts', args=['insomnia']))
+        self.assertEqual(response.data['pagination']['total'], 1)
+        self.assertEqual(response.data['posts'][0]['post_id'], str(self.posts[1].post_id))
+        
+        self.client.force_authenticate(self.author)
+        response = self.client.get(reverse('forums:my_posts'), {'page_size': 4})
+        response = self.client.get(reverse('forums:my_posts'), {'page_size': 4, 'cursor': response.data['next_cursor']})
+        self.assertEqual(len(response.data['posts']), 2)
+        
+        self.client.force_authenticate(self.reader)
+        response = self.client.get(reverse('forums:my_replies'))
+        self.assertEqual([reply['content'] for reply in response.data['replies']], ['Me too'])
+    
+    def test_bulk_moderation_on_every_shard(self):
+        self.move()
+        admin = AnonymousUser.objects.create_superuser(username='moderator', password='password123')
+        self.client.force_authenticate(admin)
+        url = reverse('forums:bulk_moderate')
+        
+        response = self.client.post(url, {
+            'action': 'move', 'target': 'posts', 'author': self.author.user_id, 'category_slug': 'depression'
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post(url, {
+            'action': 'deactivate', 'target': 'posts', 'author': self.author.user_id
+        }, format='json')
+        self.assertEqual(response.data['updated'], {'posts': 6})
+        self.assertFalse(ForumPost.objects.using('shard_1').filter(is_active=True).exists())
+        self.assertFalse(PostReply.objects.using('shard_1').filter(is_active=True).exists())
+        self.assertEqual(Tag.objects.get(name='insomnia').post_count, 0)
+    
+    def test_archive_posts_on_shards(self):
+        ForumPost.objects.filter(pk=self.posts[1].pk).update(
+            is_locked=True, last_activity=datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+        )
+        self.move()
+        
+        call_command('archive_posts', stdout=StringIO())
+        
+        self.assertFalse(ForumPost.objects.using('shard_1').filter(post_id=self.posts[1].post_id).exists())
+        self.assertTrue(ArchivedPost.objects.filter(post_id=self.posts[1].post_id, is_public=True).exists())
+        response = self.client.get(reverse('forums:post_detail', args=[self.posts[1].post_id]))
+        self.assertEqual(response.status_code, 200)
+    
+    def test_admin_picks_shard(self):
+        self.move()
+        admin = AnonymousUser.objects.create_superuser(username='moderator', password='password123')
+        self.client.force_login(admin)
+        url = reverse('admin:forums_forumpost_changelist')
+        
+        self.assertEqual(self.client.get(url).context['cl'].result_count, 3)
+        response = self.client.get(url, {'shard': 'shard_1'})
+        self.assertEqual(
+            {post.post_id for post in response.context['cl'].result_list},
+            {post.post_id for post in self.posts[1::2]}
+        )
+        
+        post = ForumPost.objects.using('shard_1').get(post_id=self.posts[1].post_id)
+        response = self.client.get(reverse('admin:forums_forumpost_change', args=[post.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['original'].post_id, post.post_id)
+
+class EngagementAnalyticsTests(TestCase):
+    """
+    Engagement events are rolled up into hourly/daily buckets and served
+    as time series
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = AnonymousUser.objects.create_superuser(username='moderator', password='password123')
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.anxiety = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        cls.depression = ForumCategory.objects.create(name='Depression', slug='depression')
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+    
+    def log(self, kind, category, at, count=1):
+        EngagementEvent.objects.create(kind=kind, category=category, count=count, created_at=at)
+    
+    def test_writes_are_logged(self):
+        response = self.client.post(reverse('forums:create_post'), {
+            'title': 'First', 'content': 'Hello', 'category_slug': 'anxiety'
+        }, format='json')
+        post_id = response.data['post']['post_id']
+        self.client.post(reverse('forums:reply_to_post', args=[post_id]), {'content': 'Hi'}, format='json')
+        self.client.put(reverse('forums:like_post', args=[post_id]))
+        self.client.get(reverse('forums:post_detail', args=[post_id]))
+        caching.flush_view_counts()
+        
+        self.assertEqual(analytics.rollup(), 4)
+        self.assertFalse(EngagementEvent.objects.exists())
+        for model in (HourlyEngagement, DailyEngagement):
+            bucket = model.objects.get()
+            self.assertEqual(
+                (bucket.category_id, bucket.views, bucket.likes, bucket.posts, bucket.replies),
+                (self.anxiety.pk, 1, 1, 1, 1)
+            )
+    
+    def test_rollup_adds_to_existing_buckets(self):
+        at = datetime(2026, 3, 2, 10, 15, tzinfo=dt_timezone.utc)
+        self.log(EngagementEvent.VIEW, self.anxiety, at, count=5)
+        self.log(EngagementEvent.LIKE, self.anxiety, at)
+        analytics.rollup()
+        self.log(EngagementEvent.VIEW, self.anxiety, at + timedelta(minutes=30), count=2)
+        self.log(EngagementEvent.VIEW, self.anxiety, at + timedelta(hours=1))
+        self.assertEqual(analytics.rollup(batch_size=1), 2)
+        
+        hours = HourlyEngagement.objects.order_by('bucket_start').values_list('bucket_start', 'views', 'likes')
+        self.assertEqual(list(hours), [
+            (datetime(2026, 3, 2, 10, tzinfo=dt_timezone.utc), 7, 1),
+            (datetime(2026, 3, 2, 11, tzinfo=dt_timezone.utc), 1, 0),
+        ])
+        day = DailyEngagement.objects.get()
+        self.assertEqual((day.bucket_start, day.views, day.likes), (datetime(2026, 3, 2, tzinfo=dt_timezone.utc), 8, 1))
+    
+    def test_series(self):
+        start = datetime(2026, 3, 2, tzinfo=dt_timezone.utc)
+        for hour, category in ((1, self.anxiety), (5, self.anxiety), (7, self.depression), (30, self.anxiety)):
+            self.log(EngagementEvent.VIEW, category, start + timedelta(hours=hour), count=hour)
+        analytics.rollup()
+        
+        for numpy in (analytics.np, None):
+            with mock.patch.object(analytics, 'np', numpy):
+                buckets, series = analytics.series(start, start + timedelta(days=2), 6 * analytics.HOUR)
+                self.assertEqual(len(buckets), 8)
+                self.assertEqual(series[None]['views'], [6, 7, 0, 0, 0, 30, 0, 0])
+                
+                buckets, series = analytics.series(start, start + timedelta(days=2), analytics.DAY, by_category=True)
+                self.assertEqual(buckets, [start, start + timedelta(days=1)])
+                self.assertEqual(series[self.anxiety.pk]['views'], [6, 30])
+                self.assertEqual(series[self.depression.pk]['views'], [7, 0])
+    
+    def test_endpoint(self):
+        start = datetime(2026, 3, 2, tzinfo=dt_timezone.utc)
+        self.log(EngagementEvent.POST, self.depression, start + timedelta(hours=3))
+        analytics.rollup()
+        url = reverse('forums:engagement')
+        params = {'start': '2026-03-02T00:00:00Z', 'end': '2026-03-03T00:00:00Z', 'interval': '12h', 'group': 'category'}
+        
+        self.assertEqual(self.client.get(url, params).status_code, 403)
+        
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['buckets'], ['2026-03-02T00:00:00Z', '2026-03-02T12:00:00Z'])
+        self.assertEqual(response.data['series']['depression']['posts'], [1, 0])
+        self.assertIsNone(response.data['pending_since'])
+        
+        response = self.client.get(url, {**params, 'interval': '1h', 'start': '2020-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CategorySummaryTests(TestCase):
+    """
+    The category summary comes from a fixed number of queries and is
+    refreshed by writes
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author', display_name='Author')
+        cls.reader = AnonymousUser.objects.create_user(username='reader')
+        cls.anxiety = ForumCategory.objects.create(name='Anxiety', slug='anxiety', order=1)
+        cls.depression = ForumCategory.objects.create(name='Depression', slug='depression', order=2)
+        ForumCategory.objects.create(name='Hidden', slug='hidden', is_active=False)
+    
+    def setUp(self):
+        cache.clear()
+    
+    def create_post(self, category, title, replies=0, **fields):
+        post = ForumPost.objects.create(title=title, content='...', author=self.author, category=category, **fields)
+        activity.touch_category(self.author.pk, category.pk)
+        for _ in range(replies):
+            PostReply.objects.create(content='...', author=self.reader, post=post)
+            ForumPost.objects.filter(pk=post.pk).update(reply_total=F('reply_total') + 1)
+            activity.touch_category(self.reader.pk, category.pk)
+        return post
+    
+    def test_summary(self):
+        self.create_post(self.anxiety, 'Older', replies=2)
+        latest = self.create_post(self.anxiety, 'Newer', replies=1)
+        self.create_post(self.anxiety, 'Removed', replies=4, is_active=False)
+        
+        with self.assertNumQueries(4):
+            summaries = caching.get_category_summaries()
+        
+        self.assertEqual([summary['slug'] for summary in summaries], ['anxiety', 'depression'])
+        anxiety, depression = summaries
+        self.assertEqual(
+            (anxiety['post_count'], anxiety['reply_count'], anxiety['active_users']), (2, 3, 2)
+        )
+        self.assertEqual(anxiety['latest_post']['post_id'], str(latest.post_id))
+        self.assertEqual(anxiety['latest_post']['author']['display_name'], 'Author')
+        self.assertEqual(
+            (depression['post_count'], depression['reply_count'], depression['active_users'], depression['latest_post']),
+            (0, 0, 0, None)
+        )
+        
+        for i in range(5):
+            self.create_post(ForumCategory.objects.create(name=f'Topic {i}', slug=f'topic-{i}'), 'Post', replies=1)
+        cache.clear()
+        with self.assertNumQueries(4):
+            self.assertEqual(len(caching.get_category_summaries()), 7)
+    
+    def test_writes_refresh_summary(self):
+        url = reverse('forums:category_summaries')
+        client = APIClient()
+        self.assertEqual(client.get(url).data['categories'][1]['post_count'], 0)
+        
+        client.force_authenticate(self.author)
+        response = client.post(reverse('forums:create_post'), {
+            'title': 'Low days', 'content': 'Again', 'category_slug': 'depression'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        
+        depression = client.get(url).data['categories'][1]
+        self.assertEqual((depression['post_count'], depression['active_users']), (1, 1))
+        self.assertEqual(depression['latest_post']['title'], 'Low days')
+
+
+class TrendingPostsTests(TestCase):
+    """
+    Trending lists the hottest active posts, with a clamped limit
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        author = AnonymousUser.objects.create_user(username='author')
+        cls.anxiety = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        depression = ForumCategory.objects.create(name='Depression', slug='depression')
+        cls.posts = [
+            ForumPost.objects.create(
+                title=f'Post {i}', content='...', author=author,
+                category=cls.anxiety if i % 2 else depression
+            )
+            for i in range(4)
+        ]
+        for i, post in enumerate(cls.posts):
+            ForumPost.objects.filter(pk=post.pk).update(hot_score=i * 10)
+        ForumPost.objects.filter(pk=cls.posts[3].pk).update(is_active=False)
+    
+    def get_titles(self, **params):
+        response = self.client.get(reverse('forums:trending_posts'), params)
+        self.assertEqual(response.status_code, 200)
+        return [post['title'] for post in response.data['posts']]
+    
+    def test_hottest_first(self):
+        self.assertEqual(self.get_titles(), ['Post 2', 'Post 1', 'Post 0'])
+        self.assertEqual(self.get_titles(category='anxiety'), ['Post 1'])
+        self.assertEqual(self.get_titles(limit=2), ['Post 2', 'Post 1'])
+    
+    def test_bad_limits(self):
+        self.assertEqual(self.get_titles(limit='abc'), ['Post 2', 'Post 1', 'Post 0'])
+        self.assertEqual(self.get_titles(limit=-1), ['Post 2'])
+        self.assertEqual(self.get_titles(limit=0), ['Post 2'])
+        self.assertEqual(len(self.get_titles(limit=1000)), 3)
+
+
+class TagIndexTests(TestCase):
+    """
+    The normalized tag index behind tag pages and autocomplete
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+    
+    def setUp(self):
+        cache.clear()
+    
+    def create_post(self, title, tags, **fields):
+        post = ForumPost.objects.create(
+            title=title, content='...', author=self.author, category=self.category, tags=tags, **fields
+        )
+        post.sync_tags()
+        return post
+    
+    def tag_counts(self):
+        return dict(Tag.objects.values_list('name', 'post_count'))
+    
+    def test_sync_tags(self):
+        post = self.create_post('First', ['Sleep ', 'sleep', 'Panic  Attacks'])
+        self.assertEqual(post.tags, ['sleep', 'panic attacks'])
+        self.assertEqual(self.tag_counts(), {'sleep': 1, 'panic attacks': 1})
+        
+        post.tags = ['sleep', 'work']
+        post.sync_tags()
+        self.assertEqual(set(post.tag_links.values_list('tag__name', flat=True)), {'sleep', 'work'})
+        self.assertEqual(self.tag_counts(), {'sleep': 1, 'panic attacks': 0, 'work': 1})
+    
+    def test_tag_page(self):
+        self.create_post('First', ['sleep'])
+        self.create_post('Second', ['sleep', 'work'])
+        self.create_post('Hidden', ['sleep'], is_active=False)
+        
+        response = self.client.get(reverse('forums:tag_posts', args=['Sleep']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['pagination']['total'], 2)
+        self.assertEqual({post['title'] for post in response.data['posts']}, {'First', 'Second'})
+        
+        self.assertEqual(self.client.get(reverse('forums:tag_posts', args=['missing'])).status_code, 404)
+    
+    def test_autocomplete(self):
+        self.create_post('First', ['sleep', 'social'])
+        self.create_post('Second', ['social'])
+        self.create_post('Third', ['work'])
+        url = reverse('forums:autocomplete_tags')
+        
+        response = self.client.get(url, {'q': 'S'})
+        self.assertEqual([tag['name'] for tag in response.data['tags']], ['social', 'sleep'])
+        
+        response = self.client.get(url, {'q': 'x', 'limit': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['tags'], [])
+        
+        response = self.client.get(url, {'limit': -1})
+        self.assertEqual([tag['name'] for tag in response.data['tags']], ['social'])
+    
+    def test_autocomplete_ranks_all_matching_tags(self):
+        # More matches than a page; the most used ones sort last by name
+        Tag.objects.bulk_create([Tag(name=f'sa{i:03}', post_count=1) for i in range(80)])
+        Tag.objects.bulk_create([Tag(name='sz popular', post_count=9), Tag(name='sz used', post_count=5)])
+        
+        response = self.client.get(reverse('forums:autocomplete_tags'), {'q': 's', 'limit': 3})
+        self.assertEqual([tag['name'] for tag in response.data['tags']], ['sz popular', 'sz used', 'sa000'])
+    
+    def test_admin_edit_syncs_tags(self):
+        post = self.create_post('First', ['sleep'])
+        post.tags = ['Work']
+        request = RequestFactory().post('/')
+        request.user = AnonymousUser.objects.create_superuser(username='moderator', password='password123')
+        
+        ForumPostAdmin(ForumPost, site).save_model(request, post, SimpleNamespace(changed_data=['tags']), True)
+        
+        self.assertEqual(list(post.tag_links.values_list('tag__name', flat=True)), ['work'])
+        self.assertEqual(self.tag_counts(), {'sleep': 0, 'work': 1})
+
+
+@skipUnless(related.np is not None, 'related posts require numpy')
+@override_settings(FORUM_TASKS_ASYNC=False)
+class RelatedPostsTests(TestCase):
+    """
+    Related posts from the TF-IDF index, kept current on new posts and edits
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        texts = [
+            ('Panic attacks at work', 'panic attacks breathing exercises at work meetings'),
+            ('Panic during meetings', 'panic attacks in meetings breathing helps'),
+            ('Sleep schedule', 'insomnia sleep schedule melatonin bedtime routine'),
+            ('Cannot sleep', 'insomnia bedtime routine sleep hygiene'),
+        ]
+        cls.posts = [
+            ForumPost.objects.create(title=title, content=content, author=cls.author, category=cls.category)
+            for title, content in texts
+        ]
+    
+    def setUp(self):
+        index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(index_dir.cleanup)
+        self.enterContext(override_settings(FORUM_RELATED_INDEX_DIR=Path(index_dir.name)))
+        related.build_index(ForumPost.objects.filter(is_active=True))
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+    
+    def get_related_titles(self, post, **params):
+        response = self.client.get(reverse('forums:related_posts', args=[post.post_id]), params)
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.data['related_posts']]
+    
+    def test_related_posts(self):
+        self.assertEqual(self.get_related_titles(self.posts[0])[0], 'Panic during meetings')
+        self.assertEqual(self.get_related_titles(self.posts[2])[0], 'Cannot sleep')
+    
+    def test_bad_limits(self):
+        best = self.get_related_titles(self.posts[0])
+        self.assertEqual(self.get_related_titles(self.posts[0], limit='abc'), best)
+        self.assertEqual(self.get_related_titles(self.posts[0], limit=-1), best[:1])
+        self.assertEqual(self.get_related_titles(self.posts[0], limit=0), best[:1])
+    
+    def test_add_post(self):
+        post = ForumPost.objects.create(
+            title='Sleep and insomnia', content='insomnia sleep routine', author=self.author, category=self.category
+        )
+        related.add_post(post.pk)
+        
+        self.assertEqual(self.get_related_titles(post)[0], 'Cannot sleep')
+        self.assertIn('Sleep and insomnia', self.get_related_titles(self.posts[3]))
+        self.assertEqual(len(related.load_records()), 5)
+    
+    def test_edit_revectorizes(self):
+        post = self.posts[0]
+        url = reverse('forums:edit_post', args=[post.post_id])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(url, {
+                'version': post.version, 'title': 'Insomnia again', 'content': 'insomnia sleep bedtime routine'
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        
+        self.assertEqual(self.get_related_titles(post)[0], 'Cannot sleep')
+        self.assertNotIn('Insomnia again', self.get_related_titles(self.posts[1]))
+        self.assertFalse(RelatedPost.objects.filter(related=post, post=self.posts[1]).exists())
+        # The record is replaced, not appended
+        records = related.load_records()
+        self.assertEqual(len(records), 4)
+        self.assertEqual(list(records['post']).count(post.pk), 1)
+
+
+class ThreadCacheTests(TestCase):
+    """
+    Replies and edits write through to cached post details, other
+    writes retire them by generation, and buffered views reach the
+    database on a timer
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        cls.post = ForumPost.objects.create(title='Thread', content='...', author=cls.author, category=category)
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(caching.flush_view_counts)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+    
+    def reply_contents(self):
+        response = self.client.get(reverse('forums:post_detail', args=[self.post.post_id]))
+        return [reply['content'] for reply in response.data['replies']]
+    
+    def test_replies_and_edits_retire_the_thread(self):
+        self.assertEqual(self.reply_contents(), [])
+        for content in ('First', 'Second'):
+            response = self.client.post(
+                reverse('forums:reply_to_post', args=[self.post.post_id]), {'content': content}, format='json'
+            )
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.reply_contents(), ['First', 'Second'])
+        
+        response = self.client.patch(reverse('forums:edit_post', args=[self.post.post_id]), {
+            'version': self.post.version, 'title': 'Edited'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('forums:post_detail', args=[self.post.post_id]))
+        self.assertEqual(response.data['post']['title'], 'Edited')
+    
+    def anonymous_detail(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(reverse('forums:post_detail', args=[self.post.post_id]))
+        return response.data, len(queries)
+    
+    def test_replies_and_edits_write_through(self):
+        self.anonymous_detail()
+        response = self.client.post(
+            reverse('forums:reply_to_post', args=[self.post.post_id]), {'content': 'First'}, format='json'
+        )
+        reply_id = response.data['reply']['reply_id']
+        
+        data, queries = self.anonymous_detail()
+        self.assertEqual(queries, 0)
+        self.assertEqual([reply['content'] for reply in data['replies']], ['First'])
+        self.assertEqual(data['post']['reply_count'], 1)
+        
+        self.client.patch(reverse('forums:edit_post', args=[self.post.post_id]), {
+            'version': 1, 'title': 'Edited', 'tags': ['Sleep']
+        }, format='json')
+        self.client.patch(reverse('forums:edit_reply', args=[reply_id]), {'version': 1, 'content': 'Changed'}, format='json')
+        
+        data, queries = self.anonymous_detail()
+        self.assertEqual(queries, 0)
+        self.assertEqual((data['post']['title'], data['post']['tags'], data['post']['version']), ('Edited', ['sleep'], 2))
+        self.assertEqual((data['replies'][0]['content'], data['replies'][0]['version']), ('Changed', 2))
+        
+        # The patched document matches a fresh build
+        caching.invalidate_threads([self.post.post_id])
+        rebuilt, _ = self.anonymous_detail()
+        self.assertEqual(rebuilt['post'] | {'view_count': 0}, data['post'] | {'view_count': 0})
+        self.assertEqual(rebuilt['replies'], data['replies'])
+    
+    def test_write_through_yields_to_a_concurrent_write(self):
+        self.anonymous_detail()
+        incr = cache.incr
+        
+        def racing_incr(key, *args):
+            # A moderation bump lands between the read and this bump
+            incr(key)
+            return incr(key, *args)
+        
+        reply = PostReply.objects.create(post=self.post, author=self.author, content='Raced')
+        with mock.patch.object(caching.cache, 'incr', side_effect=racing_incr):
+            caching.add_reply(self.post, reply)
+        
+        data, queries = self.anonymous_detail()
+        self.assertGreater(queries, 0)
+        self.assertEqual([reply['content'] for reply in data['replies']], ['Raced'])
+    
+    def test_stale_rebuild_is_not_served(self):
+        # A reader loads the post, then a reply lands before it caches it
+        generation = caching.get_thread_generation(self.post.post_id)
+        stale = ForumPost.objects.get(pk=self.post.pk)
+        PostReply.objects.create(post=self.post, author=self.author, content='Late')
+        caching.invalidate_threads([self.post.post_id])
+        caching.build_thread(stale, generation)
+        
+        self.assertEqual(self.reply_contents(), ['Late'])
+    
+    def test_moderated_thread_is_not_served(self):
+        self.assertEqual(self.reply_contents(), [])
+        ForumPost.objects.filter(pk=self.post.pk).update(is_active=False)
+        caching.invalidate_threads([self.post.post_id])
+        
+        self.assertIsNone(caching.get_thread(self.post.post_id))
+    
+    def test_lost_generation_retires_the_thread(self):
+        caching.get_thread(self.post.post_id)
+        PostReply.objects.create(post=self.post, author=self.author, content='Unseen')
+        cache.delete(caching.thread_generation_key(self.post.post_id))
+        
+        self.assertEqual(self.reply_contents(), ['Unseen'])
+    
+    def test_views_flush_on_a_timer(self):
+        with mock.patch.object(caching.threading, 'Timer') as timer:
+            self.reply_contents()
+            self.reply_contents()
+        timer.assert_called_once_with(caching.VIEW_FLUSH_INTERVAL, tasks.run_task_in_thread, args=(caching.flush_view_counts,))
+        timer.return_value.start.assert_called_once_with()
+        
+        caching.flush_view_counts()
+        timer.return_value.cancel.assert_called_once_with()
+        self.assertEqual(ForumPost.objects.get(pk=self.post.pk).view_count, 2)
+    
+    def test_flush_builds_on_the_stored_hot_score(self):
+        with mock.patch.object(caching.threading, 'Timer'):
+            self.reply_contents()
+        # A like lands between the view and the flush
+        now = datetime.now(dt_timezone.utc)
+        ForumPost.objects.filter(pk=self.post.pk).update(hot_score=5.0, hot_score_at=now)
+        
+        caching.flush_view_counts()
+        
+        post = ForumPost.objects.get(pk=self.post.pk)
+        expected = ranking.decayed_score(5.0, now, post.hot_score_at) + ranking.VIEW_WEIGHT
+        self.assertAlmostEqual(post.hot_score, expected)
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'forum_reply': '2/min'}
+})
+class ThrottleTests(TestCase):
+    """
+    Token buckets refuse writes past their capacity with a Retry-After,
+    refill over time and never hand out a token twice
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        cls.post = ForumPost.objects.create(title='Thread', content='...', author=cls.author, category=category)
+    
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        self.enterContext(mock.patch.object(throttling.TokenBucketThrottle, 'timer', new=staticmethod(lambda: self.now)))
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+    
+    def reply(self, content='Hello'):
+        return self.client.post(
+            reverse('forums:reply_to_post', args=[self.post.post_id]), {'content': content}, format='json'
+        )
+    
+    def test_bucket_empties_and_refills(self):
+        self.assertEqual(self.reply('One').status_code, 201)
+        self.assertEqual(self.reply('Two').status_code, 201)
+        
+        response = self.reply('Three')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        
+        # One token back after half the period
+        self.now += 30
+        self.assertEqual(self.reply('Three').status_code, 201)
+        self.assertEqual(self.reply('Four').status_code, 429)
+    
+    def test_bucket_is_per_user(self):
+        other = AnonymousUser.objects.create_user(username='other')
+        self.reply('One')
+        self.reply('Two')
+        self.assertEqual(self.reply('Three').status_code, 429)
+        
+        self.client.force_authenticate(other)
+        self.assertEqual(self.reply('Three').status_code, 201)
+    
+    def test_held_bucket_refuses_instead_of_overspending(self):
+        throttle = throttling.ForumReplyThrottle()
+        request = SimpleNamespace(user=self.author)
+        key = throttle.cache_format % {
+            'scope': throttle.scope,
+            'ident': throttling.blake2b(f'user:{self.author.pk}'.encode('utf-8'), digest_size=16).hexdigest()
+        }
+        cache.add(f'{key}:lock', 1)
+        with mock.patch.object(throttling.TokenBucketThrottle, 'sleep') as sleep:
+            self.assertFalse(throttle.allow_request(request, None))
+        self.assertEqual(sleep.call_count, throttling.LOCK_ATTEMPTS)
+        self.assertEqual(throttle.wait(), throttling.LOCK_TIMEOUT)
+        
+        cache.delete(f'{key}:lock')
+        self.assertTrue(throttle.allow_request(request, None))
+    
+    def test_concurrent_requests_share_the_bucket(self):
+        request = SimpleNamespace(user=self.author)
+        allowed = []
+        barrier = threading.Barrier(8)
+        
+        def check():
+            throttle = throttling.ForumReplyThrottle()
+            barrier.wait()
+            allowed.append(throttle.allow_request(request, None))
+        
+        threads = [threading.Thread(target=check) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(allowed.count(True), 2)
+
+
+class IdempotencyTests(TestCase):
+    """
+    A repeated Idempotency-Key replays the first response instead of
+    writing again
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        cls.post = ForumPost.objects.create(title='Thread', content='...', author=cls.author, category=category)
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+    
+    def reply(self, content, key='retry-key'):
+        return self.client.post(
+            reverse('forums:reply_to_post', args=[self.post.post_id]), {'content': content},
+            format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+    
+    def test_retry_replays_the_first_response(self):
+        first = self.reply('Hello')
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', first)
+        
+        retry = self.reply('Hello')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(PostReply.objects.filter(post=self.post).count(), 1)
+    
+    def test_key_is_per_user(self):
+        self.reply('Hello')
+        other = AnonymousUser.objects.create_user(username='other')
+        self.client.force_authenticate(other)
+        
+        response = self.reply('Hello')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(PostReply.objects.filter(post=self.post).count(), 2)
+    
+    def test_key_reused_for_a_different_body(self):
+        self.reply('Hello')
+        
+        response = self.reply('Something else')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(PostReply.objects.filter(post=self.post).count(), 1)
+    
+    def test_retry_while_the_first_is_running(self):
+        # The first request holds the key's lock until it finishes
+        request = SimpleNamespace(user=self.author, method='POST', path=reverse(
+            'forums:reply_to_post', args=[self.post.post_id]
+        ))
+        cache.add(f"{idempotency.store_key(request, 'retry-key')}:lock", 1)
+        
+        response = self.reply('Hello')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(PostReply.objects.filter(post=self.post).exists())
+    
+    def test_failed_request_releases_the_key(self):
+        with mock.patch.object(PostReplyCreateSerializer, 'save', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.reply('Hello')
+        
+        response = self.reply('Hello')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+
+class BulkModerationTests(TestCase):
+    """
+    Bulk moderation cascades through reply trees and keeps reply, tag
+    and per-user counters in step
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.replier = AnonymousUser.objects.create_user(username='replier')
+        cls.admin = AnonymousUser.objects.create_superuser(username='moderator', password='password123')
+        category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        cls.post = ForumPost.objects.create(
+            title='Thread', content='...', author=cls.author, category=category, tags=['sleep']
+        )
+        cls.post.sync_tags()
+        # A chain of nested replies: reply -> child -> grandchild -> ...
+        cls.chain = []
+        parent = None
+        for depth in range(4):
+            parent = PostReply.objects.create(
+                post=cls.post, author=cls.replier, content=f'Depth {depth}', parent_reply=parent
+            )
+            cls.chain.append(parent)
+        cls.other = PostReply.objects.create(post=cls.post, author=cls.author, content='Unrelated')
+        moderation.recount_post_replies([cls.post.pk])
+        activity.record(cls.replier.pk, touch=False, reply_count=4)
+        activity.record(cls.author.pk, touch=False, post_count=1, reply_count=1)
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def moderate(self, **data):
+        return self.client.post(reverse('forums:bulk_moderate'), data, format='json')
+    
+    def test_deactivating_a_reply_hides_its_whole_subtree(self):
+        response = self.moderate(action='deactivate', target='replies', ids=[str(self.chain[0].reply_id)])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], {'replies': 1})
+        
+        self.assertFalse(PostReply.objects.filter(pk__in=[reply.pk for reply in self.chain], is_active=True).exists())
+        self.assertTrue(PostReply.objects.get(pk=self.other.pk).is_active)
+        self.assertEqual(ForumPost.objects.get(pk=self.post.pk).reply_total, 1)
+        self.assertEqual(activity.get_stats(self.replier)['reply_count'], 0)
+        self.assertEqual(activity.get_stats(self.author)['reply_count'], 1)
+    
+    def test_cascade_reaches_below_inactive_replies(self):
+        # A reply restored on its own under an already hidden parent
+        PostReply.objects.filter(pk=self.chain[1].pk).update(is_active=False)
+        
+        self.moderate(action='deactivate', target='replies', ids=[str(self.chain[0].reply_id)])
+        self.assertFalse(PostReply.objects.filter(pk=self.chain[3].pk, is_active=True).exists())
+    
+    def test_restore_brings_back_only_the_targets(self):
+        self.moderate(action='deactivate', target='replies', ids=[str(self.chain[0].reply_id)])
+        
+        self.moderate(action='restore', target='replies', ids=[str(self.chain[0].reply_id)])
+        self.assertEqual(
+            list(PostReply.objects.filter(pk__in=[reply.pk for reply in self.chain]).order_by('pk').values_list('is_active', flat=True)),
+            [True, False, False, False]
+        )
+        self.assertEqual(ForumPost.objects.get(pk=self.post.pk).reply_total, 2)
+        self.assertEqual(activity.get_stats(self.replier)['reply_count'], 1)
+    
+    def test_deactivating_posts_recounts_replies_and_tags(self):
+        response = self.moderate(action='deactivate', target='posts', author=str(self.author.user_id))
+        self.assertEqual(response.data['updated'], {'posts': 1})
+        
+        self.assertFalse(PostReply.objects.filter(post=self.post, is_active=True).exists())
+        self.assertEqual(ForumPost.objects.get(pk=self.post.pk).reply_total, 0)
+        self.assertEqual(Tag.objects.get(name='sleep').post_count, 0)
+        self.assertEqual(activity.get_stats(self.author)['post_count'], 0)
+        self.assertEqual(activity.get_stats(self.replier)['reply_count'], 0)
+        
+        self.moderate(action='restore', target='posts', author=str(self.author.user_id))
+        self.assertEqual(Tag.objects.get(name='sleep').post_count, 1)
+        self.assertEqual(activity.get_stats(self.author)['post_count'], 1)
+    
+    def test_invalid_ids_are_a_validation_error(self):
+        # List field errors are keyed by index, which the renderer must accept
+        response = self.moderate(action='lock', ids=['nope'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)['ids'], {'0': ['Must be a valid UUID.']})
+    
+    def test_post_actions_and_patterns(self):
+        response = self.moderate(action='lock', target='posts', pattern='Thread')
+        self.assertEqual(response.data['updated'], {'posts': 1})
+        self.assertTrue(ForumPost.objects.get(pk=self.post.pk).is_locked)
+    
+    def test_remove_user_content(self):
+        PostLike.objects.create(user=self.replier, post=self.post)
+        moderation.recount_post_likes([self.post.pk])
+        
+        response = self.moderate(action='remove_user_content', author=str(self.replier.user_id))
+        self.assertEqual(response.data['updated'], {'posts': 0, 'replies': 4, 'likes': 1})
+        self.assertEqual(ForumPost.objects.get(pk=self.post.pk).like_count, 0)
+        self.assertEqual(ForumPost.objects.get(pk=self.post.pk).reply_total, 1)
+    
+    def test_requires_staff(self):
+        self.client.force_authenticate(self.replier)
+        response = self.moderate(action='lock', target='posts', pattern='Thread')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(FORUM_TASKS_ASYNC=False)
+class NotificationTests(TestCase):
+    """
+    Likes and replies coalesce per distinct user into one unread
+    notification, and unlikes take their user back out
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.fans = [AnonymousUser.objects.create_user(username=f'fan{index}') for index in range(2)]
+        category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        cls.post = ForumPost.objects.create(title='Thread', content='...', author=cls.author, category=category)
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+    
+    def act(self, user, method, url, data=None):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 300)
+        return response
+    
+    def like(self, user, liked=True):
+        return self.act(user, 'put' if liked else 'delete', reverse('forums:like_post', args=[self.post.post_id]))
+    
+    def reply(self, user, content):
+        return self.act(user, 'post', reverse('forums:reply_to_post', args=[self.post.post_id]), {'content': content})
+    
+    def inbox(self):
+        return list(Notification.objects.filter(recipient=self.author, is_read=False))
+    
+    def test_likes_coalesce_per_distinct_user(self):
+        first, second = self.fans
+        self.like(first)
+        self.like(second)
+        self.like(first, False)
+        self.like(second, False)
+        self.like(second)
+        
+        [notification] = self.inbox()
+        self.assertEqual(notification.kind, 'post_like')
+        self.assertEqual(notification.actor_count, 1)
+        self.assertEqual(notification.last_actor_id, second.pk)
+        self.assertEqual(NotificationCounter.get_unread_count(self.author), 1)
+    
+    def test_repeat_replies_count_once(self):
+        first, second = self.fans
+        for user, content in ((first, 'One'), (second, 'Two'), (first, 'Three')):
+            self.reply(user, content)
+        
+        [notification] = self.inbox()
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.last_actor_id, first.pk)
+        
+        self.client.force_authenticate(self.author)
+        response = self.client.get(reverse('forums:notifications'))
+        self.assertEqual(response.data['notifications'][0]['actor_count'], 2)
+    
+    def test_unlike_retracts_the_notification(self):
+        first, second = self.fans
+        self.like(first)
+        self.like(second)
+        
+        self.like(second, False)
+        [notification] = self.inbox()
+        self.assertEqual((notification.actor_count, notification.last_actor_id), (1, first.pk))
+        
+        self.like(first, False)
+        self.assertEqual(self.inbox(), [])
+        self.assertEqual(NotificationCounter.get_unread_count(self.author), 0)
+    
+    def test_read_notifications_are_not_reopened(self):
+        first, second = self.fans
+        self.like(first)
+        notifications.mark_read(self.author)
+        
+        self.like(first, False)
+        self.like(second)
+        self.assertEqual(Notification.objects.filter(recipient=self.author).count(), 2)
+        [notification] = self.inbox()
+        self.assertEqual(notification.actor_count, 1)
+        self.assertEqual(NotificationCounter.get_unread_count(self.author), 1)
+
+
+class TaskContextTests(TestCase):
+    """
+    After-commit tasks run in a copy of the caller's context, on the
+    pool or inline, and log failures instead of raising
+    """
+    probe = contextvars.ContextVar('probe', default=None)
+    
+    def run_task(self):
+        seen = []
+        done = threading.Event()
+        
+        def task():
+            seen.append((self.probe.get(), sharding.current_shard(), threading.current_thread().name))
+            done.set()
+        
+        token = self.probe.set('request')
+        try:
+            with sharding.use_shard('default'), self.captureOnCommitCallbacks(execute=True):
+                tasks.run_after_commit(task)
+                # Changes after scheduling are not seen by the task
+                self.probe.set('later')
+        finally:
+            self.probe.reset(token)
+        self.assertTrue(done.wait(5))
+        return seen[0]
+    
+    @override_settings(FORUM_TASKS_ASYNC=True)
+    def test_pool_tasks_keep_the_callers_context(self):
+        probe, shard, thread_name = self.run_task()
+        self.assertEqual((probe, shard), ('request', 'default'))
+        self.assertTrue(thread_name.startswith('forum-tasks'))
+    
+    @override_settings(FORUM_TASKS_ASYNC=False)
+    def test_inline_tasks_keep_the_callers_context(self):
+        probe, shard, thread_name = self.run_task()
+        self.assertEqual((probe, shard), ('request', 'default'))
+        self.assertEqual(thread_name, threading.current_thread().name)
+    
+    @override_settings(FORUM_TASKS_ASYNC=False)
+    def test_failures_are_logged(self):
+        def fail():
+            raise RuntimeError('boom')
+        
+        with self.assertLogs('apps.forums.tasks', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            tasks.run_after_commit(fail)
+
+
+class ExcerptTests(TestCase):
+    """
+    The excerpt follows the content, and only saves of the content
+    recompute it
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        author = AnonymousUser.objects.create_user(username='author')
+        category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        cls.post = ForumPost.objects.create(title='Thread', content='First   draft', author=author, category=category)
+    
+    def test_content_saves_update_the_excerpt(self):
+        self.assertEqual(self.post.excerpt, 'First draft')
+        self.post.content = 'Second draft'
+        self.post.save(update_fields=['content'])
+        self.assertEqual(ForumPost.objects.get(pk=self.post.pk).excerpt, 'Second draft')
+    
+    def test_other_saves_skip_the_excerpt(self):
+        self.post.like_count = 3
+        with mock.patch('apps.forums.models.make_excerpt') as make_excerpt, CaptureQueriesContext(connection) as queries:
+            self.post.save(update_fields=['like_count'])
+        make_excerpt.assert_not_called()
+        self.assertNotIn('excerpt', queries[-1]['sql'])
+
+
+@override_settings(FORUM_TASKS_ASYNC=False, FORUM_SCREENING_ENABLED=False)
+class DuplicatePostTests(TestCase):
+    """
+    MinHash signatures, the LSH lookup and how near-duplicate posts are
+    blocked, flagged and clustered
+    """
+    TEXT = (
+        'I have been struggling to sleep for weeks because my mind keeps racing at night '
+        'about work and family, and breathing exercises have not helped much at all'
+    )
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.other = AnonymousUser.objects.create_user(username='other')
+        cls.category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.enterContext(mock.patch.object(related, 'add_post'))
+    
+    def create(self, user, title='Cannot sleep', content=TEXT):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('forums:create_post'), {
+                'title': title, 'content': content, 'category_slug': 'anxiety'
+            }, format='json')
+    
+    def test_numpy_and_pure_python_signatures_match(self):
+        if duplicates.np is None:
+            self.skipTest('numpy is not installed')
+        text = duplicates.post_text('Cannot sleep', self.TEXT)
+        with_numpy = duplicates.compute_signature(text)
+        with mock.patch.object(duplicates, 'np', None):
+            self.assertEqual(duplicates.compute_signature(text), with_numpy)
+        self.assertEqual(len(with_numpy), duplicates.NUM_PERM)
+        self.assertIsNone(duplicates.compute_signature('?! ...'))
+    
+    def test_lsh_lookup_finds_near_duplicates_only(self):
+        post = ForumPost.objects.create(title='Cannot sleep', content=self.TEXT, author=self.author, category=self.category)
+        unrelated = ForumPost.objects.create(
+            title='Gardening', content='Planting tomatoes on the balcony has been calming', author=self.author, category=self.category
+        )
+        duplicates.index_posts({
+            p.pk: duplicates.compute_signature(duplicates.post_text(p.title, p.content)) for p in (post, unrelated)
+        })
+        
+        signature = duplicates.compute_signature(duplicates.post_text('Cannot sleep', self.TEXT + ' tonight'))
+        self.assertEqual([pk for pk, _ in duplicates.find_duplicates(signature)], [post.pk])
+        self.assertEqual(duplicates.find_duplicates(signature, exclude=post.pk), [])
+    
+    def test_reposting_your_own_post_is_rejected(self):
+        first = self.create(self.author)
+        self.assertEqual(first.status_code, 201)
+        
+        response = self.create(self.author)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(str(response.data['duplicate_of']), first.data['post']['post_id'])
+        self.assertEqual(ForumPost.objects.count(), 1)
+    
+    def test_flag_mode_queues_other_users_duplicates(self):
+        original = self.create(self.author)
+        
+        response = self.create(self.other)
+        self.assertEqual(response.status_code, 201)
+        flag = ModerationFlag.objects.get(category='duplicate')
+        self.assertEqual(str(flag.post.post_id), response.data['post']['post_id'])
+        self.assertEqual(flag.matched_phrases, [original.data['post']['post_id']])
+    
+    @override_settings(FORUM_DUPLICATE_ACTION='block')
+    def test_block_mode_rejects_other_users_duplicates(self):
+        self.create(self.author)
+        
+        self.assertEqual(self.create(self.other).status_code, 409)
+        self.assertEqual(ForumPost.objects.count(), 1)
+    
+    def test_busy_buckets_refuse_instead_of_racing(self):
+        signature = duplicates.compute_signature(duplicates.post_text('Cannot sleep', self.TEXT))
+        with duplicates.bucket_locks(signature), mock.patch.object(duplicates, 'LOCK_WAIT', 0):
+            response = self.create(self.author)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        
+        self.assertEqual(self.create(self.author).status_code, 201)
+    
+    def test_edits_are_checked_and_reindexed(self):
+        self.create(self.author)
+        response = self.create(self.author, 'Gardening', 'Planting tomatoes on the balcony has been calming')
+        post = ForumPost.objects.get(post_id=response.data['post']['post_id'])
+        url = reverse('forums:edit_post', args=[post.post_id])
+        self.client.force_authenticate(self.author)
+        
+        response = self.client.patch(url, {'version': post.version, 'title': 'Cannot sleep', 'content': self.TEXT}, format='json')
+        self.assertEqual(response.status_code, 409)
+        
+        # An edit leaving no words drops the stale signature
+        response = self.client.patch(url, {'version': post.version, 'title': '?!', 'content': '...'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(PostSignature.objects.filter(post=post).exists())
+        self.assertFalse(PostSignatureBand.objects.filter(post=post).exists())
+    
+    def test_cluster_duplicates(self):
+        posts = [
+            ForumPost.objects.create(title='Cannot sleep', content=self.TEXT + suffix, author=self.author, category=self.category)
+            for suffix in ('', ' again', ' tonight')
+        ]
+        ForumPost.objects.create(
+            title='Gardening', content='Planting tomatoes on the balcony has been calming', author=self.author, category=self.category
+        )
+        
+        for numpy in {duplicates.np, None}:
+            with self.subTest(numpy=numpy is not None), mock.patch.object(cluster_duplicates, 'np', numpy):
+                out = StringIO()
+                call_command('cluster_duplicates', '--index', stdout=out)
+                self.assertIn('1 duplicate clusters found', out.getvalue())
+        
+        call_command('cluster_duplicates', '--flag', stdout=StringIO())
+        self.assertEqual(
+            set(ModerationFlag.objects.filter(category='duplicate').values_list('post_id', flat=True)),
+            {posts[1].pk, posts[2].pk}
+        )
+
+
+class LikedStateTests(TestCase):
+    """
+    liked_by_me reflects the requesting user's likes and is looked up
+    once per page, not once per row
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.reader = AnonymousUser.objects.create_user(username='reader')
+        cls.category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        cls.liked = ForumPost.objects.create(title='Liked', content='...', author=cls.author, category=cls.category)
+        cls.unliked = ForumPost.objects.create(title='Unliked', content='...', author=cls.author, category=cls.category)
+        PostLike.objects.create(user=cls.reader, post=cls.liked)
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(caching.flush_view_counts)
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+    
+    def liked_titles(self, url, params=None):
+        response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return {post['title']: post['liked_by_me'] for post in response.data['posts']}
+    
+    def test_lists_mark_liked_posts(self):
+        expected = {'Liked': True, 'Unliked': False}
+        self.assertEqual(self.liked_titles(reverse('forums:category_posts', args=['anxiety'])), expected)
+        self.assertEqual(self.liked_titles(reverse('forums:search_posts'), {'q': 'liked'}), expected)
+        
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            self.liked_titles(reverse('forums:category_posts', args=['anxiety'])),
+            {'Liked': False, 'Unliked': False}
+        )
+    
+    def test_post_detail_marks_liked_post_and_replies(self):
+        liked = PostReply.objects.create(post=self.liked, author=self.author, content='Liked reply')
+        PostReply.objects.create(post=self.liked, author=self.author, content='Unliked reply')
+        PostLike.objects.create(user=self.reader, reply=liked)
+        
+        response = self.client.get(reverse('forums:post_detail', args=[self.liked.post_id]))
+        self.assertTrue(response.data['post']['liked_by_me'])
+        self.assertEqual(
+            [(reply['content'], reply['liked_by_me']) for reply in response.data['replies']],
+            [('Liked reply', True), ('Unliked reply', False)]
+        )
+        
+        # The cached thread is shared, likes are not
+        self.client.force_authenticate(self.author)
+        response = self.client.get(reverse('forums:post_detail', args=[self.liked.post_id]))
+        self.assertFalse(response.data['post']['liked_by_me'])
+        self.assertEqual([reply['liked_by_me'] for reply in response.data['replies']], [False, False])
+    
+    def test_my_replies_mark_liked_replies(self):
+        reply = PostReply.objects.create(post=self.liked, author=self.reader, content='Mine')
+        PostReply.objects.create(post=self.unliked, author=self.reader, content='Also mine')
+        PostLike.objects.create(user=self.reader, reply=reply)
+        
+        response = self.client.get(reverse('forums:my_replies'))
+        self.assertEqual(
+            {reply['content']: reply['liked_by_me'] for reply in response.data['replies']},
+            {'Mine': True, 'Also mine': False}
+        )
+    
+    def test_list_queries_do_not_grow_with_the_page(self):
+        url = reverse('forums:category_posts', args=['anxiety'])
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        
+        for i in range(10):
+            post = ForumPost.objects.create(title=f'Post {i}', content='...', author=self.author, category=self.category)
+            PostLike.objects.create(user=self.reader, post=post)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        
+        self.assertEqual(len(response.data['posts']), 12)
+        self.assertEqual(len(small), len(large))
+
+
+class PostProjectionTests(TestCase):
+    """
+    Post lists are built from .values() rows: `fields` picks the output,
+    compact=1 moves categories into a side table
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        for i in range(3):
+            post = ForumPost.objects.create(
+                title=f'Post {i}', content='Body ' * 50, author=cls.author, category=cls.category, tags=['sleep']
+            )
+            PostReply.objects.create(post=post, author=cls.author, content='...')
+        PostLike.objects.create(user=cls.author, post=post)
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+        self.url = reverse('forums:category_posts', args=['anxiety'])
+    
+    def test_full_fields_match_the_serializer(self):
+        posts = ForumPost.objects.order_by('pk')
+        data, categories = projections.serialize_posts(posts, self.author)
+        
+        liked_post_ids, _ = PostLike.liked_ids(self.author, [post.pk for post in posts])
+        expected = ForumPostSerializer(posts, many=True, context={'liked_post_ids': liked_post_ids}).data
+        self.assertIsNone(categories)
+        self.assertEqual(json.loads(json.dumps(data)), json.loads(JSONRenderer().render(expected)))
+    
+    def test_lists_default_to_list_fields(self):
+        response = self.client.get(self.url)
+        post = response.data['posts'][0]
+        self.assertEqual(tuple(post), projections.LIST_FIELDS)
+        self.assertEqual(post['category_slug'], 'anxiety')
+        self.assertEqual(post['reply_count'], 1)
+        self.assertLess(len(post['excerpt']), len('Body ' * 50))
+    
+    def test_fields_select_the_output(self):
+        response = self.client.get(self.url, {'fields': 'title, like_count'})
+        self.assertEqual([tuple(post) for post in response.data['posts']], [('title', 'like_count')] * 3)
+        
+        response = self.client.get(self.url, {'fields': 'title,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Unknown fields: password')
+    
+    def test_compact_moves_categories_aside(self):
+        response = self.client.get(self.url, {'fields': 'full', 'compact': '1'})
+        post = response.data['posts'][0]
+        self.assertNotIn('content', post)
+        self.assertEqual(post['category'], 'anxiety')
+        self.assertEqual(response.data['categories']['anxiety']['post_count'], 3)
+        
+        self.assertNotIn('categories', self.client.get(self.url, {'fields': 'full'}).data)
+    
+    def test_fast_renderer_matches_json_renderer(self):
+        if renderers.orjson is None:
+            self.skipTest('orjson is not installed')
+        data = {'title': 'Line\u2028break', 'count': 3, 'tags': ['sleep'], 'none': None}
+        
+        rendered = renderers.FastJSONRenderer().render(data)
+        self.assertIn(b'\\u2028', rendered)
+        self.assertEqual(json.loads(rendered), json.loads(JSONRenderer().render(data)))
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class ArchiveTests(TestCase):
+    """
+    archive_posts moves cold threads into ArchivedPost; locked ones stay
+    readable through the post detail endpoint
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        long_ago = datetime.now(dt_timezone.utc) - timedelta(days=365)
+        
+        cls.locked = cls.create_post('Locked', is_locked=True)
+        PostReply.objects.create(post=cls.locked, author=cls.author, content='Kept')
+        PostReply.objects.create(post=cls.locked, author=cls.author, content='Removed', is_active=False)
+        cls.inactive = cls.create_post('Inactive', is_active=False)
+        cls.recent_locked = cls.create_post('Recently locked', is_locked=True)
+        cls.active = cls.create_post('Active')
+        ForumPost.objects.filter(pk__in=[cls.locked.pk, cls.inactive.pk]).update(
+            updated_at=long_ago, last_activity=long_ago
+        )
+    
+    @classmethod
+    def create_post(cls, title, **fields):
+        post = ForumPost.objects.create(
+            title=title, content='...', author=cls.author, category=cls.category, tags=['sleep'], **fields
+        )
+        post.sync_tags()
+        return post
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(caching.flush_view_counts)
+    
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_posts', *args, stdout=out)
+        return out.getvalue()
+    
+    def test_dry_run_changes_nothing(self):
+        self.assertIn('2 posts would be archived', self.archive('--dry-run'))
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertEqual(ForumPost.objects.count(), 4)
+    
+    def test_cold_threads_leave_the_hot_tables(self):
+        self.assertIn('Archived 2 posts', self.archive('--compress'))
+        
+        self.assertEqual(
+            set(ArchivedPost.objects.values_list('post_id', 'reason', 'is_public', 'is_compressed')),
+            {(self.locked.post_id, 'locked', True, True), (self.inactive.post_id, 'inactive', False, True)}
+        )
+        self.assertEqual(set(ForumPost.objects.values_list('title', flat=True)), {'Recently locked', 'Active'})
+        self.assertFalse(PostReply.objects.filter(post_id=self.locked.pk).exists())
+        self.assertEqual(Tag.objects.get(name='sleep').post_count, 2)
+    
+    def test_archived_locked_thread_is_served(self):
+        self.client.get(reverse('forums:post_detail', args=[self.locked.post_id]))
+        self.archive()
+        
+        response = self.client.get(reverse('forums:post_detail', args=[self.locked.post_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['archived'])
+        self.assertEqual(response.data['post']['title'], 'Locked')
+        self.assertFalse(response.data['post']['liked_by_me'])
+        self.assertEqual([reply['content'] for reply in response.data['replies']], ['Kept'])
+        self.assertEqual(response.data['reply_count'], 1)
+    
+    def test_archived_inactive_thread_stays_hidden(self):
+        self.archive()
+        
+        response = self.client.get(reverse('forums:post_detail', args=[self.inactive.post_id]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(FORUM_TASKS_ASYNC=False)
+class ActivityTests(TestCase):
+    """
+    Activity totals follow posts, replies and likes; the user's own
+    posts and replies page with keyset cursors
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.other = AnonymousUser.objects.create_user(username='other')
+        cls.category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+        self.enterContext(mock.patch.object(related, 'add_post'))
+    
+    def create_posts(self, count, author=None, **fields):
+        return [
+            ForumPost.objects.create(
+                title=f'Post {i}', content='...', author=author or self.author, category=self.category, **fields
+            )
+            for i in range(count)
+        ]
+    
+    def walk(self, url_name, key, label, **params):
+        labels, cursor = [], None
+        while True:
+            response = self.client.get(reverse(url_name), {**params, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            labels.extend(item[label] for item in response.data[key])
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                return labels
+    
+    def test_stats_follow_posts_replies_and_likes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('forums:create_post'), {
+                'title': 'First post', 'content': 'Hello everyone', 'category_slug': 'anxiety'
+            }, format='json')
+            post_id = response.data['post']['post_id']
+            self.client.post(reverse('forums:reply_to_post', args=[post_id]), {'content': 'Hi'}, format='json')
+            
+            self.client.force_authenticate(self.other)
+            self.client.post(reverse('forums:like_post', args=[post_id]))
+        
+        self.client.force_authenticate(self.author)
+        response = self.client.get(reverse('forums:my_activity'))
+        self.assertEqual(
+            {field: response.data['stats'][field] for field in activity.STAT_FIELDS},
+            {'post_count': 1, 'reply_count': 1, 'likes_received': 1}
+        )
+        self.assertIsNotNone(response.data['stats']['last_active_at'])
+        
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(reverse('forums:my_activity')).status_code, 401)
+    
+    def test_my_posts_pages_through_ties(self):
+        posts = self.create_posts(5)
+        self.create_posts(1, author=self.other)
+        self.create_posts(1, is_active=False)
+        # Same timestamp everywhere: the pk breaks the tie
+        ForumPost.objects.update(created_at=datetime(2026, 1, 1, tzinfo=dt_timezone.utc))
+        
+        titles = self.walk('forums:my_posts', 'posts', 'title', page_size=2)
+        self.assertEqual(titles, [post.title for post in reversed(posts)])
+    
+    def test_my_replies_page_newest_first(self):
+        post = self.create_posts(1, author=self.other)[0]
+        replies = [PostReply.objects.create(post=post, author=self.author, content=f'Reply {i}') for i in range(3)]
+        PostReply.objects.create(post=post, author=self.other, content='Not mine')
+        
+        contents = self.walk('forums:my_replies', 'replies', 'content', page_size=2)
+        self.assertEqual(contents, [reply.content for reply in reversed(replies)])
+    
+    def test_cursors(self):
+        moment = datetime(2026, 1, 1, 12, 30, tzinfo=dt_timezone.utc)
+        cursor = pagination.encode_cursor(moment, 42)
+        self.assertEqual(pagination.decode_cursor(cursor), (moment, 42))
+        self.assertIsNone(pagination.decode_cursor('not a cursor'))
+        
+        response = self.client.get(reverse('forums:my_posts'), {'cursor': 'not a cursor'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid cursor')
+        
+        request = RequestFactory().get('/', {'page_size': 1000})
+        self.assertEqual(pagination.page_size_param(request), pagination.MAX_PAGE_SIZE)
+
+
+@override_settings(FORUM_TASKS_ASYNC=False)
+class ScreeningTests(TestCase):
+    """
+    The phrase matcher and how screening flags new content and answers
+    crisis language with resources
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        cls.post = ForumPost.objects.create(title='Thread', content='...', author=cls.author, category=cls.category)
+    
+    def setUp(self):
+        cache.clear()
+        screening.get_matcher.cache_clear()
+        self.addCleanup(screening.get_matcher.cache_clear)
+        self.enterContext(mock.patch.object(related, 'add_post'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+    
+    def create(self, title, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('forums:create_post'), {
+                'title': title, 'content': content, 'category_slug': 'anxiety'
+            }, format='json')
+    
+    def test_matcher_finds_overlapping_phrases(self):
+        matcher = PhraseMatcher({'he': 'a', 'she': 'a', 'his': 'b', 'hers': 'b', 'ushers': 'c'})
+        self.assertEqual(matcher.find('ushers'), {'c': ['ushers']})
+        self.assertEqual(matcher.find('she said hers, not his'), {'a': ['she'], 'b': ['hers', 'his']})
+        self.assertEqual(matcher.find('nothing here'), {})
+    
+    def test_matcher_respects_word_boundaries_and_case(self):
+        matcher = PhraseMatcher({'suicide': 'crisis', "can't go on": 'crisis', 'buy now': 'spam'})
+        self.assertEqual(matcher.find('Suicidemouse plays'), {})
+        self.assertEqual(matcher.find('I CAN’T   go on.'), {'crisis': ["can't go on"]})
+        self.assertEqual(matcher.find('(buy now!) suicide?'), {'crisis': ['suicide'], 'spam': ['buy now']})
+    
+    def test_crisis_post_is_flagged_and_answered_with_resources(self):
+        response = self.create('Tonight', 'I want to die and I feel suicidal')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['crisis_resources'], screening.DEFAULT_CRISIS_RESOURCES)
+        
+        flag = ModerationFlag.objects.get()
+        self.assertEqual((flag.category, flag.reply_id), ('crisis', None))
+        self.assertEqual(flag.matched_phrases, ['suicidal', 'want to die'])
+    
+    def test_spam_reply_is_flagged_without_resources(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('forums:reply_to_post', args=[self.post.post_id]), {'content': 'Click here for free money'}, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('crisis_resources', response.data)
+        
+        flag = ModerationFlag.objects.get()
+        self.assertEqual((flag.category, flag.post_id), ('spam', self.post.pk))
+        self.assertEqual(flag.matched_phrases, ['click here', 'free money'])
+    
+    def test_phrase_files_and_switch(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as phrase_file:
+            phrase_file.write('# local terms\nrelapse\n')
+        self.addCleanup(os.remove, phrase_file.name)
+        
+        with override_settings(FORUM_SCREENING_PHRASES={'relapse': phrase_file.name}):
+            screening.get_matcher.cache_clear()
+            self.assertEqual(screening.screen_text('Worried about a relapse'), {'relapse': ['relapse']})
+        
+        with override_settings(FORUM_SCREENING_ENABLED=False):
+            self.assertEqual(self.create('Tonight', 'I want to die').status_code, 201)
+        self.assertFalse(ModerationFlag.objects.exists())
+    
+    def test_rescan_flags_existing_content_once(self):
+        ForumPost.objects.create(title='Old', content='Online casino bonus', author=self.author, category=self.category)
+        PostReply.objects.create(post=self.post, author=self.author, content='I might hurt myself')
+        
+        out = StringIO()
+        call_command('rescan_content', '--workers', '1', stdout=out)
+        self.assertIn('1 posts and 1 replies flagged', out.getvalue())
+        self.assertEqual(
+            sorted(ModerationFlag.objects.values_list('category', 'matched_phrases')),
+            [('crisis', ['hurt myself']), ('spam', ['online casino'])]
+        )
+        
+        call_command('rescan_content', '--workers', '1', stdout=out)
+        self.assertEqual(ModerationFlag.objects.count(), 2)
+
+
+class SuggestTests(TestCase):
+    """
+    The in-memory typeahead index over titles, tags and categories
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.category = ForumCategory.objects.create(name='Sleep Problems', slug='sleep')
+        cls.night = ForumPost.objects.create(
+            title="Can't sleep at night", content='...', author=cls.author, category=cls.category, hot_score=1.0
+        )
+        cls.tips = ForumPost.objects.create(
+            title='Sleep hygiene tips', content='...', author=cls.author, category=cls.category, hot_score=5.0
+        )
+        cls.night.tags = ['sleepless']
+        cls.night.sync_tags()
+    
+    def setUp(self):
+        cache.clear()
+        self.enterContext(mock.patch.dict(suggest._state, posts=None, tags=None, categories=None, watermark=None))
+    
+    def titles(self, query, **params):
+        response = self.client.get(reverse('forums:suggest_search'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [post['title'] for post in response.data['posts']]
+    
+    def test_prefix_index(self):
+        index = suggest.PrefixIndex.build(
+            [(1, 'Panic attacks at work', 'a', 1), (2, 'Work stress', 'b', 2), (3, 'Homework', 'c', 3)],
+            suggest.title_keys
+        )
+        self.assertEqual(index.search('work', 5), ['b', 'a'])
+        self.assertEqual(index.search('work', 1), ['b'])
+        
+        index.add(1, 'Panic attacks', 'a', 1, suggest.title_keys)
+        index.remove(2)
+        self.assertEqual(index.search('work', 5), [])
+        self.assertEqual(index.search('attacks', 5), ['a'])
+        self.assertEqual(len(index), 2)
+    
+    def test_heaviest_matches_win_wherever_they_sort(self):
+        rows = [(i, f'Sleep log {i:04}', i, 1) for i in range(500)]
+        rows.append((500, 'Sleep well', 500, 9))
+        index = suggest.PrefixIndex.build(rows, suggest.title_keys)
+        self.assertEqual(index.search('sleep', 2), [500, 0])
+        
+        # Changes after the build outrank or hide base entries
+        index.add(499, 'Sleep log 0499', 499, 10, suggest.title_keys)
+        index.remove(500)
+        self.assertEqual(index.search('sleep', 2), [499, 0])
+        self.assertEqual(index.search('sleep w', 2), [])
+    
+    def test_piled_up_changes_trigger_a_rebuild(self):
+        self.titles('sleep')
+        self.assertFalse(suggest.needs_rebuild())
+        with mock.patch.object(suggest, 'COMPACT_THRESHOLD', 1):
+            for post in (self.night, self.tips):
+                suggest.index_post(post)
+            self.assertTrue(suggest.needs_rebuild())
+            suggest.ensure_fresh()
+            self.assertEqual(suggest._state['posts'].overlay_keys, [])
+    
+    def test_long_prefixes_are_checked_in_full(self):
+        title = 'Sleep ' + 'a' * suggest.KEY_LENGTH
+        index = suggest.PrefixIndex.build([(1, title, 'a', 1)], suggest.title_keys)
+        self.assertEqual(index.search(suggest.normalize(title), 5), ['a'])
+        self.assertEqual(index.search(suggest.normalize(title) + 'b', 5), [])
+    
+    def test_suggestions_rank_titles_tags_and_categories(self):
+        response = self.client.get(reverse('forums:suggest_search'), {'q': 'Sleep'})
+        self.assertEqual([post['title'] for post in response.data['posts']], ['Sleep hygiene tips', "Can't sleep at night"])
+        self.assertEqual(response.data['tags'], [{'name': 'sleepless', 'post_count': 1}])
+        self.assertEqual(response.data['categories'], [{'name': 'Sleep Problems', 'slug': 'sleep'}])
+        
+        self.assertEqual(self.titles('problems'), [])
+        self.assertEqual(self.titles('s'), [])
+        self.assertEqual(self.titles('sleep', limit=1), ['Sleep hygiene tips'])
+    
+    def test_sync_applies_changed_posts(self):
+        self.assertEqual(len(self.titles('sleep')), 2)
+        later = datetime.now(dt_timezone.utc) + timedelta(minutes=1)
+        ForumPost.objects.filter(pk=self.tips.pk).update(is_active=False, updated_at=later)
+        ForumPost.objects.filter(pk=self.night.pk).update(title='Awake at night', updated_at=later)
+        
+        suggest.sync()
+        cache.clear()
+        self.assertEqual(self.titles('sleep'), [])
+        self.assertEqual(self.titles('night'), ['Awake at night'])
+    
+    def test_sync_sees_moderated_posts(self):
+        self.assertEqual(len(self.titles('sleep')), 2)
+        moderation.set_posts_active(ForumPost.objects.filter(pk=self.tips.pk), False)
+        
+        suggest.sync()
+        cache.clear()
+        self.assertEqual(self.titles('sleep'), ["Can't sleep at night"])
+    
+    @override_settings(FORUM_TASKS_ASYNC=False)
+    def test_new_posts_are_indexed_right_away(self):
+        self.assertEqual(self.titles('insomnia'), [])
+        cache.clear()
+        
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with mock.patch.object(related, 'add_post'), self.captureOnCommitCallbacks(execute=True):
+            client.post(reverse('forums:create_post'), {
+                'title': 'Insomnia again', 'content': 'Up until four every night', 'category_slug': 'sleep'
+            }, format='json')
+        self.assertEqual(self.titles('insomnia'), ['Insomnia again'])
+
+
+@override_settings(FORUM_TASKS_ASYNC=False)
+class BatchTests(TestCase):
+    """
+    /api/v1/batch/ runs sub-requests in order as the batch's user,
+    reading concurrently between writes
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        cls.post = ForumPost.objects.create(title='Thread', content='...', author=cls.author, category=cls.category)
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(caching.flush_view_counts)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+    
+    def batch(self, *requests):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('batch'), {'requests': list(requests)}, format='json')
+    
+    def test_responses_follow_request_order(self):
+        detail = reverse('forums:post_detail', args=[self.post.post_id])
+        response = self.batch(
+            {'path': detail},
+            {'method': 'POST', 'path': reverse('forums:reply_to_post', args=[self.post.post_id]), 'body': {'content': 'Hi'}},
+            {'path': detail},
+            {'path': reverse('forums:my_activity')},
+            {'path': '/api/v1/forums/missing/'}
+        )
+        self.assertEqual(response.status_code, 200)
+        responses = response.data['responses']
+        self.assertEqual([item['status'] for item in responses], [200, 201, 200, 200, 404])
+        self.assertEqual(responses[0]['body']['reply_count'], 0)
+        self.assertEqual(responses[2]['body']['reply_count'], 1)
+        self.assertEqual(responses[3]['body']['stats']['reply_count'], 1)
+    
+    def test_sub_requests_keep_their_own_permissions(self):
+        self.client.force_authenticate(None)
+        response = self.batch({'path': reverse('forums:my_activity')}, {'path': reverse('forums:categories')})
+        self.assertEqual([item['status'] for item in response.data['responses']], [401, 200])
+    
+    def test_auth_lifecycle_views_are_excluded(self):
+        response = self.batch(
+            {'method': 'POST', 'path': reverse('authentication:login'), 'body': {}},
+            {'method': 'POST', 'path': reverse('authentication:logout')}
+        )
+        self.assertEqual(
+            response.data['responses'],
+            [{'status': 400, 'body': {'error': 'This endpoint cannot be batched'}}] * 2
+        )
+    
+    def test_invalid_batches_are_rejected(self):
+        for requests, error in (
+            ([], 'requests must be a non-empty list'),
+            ([{'path': '/api/v1/forums/'}] * (batch.MAX_REQUESTS + 1), f'At most {batch.MAX_REQUESTS} requests per batch'),
+            ([{'method': 'TRACE', 'path': '/api/v1/forums/'}], 'requests[0]: unsupported method TRACE'),
+            ([{'path': '/admin/'}], 'requests[0]: path must start with one of /api/v1/forums/, /api/v1/auth/'),
+        ):
+            with self.subTest(error=error):
+                response = self.batch(*requests)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['error'], error)
+    
+    def test_failing_sub_request_does_not_fail_the_batch(self):
+        with mock.patch('apps.forums.views.caching.get_thread', side_effect=RuntimeError), self.assertLogs(batch.logger, 'ERROR'):
+            response = self.batch(
+                {'path': reverse('forums:post_detail', args=[self.post.post_id])},
+                {'path': reverse('forums:categories')}
+            )
+        self.assertEqual([item['status'] for item in response.data['responses']], [500, 200])
+    
+    def test_reads_between_writes_run_concurrently(self):
+        calls = []
+        
+        def run_subrequest(request, method, path, body):
+            calls.append((method, path, threading.current_thread().name.startswith('api-batch')))
+            return {'status': 200, 'body': path}
+        
+        self.enterContext(mock.patch.object(batch, 'run_subrequest', side_effect=run_subrequest))
+        self.enterContext(mock.patch.object(batch, 'connection', SimpleNamespace(in_atomic_block=False)))
+        subrequests = [('GET', '/a', None), ('GET', '/b', None), ('POST', '/c', None), ('GET', '/d', None)]
+        
+        results = batch.run_batch(SimpleNamespace(), subrequests)
+        self.assertEqual([result['body'] for result in results], ['/a', '/b', '/c', '/d'])
+        self.assertEqual(
+            sorted(calls),
+            [('GET', '/a', True), ('GET', '/b', True), ('GET', '/d', False), ('POST', '/c', False)]
+        )
+        # The write waits for the reads before it
+        self.assertEqual(calls[2], ('POST', '/c', False))
+        
+        # Inside a transaction everything runs in order on this thread
+        calls.clear()
+        batch.connection.in_atomic_block = True
+        batch.run_batch(SimpleNamespace(), subrequests)
+        self.assertEqual(calls, [(method, path, False) for method, path, _ in subrequests])
+
+
+class BatchConcurrencyTests(TransactionTestCase):
+    """
+    Outside a transaction, batched reads run on the pool with their own
+    connections and still see committed data
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(caching.flush_view_counts)
+    
+    def test_pooled_reads(self):
+        author = AnonymousUser.objects.create_user(username='author')
+        category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        posts = [ForumPost.objects.create(title=f'Post {i}', content='...', author=author, category=category) for i in range(3)]
+        client = APIClient()
+        client.force_authenticate(author)
+        
+        with mock.patch.object(batch, 'run_subrequest_in_thread', wraps=batch.run_subrequest_in_thread) as pooled:
+            response = client.post(reverse('batch'), {'requests': [
+                {'path': reverse('forums:post_detail', args=[post.post_id])} for post in posts
+            ]}, format='json')
+        
+        self.assertEqual(pooled.call_count, 3)
+        self.assertEqual(
+            [(item['status'], item['body']['post']['title']) for item in response.data['responses']],
+            [(200, 'Post 0'), (200, 'Post 1'), (200, 'Post 2')]
+        )
+
+
+@override_settings(FORUM_TASKS_ASYNC=False)
+class RevisionTests(TestCase):
+    """
+    Edits name the version they are based on, and earlier versions are
+    rebuilt from reverse word deltas
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = AnonymousUser.objects.create_user(username='author')
+        cls.other = AnonymousUser.objects.create_user(username='other')
+        cls.moderator = AnonymousUser.objects.create_superuser(username='moderator', password='password123')
+        category = ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+        cls.post = ForumPost.objects.create(
+            title='Bad week', content='Work has been hard this week.', author=cls.author, category=category, tags=['work']
+        )
+        cls.reply = PostReply.objects.create(post=cls.post, author=cls.author, content='Thanks for reading')
+    
+    def setUp(self):
+        cache.clear()
+        self.enterContext(mock.patch.object(related, 'add_post'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+    
+    def edit(self, version, **values):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(
+                reverse('forums:edit_post', args=[self.post.post_id]), {'version': version, **values}, format='json'
+            )
+    
+    def test_deltas_round_trip(self):
+        for old, new in (
+            ('Work has been hard this week.', 'Work has been really hard this week!'),
+            ('one  two\nthree', 'one two three four'),
+            ('', 'Something new'),
+            ('Something old', ''),
+        ):
+            with self.subTest(old=old, new=new):
+                self.assertEqual(revisions.apply_delta(new, revisions.make_delta(new, old)), old)
+    
+    def test_stale_version_gets_a_conflict(self):
+        self.assertEqual(self.edit(1, title='Better week').status_code, 200)
+        
+        response = self.edit(1, title='Worse week')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['current_version'], 2)
+        self.assertEqual(ForumPost.objects.get(pk=self.post.pk).title, 'Better week')
+    
+    def test_concurrent_edit_of_a_loaded_post_conflicts(self):
+        stale = ForumPost.objects.get(pk=self.post.pk)
+        revisions.apply_edit(ForumPost.objects.get(pk=self.post.pk), 1, {'title': 'First'}, self.author)
+        
+        with self.assertRaises(revisions.EditConflict) as raised:
+            revisions.apply_edit(stale, 1, {'title': 'Second'}, self.author)
+        self.assertEqual(raised.exception.current_version, 2)
+        self.assertEqual(PostRevision.objects.count(), 1)
+    
+    def test_unchanged_edit_keeps_the_version(self):
+        response = self.edit(1, title='Bad week')
+        self.assertEqual(response.data['message'], 'No changes')
+        self.assertEqual(response.data['post']['version'], 1)
+        self.assertFalse(PostRevision.objects.exists())
+    
+    def test_post_history(self):
+        self.edit(1, content='Work has been really hard this week.')
+        self.edit(2, tags=['work', 'stress'])
+        self.client.force_authenticate(self.moderator)
+        self.edit(3, title='Hard week')
+        
+        response = self.client.get(reverse('forums:post_revisions', args=[self.post.post_id]))
+        self.assertEqual(
+            [(entry['version'], entry['editor'], entry['title'], entry['content'], entry['tags']) for entry in response.data['revisions']],
+            [
+                (4, 'moderator', 'Hard week', 'Work has been really hard this week.', ['work', 'stress']),
+                (3, 'author', 'Bad week', 'Work has been really hard this week.', ['work', 'stress']),
+                (2, 'author', 'Bad week', 'Work has been really hard this week.', ['work']),
+                (1, None, 'Bad week', 'Work has been hard this week.', ['work']),
+            ]
+        )
+        # Only the changed words are stored
+        revision = PostRevision.objects.get(version=1)
+        self.assertEqual(revision.changes, {'content': [[6, 8, '']]})
+        
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(reverse('forums:post_revisions', args=[self.post.post_id])).status_code, 403)
+    
+    def test_reply_edit_and_history(self):
+        url = reverse('forums:edit_reply', args=[self.reply.reply_id])
+        self.assertEqual(self.client.patch(url, {'version': 1, 'content': 'Thanks for listening'}, format='json').status_code, 200)
+        self.assertEqual(self.client.patch(url, {'version': 1, 'content': 'Thanks'}, format='json').status_code, 409)
+        
+        response = self.client.get(reverse('forums:reply_revisions', args=[self.reply.reply_id]))
+        self.assertEqual(
+            [(entry['version'], entry['content']) for entry in response.data['revisions']],
+            [(2, 'Thanks for listening'), (1, 'Thanks for reading')]
+        )
+        
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.patch(url, {'version': 2, 'content': 'Mine now'}, format='json').status_code, 403)
+    
+    def test_admin_edits_are_versioned(self):
+        request = RequestFactory().post('/')
+        request.user = self.moderator
+        post_admin = ForumPostAdmin(ForumPost, site)
+        post = ForumPost.objects.get(pk=self.post.pk)
+        post.title = 'Hard week'
+        post.is_pinned = True
+        post_admin.save_model(request, post, SimpleNamespace(changed_data=['title', 'is_pinned']), True)
+        reply = PostReply.objects.get(pk=self.reply.pk)
+        reply.content = 'Thanks for listening'
+        PostReplyAdmin(PostReply, site).save_model(request, reply, SimpleNamespace(changed_data=['content']), True)
+        
+        post = ForumPost.objects.get(pk=self.post.pk)
+        self.assertEqual((post.version, post.title, post.is_pinned), (2, 'Hard week', True))
+        self.assertEqual(
+            [(entry['version'], entry['editor'], entry['title']) for entry in revisions.get_history(post, ('title',))],
+            [(2, 'moderator', 'Hard week'), (1, None, 'Bad week')]
+        )
+        self.assertEqual(
+            [(entry['version'], entry['content']) for entry in revisions.get_history(reply, ('content',))],
+            [(2, 'Thanks for listening'), (1, 'Thanks for reading')]
+        )
+        
+        # An admin save of a post edited since it was loaded is refused
+        stale = ForumPost.objects.get(pk=self.post.pk)
+        self.edit(2, title='Better week')
+        stale.title = 'Worse week'
+        message_user = self.enterContext(mock.patch.object(post_admin, 'message_user'))
+        post_admin.save_model(request, stale, SimpleNamespace(changed_data=['title']), True)
+        message_user.assert_called_once()
+        self.assertEqual(ForumPost.objects.get(pk=self.post.pk).title, 'Better week')
+
+
+class ProfilingTests(TestCase):
+    """
+    ProfilingMiddleware stays out of the stack unless enabled, then
+    profiles staff requests that ask for it and serves the results
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = AnonymousUser.objects.create_superuser(username='moderator', password='password123')
+        cls.member = AnonymousUser.objects.create_user(username='member')
+        cls.admin_token = Token.objects.create(user=cls.admin)
+        cls.member_token = Token.objects.create(user=cls.member)
+        ForumCategory.objects.create(name='Anxiety', slug='anxiety')
+    
+    def setUp(self):
+        cache.clear()
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(PROFILING_ENABLED=True, PROFILING_DIR=directory, PROFILING_KEEP=2))
+        self.directory = Path(directory)
+    
+    def get(self, view_name, token, profile=True, params=None):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client.get(reverse(view_name), params or {}, **({'HTTP_X_PROFILE': '1'} if profile else {}))
+    
+    def test_disabled_middleware_removes_itself(self):
+        with override_settings(PROFILING_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                profiling.ProfilingMiddleware(lambda request: None)
+            response = self.get('forums:categories', self.admin_token)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(list(self.directory.iterdir()), [])
+    
+    def test_staff_requests_are_profiled_on_demand(self):
+        response = self.get('forums:categories', self.admin_token)
+        profile_id = response['X-Profile-Id']
+        
+        summary = json.loads((self.directory / f'{profile_id}.json').read_text())
+        self.assertEqual((summary['url_name'], summary['status']), ('forums:categories', 200))
+        self.assertGreater(summary['query_count'], 0)
+        self.assertEqual(summary['query_count'], len(summary['queries']))
+        self.assertTrue(any('apps/forums/views.py' in frame for query in summary['queries'] for frame in query['origin']))
+        speedscope = json.loads((self.directory / f'{profile_id}.speedscope.json').read_text())
+        self.assertEqual(speedscope['profiles'][0]['name'], 'GET /api/v1/forums/categories/')
+        
+        self.assertNotIn('X-Profile-Id', self.get('forums:categories', self.member_token))
+        self.assertNotIn('X-Profile-Id', self.get('forums:categories', self.admin_token, profile=False))
+    
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampling_profiles_any_request(self):
+        self.assertIn('X-Profile-Id', self.get('forums:categories', self.member_token, profile=False))
+    
+    def test_profiles_are_pruned_and_served_to_admins(self):
+        profile_ids = [self.get('forums:categories', self.admin_token)['X-Profile-Id'] for _ in range(3)]
+        self.get('forums:trending_posts', self.admin_token)
+        
+        response = self.get('profiles', self.admin_token, profile=False)
+        self.assertTrue(response.data['enabled'])
+        listed = response.data['profiles']['forums:categories']
+        self.assertEqual([entry['profile_id'] for entry in listed], profile_ids[:0:-1])
+        self.assertNotIn('queries', listed[0])
+        
+        response = self.get('profiles', self.admin_token, profile=False, params={'url_name': 'forums:trending_posts'})
+        self.assertEqual(list(response.data['profiles']), ['forums:trending_posts'])
+        
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.admin_token.key}')
+        url = reverse('profile', args=[profile_ids[-1]])
+        self.assertEqual(client.get(url).data['profile_id'], profile_ids[-1])
+        download = client.get(url, {'download': '1'})
+        self.assertIn('shared', json.loads(b''.join(download.streaming_content)))
+        self.assertEqual(client.get(reverse('profile', args=[profile_ids[0]])).status_code, 404)
+        self.assertEqual(client.get(reverse('profile', args=['settings'])).status_code, 404)
+        
+        self.assertEqual(self.get('profiles', self.member_token, profile=False).status_code, 403)
@@ -6,17 +6,45 @@ app_name = 'forums'
 urlpatterns = [
     # Forum categories
     path('categories/', views.get_forum_categories, name='categories'),
+    path('categories/summary/', views.get_category_summaries, name='category_summaries'),
     path('categories/<str:category_slug>/posts/', views.get_posts_by_category, name='category_posts'),
     
     # Forum posts
     path('posts/', views.create_forum_post, name='create_post'),
     path('posts/<uuid:post_id>/', views.get_post_detail, name='post_detail'),
+    path('posts/<uuid:post_id>/related/', views.get_related_posts, name='related_posts'),
     path('posts/<uuid:post_id>/replies/', views.reply_to_post, name='reply_to_post'),
     path('posts/<uuid:post_id>/like/', views.like_post, name='like_post'),
+    path('posts/<uuid:post_id>/edit/', views.edit_post, name='edit_post'),
+    path('posts/<uuid:post_id>/revisions/', views.get_post_revisions, name='post_revisions'),
+    
+    path('posts/trending/', views.get_trending_posts, name='trending_posts'),
     
     # Replies
     path('replies/<uuid:reply_id>/like/', views.like_reply, name='like_reply'),
+    path('replies/<uuid:reply_id>/edit/', views.edit_reply, name='edit_reply'),
+    path('replies/<uuid:reply_id>/revisions/', views.get_reply_revisions, name='reply_revisions'),
+    
+    # Tags
+    path('tags/autocomplete/', views.autocomplete_tags, name='autocomplete_tags'),
+    path('tags/<str:tag_name>/posts/', views.get_posts_by_tag, name='tag_posts'),
     
     # Search
     path('search/', views.search_posts, name='search_posts'),
+    path('search/suggest/', views.suggest_search, name='suggest_search'),
+    
+    # User activity
+    path('users/me/activity/', views.get_my_activity, name='my_activity'),
+    path('users/me/posts/', views.get_my_posts, name='my_posts'),
+    path('users/me/replies/', views.get_my_replies, name='my_replies'),
+    
+    # Notifications
+    path('notifications/', views.get_notifications, name='notifications'),
+    path('notifications/read/', views.mark_notifications_read, name='notifications_read'),
+    
+    # Moderation
+    path('moderation/bulk/', views.bulk_moderate, name='bulk_moderate'),
+    
+    # Analytics
+    path('analytics/engagement/', views.get_engagement, name='engagement'),
 ]
\ No newline at end of file
@@ -1,20 +1,86 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes, authentication_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.response import Response
+from django.core.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
-from .models import ForumCategory, ForumPost, PostReply, PostLike
+from django.db.models import F, Q
+from mental_health_platform.throttling import (
+    ForumPostThrottle,
+    ForumPostIPThrottle,
+    ForumReplyThrottle,
+    ForumReplyIPThrottle,
+    ForumLikeThrottle,
+    ForumLikeIPThrottle
+)
+from .models import (
+    ForumCategory, ForumPost, PostReply, PostLike, PostTag, Tag, ArchivedPost,
+    Notification, NotificationCounter, EngagementEvent
+)
 from .serializers import (
     ForumCategorySerializer,
     ForumPostSerializer,
     ForumPostCreateSerializer,
+    ForumPostUpdateSerializer,
     PostReplySerializer,
-    PostReplyCreateSerializer
+    PostReplyCreateSerializer,
+    PostReplyUpdateSerializer,
+    TagSerializer,
+    NotificationSerializer,
+    UserReplySerializer
+)
+from .caching import get_popular_tags, get_tag_suggestions
+from . import caching
+from .projections import format_datetime, format_uuid, post_list_options, post_list_payload
+from .idempotency import idempotent
+from .tasks import run_after_commit
+from . import (
+    activity, analytics, duplicates, moderation, notifications, ranking, related, revisions, screening, sharding, suggest
 )
 
 
+# Orderings accepted by the `sort` query parameter on post lists
+POST_SORT_ORDERINGS = {
+    'active': ('-is_pinned', '-last_activity'),
+    'new': ('-created_at',),
+    'hot': ('-hot_score',),
+}
+
+
+def query_limit(request, default, maximum):
+    """
+    The `limit` query parameter clamped to 1..maximum, or default when
+    it isn't a number
+    """
+    try:
+        return max(1, min(int(request.GET.get('limit', default)), maximum))
+    except ValueError:
+        return default
+
+
+def post_page(posts, start, end, request, fields, compact, count=True):
+    """
+    Rows start:end of a post queryset and its total row count (None
+    without count), from every shard when forum sharding is on.
+    Returns (total, response keys for the page).
+    """
+    if not sharding.is_enabled():
+        total = posts.count() if count else None
+        return total, post_list_payload(posts[start:end], request, fields, compact)
+    
+    total, data, categories = sharding.gather_post_page(posts, start, end, request.user, fields, compact, count)
+    return total, {'posts': data} if categories is None else {'posts': data, 'categories': categories}
+
+
+def tag_match(query):
+    """
+    Match posts carrying exactly this tag through the normalized tag index
+    (a subquery, so posts with several tags are not duplicated)
+    """
+    return Q(pk__in=PostTag.objects.filter(tag__name=Tag.normalize(query)).values('post_id'))
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_forum_categories(request):
@@ -31,6 +97,19 @@ def get_forum_categories(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+def get_category_summaries(request):
+    """
+    Active categories with their post and reply counts, latest post and
+    number of recently active users, for the forums landing page
+    """
+    return Response({
+        'categories': caching.get_category_summaries()
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@sharding.routed
 def get_posts_by_category(request, category_slug):
     """
     Get all posts in a specific category
@@ -39,17 +118,29 @@ def get_posts_by_category(request, category_slug):
     
     # Get query parameters
     search = request.GET.get('search', '')
+    sort = request.GET.get('sort', 'active')
     page = int(request.GET.get('page', 1))
     page_size = int(request.GET.get('page_size', 20))
     
+    fields, compact, error = post_list_options(request)
+    
+    if sort not in POST_SORT_ORDERINGS:
+        error = f"Invalid sort, expected one of: {', '.join(POST_SORT_ORDERINGS)}"
+    
+    if error:
+        return Response({
+            'error': error
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
     # Filter posts
     posts = ForumPost.objects.filter(category=category, is_active=True)
+    posts = posts.order_by(*POST_SORT_ORDERINGS[sort])
     
     if search:
         posts = posts.filter(
             Q(title__icontains=search) | 
             Q(content__icontains=search) |
-            Q(tags__icontains=search)
+            tag_match(search)
         )
     
     # Pagination
@@ -58,11 +149,9 @@ def get_posts_by_category(request, category_slug):
     total_posts = posts.count()
     posts = posts[start:end]
     
-    serializer = ForumPostSerializer(posts, many=True)
-    
     return Response({
         'category': ForumCategorySerializer(category).data,
-        'posts': serializer.data,
+        **post_list_payload(posts, request, fields, compact),
         'pagination': {
             'page': page,
             'page_size': page_size,
@@ -73,9 +162,38 @@ def get_posts_by_category(request, category_slug):
     }, status=status.HTTP_200_OK)
 
 
+def is_blocked_duplicate(originals, user):
+    """
+    Near-duplicates are rejected in 'block' mode, and re-posts of the
+    user's own posts always
+    """
+    return bool(originals) and (
+        duplicates.get_action() == 'block' or
+        any(author_id == user.pk for _, author_id in originals)
+    )
+
+
+def duplicate_response(originals):
+    return Response({
+        'error': 'This post is a near-duplicate of an existing post',
+        'duplicate_of': originals[0][0]
+    }, status=status.HTTP_409_CONFLICT)
+
+
+def duplicate_check_busy_response():
+    response = Response({
+        'error': 'A similar post is being saved, please try again'
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = '1'
+    return response
+
+
 @api_view(['POST'])
 @authentication_classes([TokenAuthentication])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ForumPostThrottle, ForumPostIPThrottle])
+@idempotent
+@sharding.routed
 def create_forum_post(request):
     """
     Create a new forum post
@@ -83,14 +201,39 @@ def create_forum_post(request):
     serializer = ForumPostCreateSerializer(data=request.data)
     
     if serializer.is_valid():
-        post = serializer.save(author=request.user)
+        signature = duplicates.compute_signature(duplicates.post_text(
+            serializer.validated_data['title'], serializer.validated_data['content']
+        ))
+        # Check and insert as one step, so a similar post saved at the
+        # same time sees this one
+        try:
+            with duplicates.bucket_locks(signature), sharding.atomic():
+                originals = duplicates.find_originals(signature)
+                if is_blocked_duplicate(originals, request.user):
+                    return duplicate_response(originals)
+                
+                post = serializer.save(author=request.user)
+                duplicates.index_posts({post.pk: signature})
+                if originals:
+                    screening.flag_content(post.pk, None, {'duplicate': [str(post_id) for post_id, _ in originals]})
+        except duplicates.DuplicateCheckBusy:
+            return duplicate_check_busy_response()
+        
+        activity.record(request.user.pk, post_count=1)
+        analytics.record(EngagementEvent.POST, post.category_id)
+        activity.touch_category(request.user.pk, post.category_id)
+        caching.invalidate_category_summaries()
+        run_after_commit(related.add_post, post.pk)
+        suggest.index_post(post)
+        matches = screening.screen_post(post)
         
         # Return created post
         post_serializer = ForumPostSerializer(post)
         
         return Response({
             'message': 'Post created successfully',
-            'post': post_serializer.data
+            'post': post_serializer.data,
+            **screening.screening_payload(matches)
         }, status=status.HTTP_201_CREATED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -98,32 +241,68 @@ def create_forum_post(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@sharding.routed
 def get_post_detail(request, post_id):
     """
     Get detailed view of a specific post with replies
     """
-    post = get_object_or_404(ForumPost, post_id=post_id, is_active=True)
+    thread = caching.get_thread(post_id)
+    
+    # Fall back to the archive for threads moved out of the hot tables
+    if thread is None:
+        return get_archived_post_detail(post_id)
     
     # Increment view count
-    post.increment_view_count()
+    views = caching.record_view(thread)
     
-    # Get replies
-    replies = PostReply.objects.filter(post=post, is_active=True).order_by('created_at')
+    return Response(caching.render_thread(thread, request.user, views), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@sharding.routed
+def get_related_posts(request, post_id):
+    """
+    Get posts similar to a post, from the precomputed neighbour lists
+    """
+    posts = related.get_related(post_id, query_limit(request, related.RELATED_LIMIT, related.RELATED_LIMIT))
+    for post in posts:
+        post['post_id'] = format_uuid(post['post_id'])
+        post['created_at'] = format_datetime(post['created_at'])
+        post['score'] = round(post['score'], 4)
+    
+    return Response({
+        'related_posts': posts
+    }, status=status.HTTP_200_OK)
+
+
+def get_archived_post_detail(post_id):
+    """
+    Serve an archived thread in the same shape as get_post_detail
+    """
+    archived = get_object_or_404(ArchivedPost, post_id=post_id, is_public=True)
+    thread = archived.thread
     
-    # Serialize data
-    post_serializer = ForumPostSerializer(post)
-    replies_serializer = PostReplySerializer(replies, many=True)
+    post = dict(thread['post'], liked_by_me=False)
+    replies = [
+        dict(reply, liked_by_me=False)
+        for reply in thread['replies'] if reply.pop('is_active')
+    ]
     
     return Response({
-        'post': post_serializer.data,
-        'replies': replies_serializer.data,
-        'reply_count': replies.count()
+        'post': post,
+        'replies': replies,
+        'reply_count': len(replies),
+        'archived': True
     }, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
 @authentication_classes([TokenAuthentication])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ForumReplyThrottle, ForumReplyIPThrottle])
+@idempotent
+@sharding.routed
 def reply_to_post(request, post_id):
     """
     Reply to a forum post
@@ -143,88 +322,317 @@ def reply_to_post(request, post_id):
         
         # Update post's last activity
         post.last_activity = reply.created_at
-        post.save(update_fields=['last_activity'])
+        post.add_hot_score(ranking.REPLY_WEIGHT, now=reply.created_at)
+        post.reply_total = F('reply_total') + 1
+        post.save(update_fields=['last_activity', 'hot_score', 'hot_score_at', 'reply_total'])
+        caching.add_reply(post, reply)
+        activity.record(request.user.pk, reply_count=1)
+        analytics.record(EngagementEvent.REPLY, post.category_id)
+        activity.touch_category(request.user.pk, post.category_id)
+        caching.invalidate_category_summaries()
+        run_after_commit(notifications.notify_reply, reply.pk)
+        matches = screening.screen_reply(reply)
         
         # Return created reply
         reply_serializer = PostReplySerializer(reply)
         
         return Response({
             'message': 'Reply posted successfully',
-            'reply': reply_serializer.data
+            'reply': reply_serializer.data,
+            **screening.screening_payload(matches)
         }, status=status.HTTP_201_CREATED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['POST'])
+def can_edit(user, content):
+    """
+    Authors edit their own content; staff can edit anything
+    """
+    return user.is_staff or content.author_id == user.pk
+
+
+def edit_conflict_response(error):
+    return Response({
+        'error': 'This content was edited by someone else, reload it and try again',
+        'current_version': error.current_version
+    }, status=status.HTTP_409_CONFLICT)
+
+
+@api_view(['PUT', 'PATCH'])
 @authentication_classes([TokenAuthentication])
 @permission_classes([IsAuthenticated])
-def like_post(request, post_id):
+@sharding.routed
+def edit_post(request, post_id):
     """
-    Like or unlike a forum post
+    Edit a post's title, content or tags. The request names the version
+    it was based on and gets a 409 if the post has changed since.
     """
-    post = get_object_or_404(ForumPost, post_id=post_id, is_active=True)
+    post = get_object_or_404(
+        ForumPost.objects.select_related('author', 'category'), post_id=post_id, is_active=True
+    )
+    
+    if not can_edit(request.user, post):
+        return Response({
+            'error': 'You can only edit your own posts'
+        }, status=status.HTTP_403_FORBIDDEN)
+    if post.is_locked and not request.user.is_staff:
+        return Response({
+            'error': 'This post is locked and cannot be edited'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    serializer = ForumPostUpdateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    values = dict(serializer.validated_data)
+    version = values.pop('version')
+    signature = None
+    if 'title' in values or 'content' in values:
+        signature = duplicates.compute_signature(duplicates.post_text(
+            values.get('title', post.title), values.get('content', post.content)
+        ))
     
-    # Check if user already liked this post
-    like, created = PostLike.objects.get_or_create(
-        user=request.user,
-        post=post,
-        defaults={}
+    # The edit, its duplicate check and the new signature commit together
+    try:
+        with duplicates.bucket_locks(signature), sharding.atomic():
+            originals = duplicates.find_originals(signature, exclude=post.pk)
+            if is_blocked_duplicate(originals, post.author):
+                return duplicate_response(originals)
+            
+            changed = revisions.apply_edit(post, version, values, request.user)
+            if 'title' in changed or 'content' in changed:
+                duplicates.index_posts({post.pk: signature})
+                if originals:
+                    screening.flag_content(post.pk, None, {'duplicate': [str(post_id) for post_id, _ in originals]})
+    except revisions.EditConflict as error:
+        return edit_conflict_response(error)
+    except duplicates.DuplicateCheckBusy:
+        return duplicate_check_busy_response()
+    
+    matches = {}
+    if changed:
+        if 'tags' in changed:
+            post.sync_tags()
+        if 'title' in changed or 'content' in changed:
+            matches = screening.screen_post(post)
+        # The old vector and neighbour lists no longer describe the post
+        run_after_commit(related.add_post, post.pk)
+        suggest.index_post(post)
+        caching.update_post(post, changed)
+        activity.record(request.user.pk)
+    
+    return Response({
+        'message': 'Post updated successfully' if changed else 'No changes',
+        'post': ForumPostSerializer(post, context={
+            'liked_post_ids': PostLike.liked_ids(request.user, post_ids=[post.pk])[0]
+        }).data,
+        **screening.screening_payload(matches)
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['PUT', 'PATCH'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+@sharding.routed
+def edit_reply(request, reply_id):
+    """
+    Edit a reply's content, based on the version named in the request
+    """
+    reply = get_object_or_404(
+        PostReply.objects.select_related('author', 'post'), reply_id=reply_id, is_active=True
     )
     
-    if created:
-        # User liked the post
+    if not can_edit(request.user, reply):
+        return Response({
+            'error': 'You can only edit your own replies'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    serializer = PostReplyUpdateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    values = dict(serializer.validated_data)
+    version = values.pop('version')
+    try:
+        changed = revisions.apply_edit(reply, version, values, request.user)
+    except revisions.EditConflict as error:
+        return edit_conflict_response(error)
+    
+    matches = {}
+    if changed:
+        matches = screening.screen_reply(reply)
+        caching.update_reply(reply, changed)
+        activity.record(request.user.pk)
+    
+    return Response({
+        'message': 'Reply updated successfully' if changed else 'No changes',
+        'reply': PostReplySerializer(reply, context={
+            'liked_reply_ids': PostLike.liked_ids(request.user, reply_ids=[reply.pk])[1]
+        }).data,
+        **screening.screening_payload(matches)
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+@sharding.routed
+def get_post_revisions(request, post_id):
+    """
+    Edit history of a post, newest version first. Only the author and
+    staff can see earlier versions.
+    """
+    post = get_object_or_404(ForumPost, post_id=post_id, is_active=True)
+    if not can_edit(request.user, post):
+        return Response({
+            'error': 'You can only view the history of your own posts'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    history = revisions.get_history(post, revisions.POST_EDIT_FIELDS)
+    for entry in history:
+        entry['edited_at'] = format_datetime(entry['edited_at'])
+    
+    return Response({
+        'post_id': format_uuid(post.post_id),
+        'revisions': history
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+@sharding.routed
+def get_reply_revisions(request, reply_id):
+    """
+    Edit history of a reply, newest version first
+    """
+    reply = get_object_or_404(PostReply, reply_id=reply_id, is_active=True)
+    if not can_edit(request.user, reply):
+        return Response({
+            'error': 'You can only view the history of your own replies'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    history = revisions.get_history(reply, revisions.REPLY_EDIT_FIELDS)
+    for entry in history:
+        entry['edited_at'] = format_datetime(entry['edited_at'])
+    
+    return Response({
+        'reply_id': format_uuid(reply.reply_id),
+        'revisions': history
+    }, status=status.HTTP_200_OK)
+
+
+def set_post_like(post, user, liked):
+    """
+    Like or unlike a post for a user, updating counters. Returns False
+    when the like was already in that state.
+    """
+    if liked:
+        like, created = PostLike.objects.get_or_create(user=user, post=post)
+        if not created:
+            return False
         post.like_count += 1
-        post.save(update_fields=['like_count'])
-        message = 'Post liked successfully'
-        liked = True
+        post.add_hot_score(ranking.LIKE_WEIGHT)
+        activity.record(post.author_id, touch=False, likes_received=1)
+        analytics.record(EngagementEvent.LIKE, post.category_id)
+        run_after_commit(notifications.notify_like, like.pk)
     else:
-        # User unliked the post
-        like.delete()
+        deleted, _ = PostLike.objects.filter(user=user, post=post).delete()
+        if not deleted:
+            return False
         post.like_count = max(0, post.like_count - 1)
-        post.save(update_fields=['like_count'])
-        message = 'Post unliked successfully'
+        post.add_hot_score(-ranking.LIKE_WEIGHT)
+        activity.record(post.author_id, touch=False, likes_received=-1)
+        run_after_commit(notifications.notify_unlike, user.pk, post.pk)
+    
+    post.save(update_fields=['like_count', 'hot_score', 'hot_score_at'])
+    return True
+
+
+def set_reply_like(reply, user, liked):
+    """
+    Like or unlike a reply for a user, updating counters. Returns False
+    when the like was already in that state.
+    """
+    if liked:
+        like, created = PostLike.objects.get_or_create(user=user, reply=reply)
+        if not created:
+            return False
+        reply.like_count += 1
+        activity.record(reply.author_id, touch=False, likes_received=1)
+        analytics.record(EngagementEvent.LIKE, reply.post.category_id)
+        run_after_commit(notifications.notify_like, like.pk)
+    else:
+        deleted, _ = PostLike.objects.filter(user=user, reply=reply).delete()
+        if not deleted:
+            return False
+        reply.like_count = max(0, reply.like_count - 1)
+        activity.record(reply.author_id, touch=False, likes_received=-1)
+        run_after_commit(notifications.notify_unlike, user.pk, None, reply.pk)
+    
+    reply.save(update_fields=['like_count'])
+    return True
+
+
+def apply_like(request, target, set_like):
+    """
+    POST toggles the like; PUT likes and DELETE unlikes, so retrying
+    them is harmless. Returns the resulting state.
+    """
+    liked = request.method != 'DELETE'
+    changed = set_like(target, request.user, liked)
+    if request.method == 'POST' and not changed:
+        # Toggle of an existing like
         liked = False
+        changed = set_like(target, request.user, liked)
+    
+    if changed:
+        activity.record(request.user.pk)
+    return liked, changed
+
+
+@api_view(['POST', 'PUT', 'DELETE'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+@throttle_classes([ForumLikeThrottle, ForumLikeIPThrottle])
+@idempotent
+@sharding.routed
+def like_post(request, post_id):
+    """
+    Like or unlike a forum post: POST toggles, PUT likes, DELETE unlikes
+    """
+    post = get_object_or_404(ForumPost, post_id=post_id, is_active=True)
+    
+    liked, changed = apply_like(request, post, set_post_like)
+    if changed:
+        caching.set_post_like_count(post)
     
     return Response({
-        'message': message,
+        'message': 'Post liked successfully' if liked else 'Post unliked successfully',
         'liked': liked,
         'like_count': post.like_count
     }, status=status.HTTP_200_OK)
 
 
-@api_view(['POST'])
+@api_view(['POST', 'PUT', 'DELETE'])
 @authentication_classes([TokenAuthentication])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ForumLikeThrottle, ForumLikeIPThrottle])
+@idempotent
+@sharding.routed
 def like_reply(request, reply_id):
     """
-    Like or unlike a forum reply
+    Like or unlike a forum reply: POST toggles, PUT likes, DELETE unlikes
     """
-    reply = get_object_or_404(PostReply, reply_id=reply_id, is_active=True)
+    reply = get_object_or_404(PostReply.objects.select_related('post'), reply_id=reply_id, is_active=True)
     
-    # Check if user already liked this reply
-    like, created = PostLike.objects.get_or_create(
-        user=request.user,
-        reply=reply,
-        defaults={}
-    )
-    
-    if created:
-        # User liked the reply
-        reply.like_count += 1
-        reply.save(update_fields=['like_count'])
-        message = 'Reply liked successfully'
-        liked = True
-    else:
-        # User unliked the reply
-        like.delete()
-        reply.like_count = max(0, reply.like_count - 1)
-        reply.save(update_fields=['like_count'])
-        message = 'Reply unliked successfully'
-        liked = False
+    liked, changed = apply_like(request, reply, set_reply_like)
+    if changed:
+        caching.set_reply_like_count(reply)
     
     return Response({
-        'message': message,
+        'message': 'Reply liked successfully' if liked else 'Reply unliked successfully',
         'liked': liked,
         'like_count': reply.like_count
     }, status=status.HTTP_200_OK)
@@ -241,9 +649,14 @@ def search_posts(request):
     page = int(request.GET.get('page', 1))
     page_size = int(request.GET.get('page_size', 20))
     
+    fields, compact, error = post_list_options(request)
+    
     if not query:
+        error = 'Search query is required'
+    
+    if error:
         return Response({
-            'error': 'Search query is required'
+            'error': error
         }, status=status.HTTP_400_BAD_REQUEST)
     
     # Filter posts
@@ -255,20 +668,17 @@ def search_posts(request):
     posts = posts.filter(
         Q(title__icontains=query) | 
         Q(content__icontains=query) |
-        Q(tags__icontains=query)
+        tag_match(query)
     )
     
     # Pagination
     start = (page - 1) * page_size
     end = start + page_size
-    total_posts = posts.count()
-    posts = posts[start:end]
-    
-    serializer = ForumPostSerializer(posts, many=True)
+    total_posts, payload = post_page(posts, start, end, request, fields, compact)
     
     return Response({
         'query': query,
-        'posts': serializer.data,
+        **payload,
         'pagination': {
             'page': page,
             'page_size': page_size,
@@ -276,4 +686,368 @@ def search_posts(request):
             'has_next': end < total_posts,
             'has_previous': page > 1
         }
-    }, status=status.HTTP_200_OK)
\ No newline at end of file
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_trending_posts(request):
+    """
+    Get the hottest posts across all categories (or one category)
+    """
+    category_slug = request.GET.get('category', '')
+    limit = query_limit(request, 10, 50)
+    
+    fields, compact, error = post_list_options(request)
+    if error:
+        return Response({
+            'error': error
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    posts = ForumPost.objects.filter(is_active=True)
+    
+    if category_slug:
+        posts = posts.filter(category__slug=category_slug)
+    
+    posts = posts.order_by(*POST_SORT_ORDERINGS['hot'])
+    _, payload = post_page(posts, 0, limit, request, fields, compact, count=False)
+    
+    return Response(payload, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_posts_by_tag(request, tag_name):
+    """
+    Get all posts carrying a specific tag
+    """
+    tag = get_object_or_404(Tag, name=Tag.normalize(tag_name))
+    
+    page = int(request.GET.get('page', 1))
+    page_size = int(request.GET.get('page_size', 20))
+    
+    fields, compact, error = post_list_options(request)
+    if error:
+        return Response({
+            'error': error
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Filter posts through the tag index
+    posts = ForumPost.objects.filter(tag_links__tag=tag, is_active=True)
+    
+    category_slug = request.GET.get('category', '')
+    if category_slug:
+        posts = posts.filter(category__slug=category_slug)
+    
+    # Pagination
+    start = (page - 1) * page_size
+    end = start + page_size
+    total_posts, payload = post_page(posts, start, end, request, fields, compact)
+    
+    return Response({
+        'tag': TagSerializer(tag).data,
+        **payload,
+        'pagination': {
+            'page': page,
+            'page_size': page_size,
+            'total': total_posts,
+            'has_next': end < total_posts,
+            'has_previous': page > 1
+        }
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def autocomplete_tags(request):
+    """
+    Suggest tags starting with the given prefix, most popular first
+    """
+    prefix = request.GET.get('q', '')
+    limit = query_limit(request, 10, 50)
+    
+    if not Tag.normalize(prefix):
+        return Response({
+            'tags': get_popular_tags(limit)
+        }, status=status.HTTP_200_OK)
+    
+    return Response({
+        'tags': get_tag_suggestions(prefix, limit)
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def suggest_search(request):
+    """
+    Typeahead suggestions (post titles, tags, categories) for the
+    search box, served from an in-memory prefix index
+    """
+    query = request.GET.get('q', '')
+    limit = query_limit(request, 5, 20)
+    
+    return Response({
+        'query': query,
+        **suggest.suggest(query, limit)
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAdminUser])
+def bulk_moderate(request):
+    """
+    Apply a moderation action to many posts or replies at once
+    """
+    from .staff_serializers import BulkModerationSerializer
+    
+    serializer = BulkModerationSerializer(data=request.data)
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    action = data['action']
+    
+    if action == 'remove_user_content':
+        updated = moderation.remove_user_content(data['author'])
+        return Response({
+            'message': 'User content removed successfully',
+            'action': action,
+            'updated': updated
+        }, status=status.HTTP_200_OK)
+    
+    # Select targets
+    if data['target'] == 'replies':
+        targets = PostReply.objects.all()
+        id_field = 'reply_id'
+    else:
+        targets = ForumPost.objects.all()
+        id_field = 'post_id'
+    
+    if 'ids' in data:
+        targets = targets.filter(**{f'{id_field}__in': data['ids']})
+    if 'author' in data:
+        targets = targets.filter(author=data['author'])
+    if 'pattern' in data:
+        pattern = Q(content__icontains=data['pattern'])
+        if data['target'] == 'posts':
+            pattern |= Q(title__icontains=data['pattern'])
+        targets = targets.filter(pattern)
+    
+    if action == 'move':
+        # Posts can only change category within their shard
+        target_shard = sharding.db_for_category(data['category_slug'].pk)
+        if any(targets.using(alias).exists() for alias in sharding.shard_aliases() if alias != target_shard):
+            return Response({
+                'error': 'Some posts are on another forum shard: move the whole category with move_category'
+            }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Apply action on each shard's targets
+    def moderate(alias):
+        shard_targets = targets.using(alias)
+        if data['target'] == 'replies':
+            return moderation.set_replies_active(shard_targets, action == 'restore')
+        if action in ('deactivate', 'restore'):
+            return moderation.set_posts_active(shard_targets, action == 'restore')
+        if action == 'move':
+            return moderation.update_posts(shard_targets, category=data['category_slug'])
+        return moderation.update_posts(shard_targets, **moderation.POST_ACTIONS[action])
+    
+    updated = sum(sharding.scatter(moderate))
+    
+    return Response({
+        'message': 'Moderation applied successfully',
+        'action': action,
+        'updated': {data['target']: updated}
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def get_notifications(request):
+    """
+    Get the current user's notifications, newest first, with cursor
+    pagination
+    """
+    inbox = Notification.objects.filter(recipient=request.user)
+    
+    if request.GET.get('unread') in ('1', 'true'):
+        inbox = inbox.filter(is_read=False)
+    
+    inbox, next_cursor, error = sharding.gather_keyset_page(
+        inbox.select_related('post', 'reply', 'last_actor'), request, 'updated_at'
+    )
+    if error:
+        return Response({
+            'error': error
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = NotificationSerializer(inbox, many=True)
+    
+    return Response({
+        'notifications': serializer.data,
+        'unread_count': NotificationCounter.get_unread_count(request.user),
+        'next_cursor': next_cursor
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def mark_notifications_read(request):
+    """
+    Mark the given notifications (or all of them) as read
+    """
+    notification_ids = request.data.get('notification_ids')
+    
+    if notification_ids is not None and not isinstance(notification_ids, list):
+        return Response({
+            'error': 'notification_ids must be a list'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        marked = notifications.mark_read(request.user, notification_ids)
+    except ValidationError:
+        return Response({
+            'error': 'Invalid notification id'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'message': 'Notifications marked as read',
+        'marked': marked,
+        'unread_count': NotificationCounter.get_unread_count(request.user)
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def get_my_activity(request):
+    """
+    Get the current user's forum activity totals
+    """
+    stats = activity.get_stats(request.user)
+    stats['last_active_at'] = format_datetime(stats['last_active_at'])
+    
+    return Response({
+        'user_id': request.user.user_id,
+        'display_name': request.user.display_name,
+        'stats': stats
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def get_my_posts(request):
+    """
+    Get the current user's active posts, newest first, with cursor
+    pagination
+    """
+    fields, compact, error = post_list_options(request)
+    if error:
+        return Response({
+            'error': error
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Page over the (author, created_at) index, then load just that page
+    page, next_cursor, error = sharding.gather_keyset_page(
+        ForumPost.objects.filter(author=request.user, is_active=True).only('id', 'created_at'),
+        request,
+        'created_at'
+    )
+    if error:
+        return Response({
+            'error': error
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    data, categories = sharding.serialize_page(
+        ForumPost.objects.order_by('-created_at', '-pk'),
+        [(post.pk, post._state.db) for post in page],
+        request.user, fields, compact
+    )
+    payload = {'posts': data} if categories is None else {'posts': data, 'categories': categories}
+    
+    return Response({
+        **payload,
+        'next_cursor': next_cursor
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def get_my_replies(request):
+    """
+    Get the current user's active replies, newest first, with cursor
+    pagination
+    """
+    replies, next_cursor, error = sharding.gather_keyset_page(
+        PostReply.objects.filter(author=request.user, is_active=True).select_related('post'),
+        request,
+        'created_at'
+    )
+    if error:
+        return Response({
+            'error': error
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Likes sit on the same shard as the reply
+    shard_reply_pks = {}
+    for reply in replies:
+        shard_reply_pks.setdefault(reply._state.db, []).append(reply.pk)
+    liked_reply_ids = set()
+    for alias, reply_pks in shard_reply_pks.items():
+        with sharding.use_shard(alias):
+            liked_reply_ids |= PostLike.liked_ids(request.user, reply_ids=reply_pks)[1]
+    serializer = UserReplySerializer(replies, many=True, context={'liked_reply_ids': liked_reply_ids})
+    
+    return Response({
+        'replies': serializer.data,
+        'next_cursor': next_cursor
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAdminUser])
+def get_engagement(request):
+    """
+    Views, likes, new posts and replies over time from the analytics
+    rollups, in total or per category
+    """
+    from .staff_serializers import EngagementQuerySerializer
+    
+    serializer = EngagementQuerySerializer(data=request.GET)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    category = data.get('category')
+    by_category = data['group'] == 'category'
+    try:
+        buckets, series = analytics.series(
+            data['start'], data['end'], data['width'],
+            category_ids=[category.pk] if category else None,
+            by_category=by_category
+        )
+    except ValueError as error:
+        return Response({
+            'error': str(error)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if by_category:
+        slugs = dict(ForumCategory.objects.filter(pk__in=list(series)).values_list('pk', 'slug'))
+        series = {slugs[category_id]: metrics for category_id, metrics in series.items()}
+    else:
+        series = series[None]
+    
+    return Response({
+        'interval': data['width'],
+        'category': category.slug if category else None,
+        'buckets': [format_datetime(bucket) for bucket in buckets],
+        'series': series,
+        'pending_since': format_datetime(analytics.pending_since())
+    }, status=status.HTTP_200_OK)
@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mental_health_platform.settings')
 
 application = get_asgi_application()
+
+if getattr(settings, 'STARTUP_WARM_UP', True):
+    from mental_health_platform.startup import warm_up
+    warm_up()
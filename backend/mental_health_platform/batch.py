@@ -0,0 +1,179 @@
+"""
+Batched API requests: several forum and account calls in one round trip.
+
+POST /api/v1/batch/ takes {"requests": [{"method", "path", "body"}, ...]}
+and returns {"responses": [{"status", "body"}, ...]} in the same order.
+The batch is authenticated once and every sub-request reuses that user
+and token, so the token lookup is not repeated. Sub-requests are
+dispatched straight to the resolved view; per-view permissions and
+throttles still apply to each of them.
+
+Writes run one at a time in the order given. Runs of consecutive GETs
+between them are independent reads and run concurrently on a small
+thread pool (each worker thread has its own database connection), except
+inside a transaction or with BATCH_MAX_WORKERS = 1, where everything
+runs in order on the request's connection.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connection
+from django.urls import Resolver404, resolve
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+
+logger = logging.getLogger(__name__)
+
+MAX_REQUESTS = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+MAX_WORKERS = getattr(settings, 'BATCH_MAX_WORKERS', 4)
+
+ALLOWED_PREFIXES = ('/api/v1/forums/', '/api/v1/auth/')
+ALLOWED_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Session and token lifecycle calls would change the batch's own auth
+EXCLUDED_VIEWS = {'authentication:login', 'authentication:logout', 'authentication:register'}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='api-batch')
+    return _executor
+
+
+def parse_subrequests(data):
+    """
+    Validate the request list; returns (subrequests, error)
+    """
+    subrequests = data.get('requests') if hasattr(data, 'get') else None
+    if not isinstance(subrequests, list) or not subrequests:
+        return None, 'requests must be a non-empty list'
+    if len(subrequests) > MAX_REQUESTS:
+        return None, f'At most {MAX_REQUESTS} requests per batch'
+    
+    parsed = []
+    for index, item in enumerate(subrequests):
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+            return None, f'requests[{index}] must be an object with a path'
+        method = str(item.get('method', 'GET')).upper()
+        if method not in ALLOWED_METHODS:
+            return None, f'requests[{index}]: unsupported method {method}'
+        if not item['path'].startswith(ALLOWED_PREFIXES):
+            return None, f'requests[{index}]: path must start with one of {", ".join(ALLOWED_PREFIXES)}'
+        parsed.append((method, item['path'], item.get('body')))
+    return parsed, None
+
+
+def build_request(request, method, path, body):
+    """
+    A WSGI request for a sub-request, carrying the batch's user and token
+    """
+    path, _, query_string = path.partition('?')
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    
+    environ = dict(request.META)
+    # An Idempotency-Key applies to the batch, not to each sub-request
+    environ.pop('HTTP_IDEMPOTENCY_KEY', None)
+    environ.update({
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': BytesIO(payload),
+    })
+    subrequest = WSGIRequest(environ)
+    
+    # DRF authenticates requests carrying these with ForcedAuthentication.
+    # Anonymous batches authenticate each view normally, so views still
+    # answer 401 with their WWW-Authenticate challenge.
+    if request.user.is_authenticated:
+        subrequest._force_auth_user = request.user
+        subrequest._force_auth_token = request.auth
+    return subrequest
+
+
+def response_body(response):
+    if hasattr(response, 'data'):
+        return response.data
+    try:
+        return json.loads(response.content)
+    except ValueError:
+        return response.content.decode('utf-8', 'replace')
+
+
+def run_subrequest(request, method, path, body):
+    """
+    Dispatch one sub-request to its view; returns {'status', 'body'}
+    """
+    try:
+        match = resolve(path.partition('?')[0])
+    except Resolver404:
+        return {'status': 404, 'body': {'error': 'Not found'}}
+    if match.view_name in EXCLUDED_VIEWS:
+        return {'status': 400, 'body': {'error': 'This endpoint cannot be batched'}}
+    
+    try:
+        response = match.func(build_request(request, method, path, body), *match.args, **match.kwargs)
+    except Exception:
+        logger.exception('Batched %s %s failed', method, path)
+        return {'status': 500, 'body': {'error': 'Internal server error'}}
+    return {'status': response.status_code, 'body': response_body(response)}
+
+
+def run_subrequest_in_thread(request, method, path, body):
+    """Run a sub-request on a pool thread, releasing its database connection"""
+    try:
+        return run_subrequest(request, method, path, body)
+    finally:
+        close_old_connections()
+
+
+def run_batch(request, subrequests):
+    """
+    Run sub-requests in order, with consecutive reads run concurrently
+    """
+    concurrent = MAX_WORKERS > 1 and not connection.in_atomic_block
+    results = []
+    reads = []
+    
+    def flush_reads():
+        if len(reads) > 1 and concurrent:
+            futures = [get_executor().submit(run_subrequest_in_thread, request, *read) for read in reads]
+            results.extend(future.result() for future in futures)
+        else:
+            results.extend(run_subrequest(request, *read) for read in reads)
+        reads.clear()
+    
+    for method, path, body in subrequests:
+        if method == 'GET':
+            reads.append((method, path, body))
+            continue
+        flush_reads()
+        results.append(run_subrequest(request, method, path, body))
+    flush_reads()
+    return results
+
+
+@api_view(['POST'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([AllowAny])
+def batch_requests(request):
+    """
+    Run a list of forum/account API requests and return their responses
+    """
+    subrequests, error = parse_subrequests(request.data)
+    if error:
+        return Response({'error': error}, status=400)
+    
+    return Response({'responses': run_batch(request, subrequests)})
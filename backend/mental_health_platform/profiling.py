@@ -0,0 +1,296 @@
+"""
+On-demand request profiling.
+
+With PROFILING_ENABLED set, ProfilingMiddleware profiles a request when
+a staff user sends an `X-Profile: 1` header, or at random for a
+PROFILING_SAMPLE_RATE fraction of all requests. A profiled request runs
+under a sampling profiler (a thread reading the request thread's stack
+every PROFILING_INTERVAL seconds) and records every SQL query with the
+project frames it came from. The samples are saved as a speedscope file
+(https://www.speedscope.app) next to a JSON summary with the queries,
+keeping the newest PROFILING_KEEP per URL name; the profile id is
+returned in an X-Profile-Id header.
+
+Without PROFILING_ENABLED the middleware removes itself at startup, so
+requests pay nothing. Profiles are listed and downloaded by admins
+through /api/v1/profiles/.
+"""
+from contextlib import ExitStack
+from datetime import datetime, timezone as dt_timezone
+import json
+import random
+import re
+import sys
+import threading
+import time
+import traceback
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse, Http404
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_ID_RE = re.compile(r'^[0-9]{8}T[0-9]{12}-[0-9a-f]{8}$')
+MAX_SAMPLES = 100000
+ORIGIN_FRAMES = 3
+
+
+def get_profile_dir():
+    return Path(getattr(settings, 'PROFILING_DIR', settings.BASE_DIR / 'var' / 'profiles'))
+
+
+class Sampler:
+    """
+    Statistical profiler for one thread: a daemon thread records the
+    target thread's call stack at a fixed interval
+    """
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self.frames = {}  # (name, file, line) -> index
+        self.samples = []
+        self.weights = []
+        self._stop = threading.Event()
+    
+    def __enter__(self):
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self.run, name='request-profiler', daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+    
+    def run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval) and len(self.samples) < MAX_SAMPLES:
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_name, code.co_filename, code.co_firstlineno)
+                stack.append(self.frames.setdefault(key, len(self.frames)))
+                frame = frame.f_back
+            stack.reverse()
+            
+            weight = (now - last) * 1000
+            last = now
+            # Consecutive identical stacks are merged into one sample
+            if self.samples and self.samples[-1] == stack:
+                self.weights[-1] += weight
+            else:
+                self.samples.append(stack)
+                self.weights.append(weight)
+    
+    def speedscope(self, name):
+        frames = [{'name': func, 'file': file, 'line': line} for func, file, line in self.frames]
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': sum(self.weights),
+                'samples': self.samples,
+                'weights': [round(weight, 3) for weight in self.weights],
+            }],
+            'name': name,
+            'exporter': 'mental_health_platform.profiling',
+        }
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper recording SQL, duration and the project
+    frames that issued each query
+    """
+    
+    def __init__(self):
+        self.queries = []
+        self.root = str(settings.BASE_DIR)
+    
+    def origin(self):
+        frames = [
+            f'{frame.filename[len(self.root) + 1:]}:{frame.lineno} in {frame.name}'
+            for frame in traceback.extract_stack()[:-3]
+            if frame.filename.startswith(self.root) and 'site-packages' not in frame.filename
+            and not frame.filename.endswith('profiling.py')
+        ]
+        return frames[-ORIGIN_FRAMES:]
+    
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+                'database': context['connection'].alias,
+                'origin': self.origin(),
+            })
+
+
+def is_staff_request(request):
+    """
+    Staff check for the profiling header; API clients authenticate with
+    a token, which DRF only checks inside the view
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        authenticated = TokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return authenticated is not None and authenticated[0].is_staff
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests on demand (staff + X-Profile header) or by sampling
+    """
+    
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        self.interval = getattr(settings, 'PROFILING_INTERVAL', 0.001)
+    
+    def should_profile(self, request):
+        if request.META.get(PROFILE_HEADER) in ('1', 'true'):
+            return is_staff_request(request)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+    
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            with Sampler(self.interval) as sampler:
+                response = self.get_response(request)
+        
+        response['X-Profile-Id'] = save_profile(request, response, sampler, recorder.queries)
+        return response
+
+
+def save_profile(request, response, sampler, queries):
+    """
+    Write the speedscope file and summary, pruning old profiles of the
+    same URL name. Returns the profile id.
+    """
+    now = datetime.now(dt_timezone.utc)
+    profile_id = f"{now.strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+    match = getattr(request, 'resolver_match', None)
+    url_name = match.view_name if match else 'unresolved'
+    
+    summary = {
+        'profile_id': profile_id,
+        'url_name': url_name,
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'created_at': now.isoformat(),
+        'duration_ms': round(sampler.duration * 1000, 3),
+        'sample_count': len(sampler.samples),
+        'query_count': len(queries),
+        'query_ms': round(sum(query['duration_ms'] for query in queries), 3),
+        'queries': queries,
+    }
+    
+    directory = get_profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f'{profile_id}.speedscope.json').write_text(
+        json.dumps(sampler.speedscope(f'{request.method} {request.path}'))
+    )
+    (directory / f'{profile_id}.json').write_text(json.dumps(summary))
+    
+    keep = getattr(settings, 'PROFILING_KEEP', 20)
+    same_url = [entry for entry in load_summaries() if entry['url_name'] == url_name]
+    for entry in same_url[keep:]:
+        (directory / f"{entry['profile_id']}.json").unlink(missing_ok=True)
+        (directory / f"{entry['profile_id']}.speedscope.json").unlink(missing_ok=True)
+    
+    return profile_id
+
+
+def load_summaries():
+    """
+    Saved profile summaries, newest first
+    """
+    directory = get_profile_dir()
+    if not directory.exists():
+        return []
+    summaries = []
+    for path in sorted(directory.glob('*.json'), reverse=True):
+        if path.name.endswith('.speedscope.json'):
+            continue
+        try:
+            summaries.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return summaries
+
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAdminUser])
+def list_profiles(request):
+    """
+    Recent profiles grouped by URL name, without their query lists
+    """
+    url_name = request.GET.get('url_name')
+    profiles = {}
+    for summary in load_summaries():
+        if url_name and summary['url_name'] != url_name:
+            continue
+        summary.pop('queries')
+        profiles.setdefault(summary['url_name'], []).append(summary)
+    
+    return Response({
+        'enabled': getattr(settings, 'PROFILING_ENABLED', False),
+        'profiles': profiles
+    })
+
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAdminUser])
+def get_profile(request, profile_id):
+    """
+    A profile's summary with queries, or with ?download=1 its speedscope
+    file to open at https://www.speedscope.app
+    """
+    if not PROFILE_ID_RE.match(profile_id):
+        raise Http404
+    directory = get_profile_dir()
+    
+    if request.GET.get('download'):
+        path = directory / f'{profile_id}.speedscope.json'
+        if not path.exists():
+            raise Http404
+        return FileResponse(path.open('rb'), as_attachment=True, filename=path.name, content_type='application/json')
+    
+    path = directory / f'{profile_id}.json'
+    if not path.exists():
+        raise Http404
+    return Response(json.loads(path.read_text()))
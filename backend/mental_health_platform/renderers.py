@@ -0,0 +1,36 @@
+"""
+JSON renderer backed by orjson when it is installed.
+
+orjson is an optional dependency; without it, or when the browsable API
+asks for indented output, rendering falls back to DRF's JSONRenderer.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer that serializes with orjson when available
+    """
+    encoder = JSONEncoder()
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        if data is None:
+            return b''
+        
+        # Types orjson does not know (Decimal, lazy strings, ...) go
+        # through DRF's encoder. Non-string keys (list field errors are
+        # keyed by index) are converted like json.dumps does.
+        ret = orjson.dumps(data, default=self.encoder.default, option=orjson.OPT_NON_STR_KEYS)
+        
+        # Escape the same line separators JSONRenderer does, so the
+        # output stays valid JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
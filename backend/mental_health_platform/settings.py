@@ -8,6 +8,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -23,6 +25,11 @@ DEBUG = True
 ALLOWED_HOSTS = []
 
 # Application definition
+# Development tools, left out of INSTALLED_APPS by settings_production
+DEV_APPS = [
+    'django_extensions',
+]
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -30,7 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'django_extensions',
+    *DEV_APPS,
     
     # Third party apps
     'rest_framework',
@@ -51,6 +58,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Removes itself at startup unless PROFILING_ENABLED
+    'mental_health_platform.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'mental_health_platform.urls'
@@ -79,6 +88,18 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+    },
+}
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# LocMemCache is per process: fine for runserver, but with several workers
+# thread cache invalidation, throttles and idempotency keys need a shared
+# cache (Redis or memcached) so every worker sees them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mental-health-platform',
     }
 }
 
@@ -122,8 +143,24 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'mental_health_platform.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 20
+    'PAGE_SIZE': 20,
+    # Token bucket sizes for mental_health_platform.throttling
+    # (bucket capacity / refill period, per user or per IP)
+    'DEFAULT_THROTTLE_RATES': {
+        'forum_post': '10/min',
+        'forum_post_ip': '30/min',
+        'forum_reply': '30/min',
+        'forum_reply_ip': '90/min',
+        'forum_like': '60/min',
+        'forum_like_ip': '180/min',
+        'login': '5/min',
+        'login_ip': '20/min',
+    }
 }
 
 # CORS Configuration (for React frontend)
@@ -134,6 +171,9 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
+
 # Media files (User uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -144,4 +184,47 @@ STATICFILES_DIRS = [
 ]
 
 # Custom User Model
-AUTH_USER_MODEL = 'authentication.AnonymousUser'
\ No newline at end of file
+AUTH_USER_MODEL = 'authentication.AnonymousUser'
+
+# Forums
+FORUM_TAG_CACHE_TIMEOUT = 300  # seconds
+FORUM_CATEGORY_SUMMARY_TIMEOUT = 300  # seconds the category landing summary is cached between writes
+FORUM_ACTIVE_USER_DAYS = 30  # a category's active users posted or replied within this many days
+FORUM_THREAD_CACHE_TIMEOUT = 3600  # seconds a cached post detail lives
+FORUM_VIEW_FLUSH_INTERVAL = 10  # seconds between buffered view count writes
+FORUM_TASKS_ASYNC = True  # run post-commit side effects (notifications, ...) on a thread pool
+FORUM_TASK_WORKERS = 2
+FORUM_SCREENING_ENABLED = True  # crisis/spam phrase screening of new posts and replies
+FORUM_SCREENING_PHRASES = {}  # {category: [phrases] or path to a phrase file}, merged over the defaults
+FORUM_DUPLICATE_THRESHOLD = 0.8  # estimated Jaccard similarity for near-duplicate posts
+FORUM_DUPLICATE_ACTION = 'flag'  # 'flag' or 'block'; re-posts by the same author are always blocked
+FORUM_RELATED_INDEX_DIR = BASE_DIR / 'var' / 'related'  # memory-mapped TF-IDF vectors (build_related_posts)
+FORUM_SUGGEST_SYNC_INTERVAL = 30  # seconds between incremental syncs of the in-memory suggest index
+FORUM_SUGGEST_REBUILD_INTERVAL = 3600  # seconds between full rebuilds of the suggest index
+FORUM_SUGGEST_CACHE_TIMEOUT = 30  # seconds a suggest response is cached per prefix
+FORUM_IDEMPOTENCY_TTL = 86400  # seconds a write response is kept for Idempotency-Key replays
+FORUM_IDEMPOTENCY_CACHE = 'default'  # cache alias for Idempotency-Key records; must be shared across workers
+# Databases holding forum content, sharded by category (apps/forums/sharding.py).
+# Off with a single alias. To shard, add the databases to DATABASES, list them here
+# after 'default', install apps.forums.sharding.CategoryShardRouter in DATABASE_ROUTERS
+# and place categories with `manage.py move_category` (settings_sharding does the
+# first and third with local SQLite files)
+FORUM_SHARDS = ['default']
+FORUM_SHARD_MAP_TTL = 30  # seconds a worker caches the category -> shard map
+
+# Batch endpoint (mental_health_platform.batch)
+BATCH_MAX_REQUESTS = 20  # sub-requests per batch
+BATCH_MAX_WORKERS = 4  # threads running consecutive GET sub-requests concurrently
+
+# Request profiling (mental_health_platform.profiling): staff requests
+# with an X-Profile: 1 header, plus a sampled fraction of all requests
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 0.0  # fraction of all requests profiled
+PROFILING_INTERVAL = 0.001  # seconds between stack samples
+PROFILING_DIR = BASE_DIR / 'var' / 'profiles'
+PROFILING_KEEP = 20  # newest profiles kept per URL name
+
+
+# Worker boot (mental_health_platform.startup): fill ORM and URL caches
+# when the WSGI/ASGI application is created
+STARTUP_WARM_UP = True
@@ -0,0 +1,36 @@
+"""
+Production settings: the development settings without dev-only apps,
+with the admin loaded on first use and a cache shared by all workers.
+
+Run workers with DJANGO_SETTINGS_MODULE=mental_health_platform.settings_production
+and measure their boot with `manage.py importtime --settings=...`.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import DEV_APPS, INSTALLED_APPS
+
+DEBUG = False
+
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
+
+# SimpleAdminConfig skips admin autodiscovery at startup; the admin URLs
+# run it on the first /admin/ request (mental_health_platform.startup)
+INSTALLED_APPS = [
+    'django.contrib.admin.apps.SimpleAdminConfig' if app == 'django.contrib.admin' else app
+    for app in INSTALLED_APPS
+    if app not in DEV_APPS
+]
+
+# Throttle buckets, Idempotency-Key records, thread cache generations and
+# buffered view counts only work across workers in a shared cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    }
+}
+
+# Forum sharding stays off (FORUM_SHARDS = ['default'] from the base
+# settings). To enable it, add the shard databases here as server
+# databases, not SQLite files, with DATABASE_ROUTERS as in settings_sharding
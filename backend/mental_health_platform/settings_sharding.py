@@ -0,0 +1,31 @@
+"""
+Settings for trying forum sharding locally: the development settings
+plus two SQLite shard databases and the shard router.
+
+The shards only take content once FORUM_SHARDS lists them, e.g.
+FORUM_SHARDS=default,shard_1,shard_2 in the environment. Without it
+everything stays on the default database, which is how the test suite
+runs here; ShardingTests enable the shards themselves:
+
+    python manage.py test apps.forums --settings=mental_health_platform.settings_sharding
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+DATABASES = {
+    **DATABASES,
+    'shard_1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'shard_1.sqlite3',
+    },
+    'shard_2': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'shard_2.sqlite3',
+    },
+}
+
+DATABASE_ROUTERS = ['apps.forums.sharding.CategoryShardRouter']
+
+FORUM_SHARDS = os.environ.get('FORUM_SHARDS', 'default').split(',')
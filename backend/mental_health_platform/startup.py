@@ -0,0 +1,101 @@
+"""
+Worker boot: lazy admin URLs, warm-up, and import-time measurement.
+
+The admin is mounted through LazyAdminURLConf, so the admin modules of
+every app (and what they import) load on the first /admin/ request
+rather than in each worker's boot; the production settings use
+SimpleAdminConfig, which skips autodiscovery at startup. API requests
+never resolve into the admin's URLs, so they don't trigger it.
+
+warm_up() runs from wsgi.py/asgi.py once the application is built. It
+fills the model registry's field caches and compiles every URL pattern
+outside the admin, so the first request a new worker serves doesn't pay
+for them.
+
+measure_imports() runs a fresh interpreter with `-X importtime` through
+the same boot and returns per-module timings, for the `importtime`
+management command.
+"""
+import os
+import subprocess
+import sys
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.urls import URLResolver, get_resolver
+
+
+class LazyAdminURLConf:
+    """
+    URLconf for the admin that runs autodiscovery on first use
+    """
+    
+    @property
+    def urlpatterns(self):
+        admin.autodiscover()
+        return admin.site.get_urls()
+
+
+def admin_urls():
+    """
+    Drop-in for admin.site.urls in path('admin/', ...)
+    """
+    return LazyAdminURLConf(), 'admin', admin.site.name
+
+
+def compile_patterns(resolver):
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        count += 1
+        if isinstance(pattern, URLResolver) and not isinstance(pattern.urlconf_module, LazyAdminURLConf):
+            count += compile_patterns(pattern)
+    return count
+
+
+def warm_up():
+    """
+    Load what the first request would otherwise load. Returns the number
+    of models and URL patterns warmed.
+    """
+    models = apps.get_models()
+    for model in models:
+        model._meta.get_fields()
+        model._meta.related_objects
+    
+    patterns = compile_patterns(get_resolver())
+    return len(models), patterns
+
+
+WARM_UP_SCRIPT = (
+    'import django; django.setup(); '
+    'from mental_health_platform.startup import warm_up; warm_up()'
+)
+
+
+def measure_imports():
+    """
+    Import timings of a fresh worker boot (django.setup() plus warm-up)
+    under the current settings, as a list of (module, self_us,
+    cumulative_us, depth) in import order
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', WARM_UP_SCRIPT],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def parse_importtime(output):
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # column header
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        timings.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return timings
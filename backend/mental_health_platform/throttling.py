@@ -0,0 +1,170 @@
+"""
+Token bucket throttles for write-heavy and abuse-prone endpoints.
+
+Each bucket is a single (tokens, timestamp) pair in the cache, so a check
+is O(1) regardless of the rate, unlike DRF's SimpleRateThrottle which
+keeps the full request history. Rates come from
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] using DRF's 'N/period' format:
+a bucket holds N tokens and refills at N per period.
+
+A bucket is updated under a short cache lock (cache.add), so concurrent
+requests for the same identity cannot both spend the last token. The
+lock and the bucket only hold across workers when the cache is shared
+(Redis or memcached, see CACHES). Identities are hashed into the cache
+key, so user-supplied values such as login usernames are always valid
+keys.
+"""
+from hashlib import blake2b
+import time
+
+from django.core.cache import cache as default_cache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+LOCK_TIMEOUT = 1
+LOCK_ATTEMPTS = 20
+LOCK_RETRY_DELAY = 0.005
+
+
+def parse_rate(rate):
+    """
+    Parse 'N/period' into (capacity, seconds), e.g. '10/min' -> (10, 60)
+    """
+    if rate is None:
+        return None, None
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base token bucket throttle; subclasses set `scope` and get_ident_key()
+    """
+    cache = default_cache
+    timer = time.time
+    sleep = time.sleep
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+    scope = None
+    
+    def __init__(self):
+        if not self.scope:
+            raise ImproperlyConfigured(f"{self.__class__.__name__} must set a scope")
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        self.capacity, self.period = parse_rate(rate)
+        self.wait_time = None
+    
+    def get_ident_key(self, request, view):
+        """
+        Return the identity the bucket belongs to, or None to skip throttling
+        """
+        raise NotImplementedError('.get_ident_key() must be overridden')
+    
+    def allow_request(self, request, view):
+        if self.capacity is None:
+            return True
+        
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return True
+        
+        key = self.cache_format % {
+            'scope': self.scope,
+            'ident': blake2b(str(ident).encode('utf-8'), digest_size=16).hexdigest()
+        }
+        if not self.acquire(f'{key}:lock'):
+            # Another request for this identity holds the bucket
+            self.wait_time = LOCK_TIMEOUT
+            return False
+        
+        try:
+            now = self.timer()
+            refill_rate = self.capacity / self.period
+            
+            tokens, stamp = self.cache.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - stamp) * refill_rate)
+            
+            if tokens < 1:
+                self.wait_time = (1 - tokens) / refill_rate
+                return False
+            
+            self.cache.set(key, (tokens - 1, now), self.period)
+            return True
+        finally:
+            self.cache.delete(f'{key}:lock')
+    
+    def acquire(self, lock_key):
+        """
+        Take the bucket's lock, retrying briefly while another request
+        holds it
+        """
+        for _ in range(LOCK_ATTEMPTS):
+            if self.cache.add(lock_key, 1, LOCK_TIMEOUT):
+                return True
+            self.sleep(LOCK_RETRY_DELAY)
+        return False
+    
+    def wait(self):
+        return self.wait_time
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+    One bucket per authenticated user, falling back to the client IP
+    """
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """
+    One bucket per client IP (honours NUM_PROXIES like DRF's throttles)
+    """
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class ForumPostThrottle(UserTokenBucketThrottle):
+    scope = 'forum_post'
+
+
+class ForumPostIPThrottle(IPTokenBucketThrottle):
+    scope = 'forum_post_ip'
+
+
+class ForumReplyThrottle(UserTokenBucketThrottle):
+    scope = 'forum_reply'
+
+
+class ForumReplyIPThrottle(IPTokenBucketThrottle):
+    scope = 'forum_reply_ip'
+
+
+class ForumLikeThrottle(UserTokenBucketThrottle):
+    scope = 'forum_like'
+
+
+class ForumLikeIPThrottle(IPTokenBucketThrottle):
+    scope = 'forum_like_ip'
+
+
+class LoginThrottle(TokenBucketThrottle):
+    """
+    One bucket per attempted username, to slow down password guessing
+    """
+    scope = 'login'
+    
+    def get_ident_key(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not username:
+            return None
+        return str(username).lower()
+
+
+class LoginIPThrottle(IPTokenBucketThrottle):
+    scope = 'login_ip'
@@ -1,8 +1,11 @@
-from django.contrib import admin
 from django.urls import path, include
+from . import batch, profiling, startup
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    path('admin/', startup.admin_urls()),
     path('api/v1/auth/', include('apps.authentication.urls')),
     path('api/v1/forums/', include('apps.forums.urls')),
+    path('api/v1/batch/', batch.batch_requests, name='batch'),
+    path('api/v1/profiles/', profiling.list_profiles, name='profiles'),
+    path('api/v1/profiles/<str:profile_id>/', profiling.get_profile, name='profile'),
 ]
\ No newline at end of file
@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mental_health_platform.settings')
 
 application = get_wsgi_application()
+
+if getattr(settings, 'STARTUP_WARM_UP', True):
+    from mental_health_platform.startup import warm_up
+    warm_up()
@@ -286,10 +286,9 @@ function CategoryPosts() {
                 </h3>
 
                 {/* Post Preview */}
-                {post.content && (
+                {post.excerpt && (
                   <p className="text-gray-600 dark:text-amethyst-200 text-sm mb-4 line-clamp-2">
-                    {post.content.substring(0, 150)}
-                    {post.content.length > 150 && '...'}
+                    {post.excerpt}
                   </p>
                 )}
 
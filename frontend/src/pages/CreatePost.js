@@ -1,7 +1,7 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate, useLocation } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
-import { forumsAPI } from '../services/api';
+import { forumsAPI, createActionKey } from '../services/api';
 import { 
   ArrowLeft, 
   Send, 
@@ -18,6 +18,7 @@ function CreatePost() {
   const location = useLocation();
   
   const [categories, setCategories] = useState([]);
+  const submitKey = useRef(createActionKey());
   const [formData, setFormData] = useState({
     title: '',
     content: '',
@@ -120,8 +121,9 @@ function CreatePost() {
     }
 
     try {
-      const response = await forumsAPI.createPost(formData);
+      const response = await forumsAPI.createPost(formData, submitKey.current.keyFor(formData));
       const createdPost = response.data.post;
+      submitKey.current.reset();
       
       // Redirect to the created post
       navigate(`/posts/${createdPost.post_id}`);
@@ -17,7 +17,7 @@ function Forums() {
 
   const fetchCategories = async () => {
     try {
-      const response = await forumsAPI.getCategories();
+      const response = await forumsAPI.getCategorySummaries();
       setCategories(response.data.categories);
     } catch (error) {
       console.error('Error fetching categories:', error);
@@ -27,6 +27,18 @@ function Forums() {
     }
   };
 
+  const formatTimeAgo = (dateString) => {
+    const date = new Date(dateString);
+    const now = new Date();
+    const diffInSeconds = Math.floor((now - date) / 1000);
+    
+    if (diffInSeconds < 60) return 'Just now';
+    if (diffInSeconds < 3600) return `${Math.floor(diffInSeconds / 60)}m ago`;
+    if (diffInSeconds < 86400) return `${Math.floor(diffInSeconds / 3600)}h ago`;
+    if (diffInSeconds < 604800) return `${Math.floor(diffInSeconds / 86400)}d ago`;
+    return date.toLocaleDateString();
+  };
+
   const getCategoryIcon = (categoryName) => {
     const name = categoryName.toLowerCase();
     if (name.includes('anxiety')) return '😰';
@@ -174,23 +186,35 @@ function Forums() {
                   </p>
                 )}
 
+                {/* Latest Post */}
+                {category.latest_post && (
+                  <p className="text-sm text-gray-700 dark:text-amethyst-100 mb-4 truncate">
+                    <span className="font-medium">{category.latest_post.title}</span>
+                    <span className="text-gray-500 dark:text-amethyst-300">
+                      {' '}by {category.latest_post.author.display_name || category.latest_post.author.username}
+                    </span>
+                  </p>
+                )}
+
                 {/* Category Stats */}
                 <div className="flex items-center justify-between text-sm text-gray-500 dark:text-amethyst-300">
                   <div className="flex items-center space-x-4">
-                    <div className="flex items-center space-x-1">
+                    <div className="flex items-center space-x-1" title="Replies">
                       <MessageSquare className="h-4 w-4" />
-                      <span>{category.post_count}</span>
+                      <span>{category.reply_count}</span>
                     </div>
-                    <div className="flex items-center space-x-1">
+                    <div className="flex items-center space-x-1" title="Active members this month">
                       <Users className="h-4 w-4" />
-                      <span>Active</span>
+                      <span>{category.active_users} active</span>
                     </div>
                   </div>
                   
                   {/* Latest Activity */}
                   <div className="flex items-center space-x-1">
                     <Clock className="h-4 w-4" />
-                    <span className="text-xs">Recent activity</span>
+                    <span className="text-xs">
+                      {category.latest_post ? formatTimeAgo(category.latest_post.created_at) : 'No posts yet'}
+                    </span>
                   </div>
                 </div>
 
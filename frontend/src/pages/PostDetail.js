@@ -1,7 +1,7 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useParams, Link, useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
-import { forumsAPI } from '../services/api';
+import { forumsAPI, createActionKey } from '../services/api';
 import { 
   ArrowLeft, 
   Heart, 
@@ -28,6 +28,7 @@ function PostDetail() {
   const [isSubmittingReply, setIsSubmittingReply] = useState(false);
   const [likedPosts, setLikedPosts] = useState(new Set());
   const [likedReplies, setLikedReplies] = useState(new Set());
+  const replyKey = useRef(createActionKey());
 
   useEffect(() => {
     fetchPostDetail();
@@ -38,6 +39,10 @@ function PostDetail() {
       const response = await forumsAPI.getPostDetail(postId);
       setPost(response.data.post);
       setReplies(response.data.replies);
+      setLikedPosts(new Set(response.data.post.liked_by_me ? [postId] : []));
+      setLikedReplies(new Set(
+        response.data.replies.filter(reply => reply.liked_by_me).map(reply => reply.reply_id)
+      ));
     } catch (error) {
       console.error('Error fetching post:', error);
       if (error.response?.status === 404) {
@@ -62,9 +67,9 @@ function PostDetail() {
 
     setIsSubmittingReply(true);
     try {
-      const response = await forumsAPI.replyToPost(postId, {
-        content: replyContent
-      });
+      const data = { content: replyContent };
+      const response = await forumsAPI.replyToPost(postId, data, replyKey.current.keyFor(data));
+      replyKey.current.reset();
       
       setReplies(prev => [...prev, response.data.reply]);
       setReplyContent('');
@@ -82,7 +87,7 @@ function PostDetail() {
     }
 
     try {
-      const response = await forumsAPI.likePost(postId);
+      const response = await forumsAPI.setPostLike(postId, !likedPosts.has(postId));
       setPost(prev => ({
         ...prev,
         like_count: response.data.like_count
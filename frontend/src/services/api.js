@@ -9,6 +9,59 @@ const api = axios.create({
   },
 });
 
+// Random v4 UUID. crypto.randomUUID only exists in secure contexts
+// (HTTPS or localhost), so plain-HTTP hosts build one from getRandomValues
+export const newIdempotencyKey = () => {
+  if (window.crypto?.randomUUID) {
+    return window.crypto.randomUUID();
+  }
+  const bytes = new Uint8Array(16);
+  if (window.crypto?.getRandomValues) {
+    window.crypto.getRandomValues(bytes);
+  } else {
+    for (let i = 0; i < bytes.length; i++) {
+      bytes[i] = Math.floor(Math.random() * 256);
+    }
+  }
+  bytes[6] = (bytes[6] & 0x0f) | 0x40;
+  bytes[8] = (bytes[8] & 0x3f) | 0x80;
+  const hex = Array.from(bytes, (b) => b.toString(16).padStart(2, '0')).join('');
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+};
+
+// Idempotency key for one logical action, such as submitting a draft:
+// the same key comes back until the body changes or reset() is called
+// after success, so resubmitting after a failure cannot write twice
+export const createActionKey = () => {
+  let key = null;
+  let body = null;
+  return {
+    keyFor(data) {
+      const serialized = JSON.stringify(data ?? null);
+      if (key === null || serialized !== body) {
+        key = newIdempotencyKey();
+        body = serialized;
+      }
+      return key;
+    },
+    reset() {
+      key = null;
+      body = null;
+    },
+  };
+};
+
+const withKey = (idempotencyKey) => (
+  idempotencyKey ? { headers: { 'Idempotency-Key': idempotencyKey } } : undefined
+);
+
+const MAX_WRITE_RETRIES = 2;
+const RETRY_DELAY_MS = 500;
+
+const isForumWrite = (config) => (
+  config.method !== 'get' && config.url?.startsWith('/forums/')
+);
+
 // Request interceptor
 api.interceptors.request.use(
   (config) => {
@@ -16,6 +69,12 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Token ${token}`;
     }
+    // One key per logical write unless the caller passed one; a retry
+    // of this config reuses it, so the server replays the first response
+    // instead of writing twice
+    if (isForumWrite(config) && !config.headers['Idempotency-Key']) {
+      config.headers['Idempotency-Key'] = newIdempotencyKey();
+    }
     return config;
   },
   (error) => {
@@ -28,7 +87,16 @@ api.interceptors.response.use(
   (response) => {
     return response;
   },
-  (error) => {
+  async (error) => {
+    const { config } = error;
+    // Retry forum writes lost to the network or a server error with the
+    // same config, and so the same Idempotency-Key
+    const retryable = !error.response || error.response.status >= 500;
+    if (config && isForumWrite(config) && retryable && (config.retryCount || 0) < MAX_WRITE_RETRIES) {
+      config.retryCount = (config.retryCount || 0) + 1;
+      await new Promise((resolve) => setTimeout(resolve, RETRY_DELAY_MS * config.retryCount));
+      return api(config);
+    }
     if (error.response?.status === 401) {
       // Token expired or invalid
       localStorage.removeItem('token');
@@ -52,12 +120,26 @@ export const authAPI = {
 
 export const forumsAPI = {
   getCategories: () => api.get('/forums/categories/'),
+  // Counts, latest post and active users per category, for the landing page
+  getCategorySummaries: () => api.get('/forums/categories/summary/'),
   getCategoryPosts: (categorySlug, params) => api.get(`/forums/categories/${categorySlug}/posts/`, { params }),
-  createPost: (data) => api.post('/forums/posts/', data),
+  // idempotencyKey: pass the same key when resubmitting the same write
+  // (see createActionKey); without one each call gets a fresh key
+  createPost: (data, idempotencyKey) => api.post('/forums/posts/', data, withKey(idempotencyKey)),
   getPostDetail: (postId) => api.get(`/forums/posts/${postId}/`),
-  replyToPost: (postId, data) => api.post(`/forums/posts/${postId}/replies/`, data),
+  replyToPost: (postId, data, idempotencyKey) => api.post(`/forums/posts/${postId}/replies/`, data, withKey(idempotencyKey)),
+  // data includes the `version` being edited; a 409 means it changed since
+  editPost: (postId, data) => api.patch(`/forums/posts/${postId}/edit/`, data),
+  editReply: (replyId, data) => api.patch(`/forums/replies/${replyId}/edit/`, data),
+  getPostRevisions: (postId) => api.get(`/forums/posts/${postId}/revisions/`),
   likePost: (postId) => api.post(`/forums/posts/${postId}/like/`),
+  setPostLike: (postId, liked) => (liked
+    ? api.put(`/forums/posts/${postId}/like/`)
+    : api.delete(`/forums/posts/${postId}/like/`)),
   likeReply: (replyId) => api.post(`/forums/replies/${replyId}/like/`),
+  setReplyLike: (replyId, liked) => (liked
+    ? api.put(`/forums/replies/${replyId}/like/`)
+    : api.delete(`/forums/replies/${replyId}/like/`)),
   searchPosts: (params) => api.get('/forums/search/', { params }),
 };
 